@@ -3,22 +3,51 @@ ClickHouse Client for AI Transfer Optimization
 Handles telemetry data storage, retrieval, and ML feature extraction
 """
 
+import sys
+import time
+import uuid
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
+from datetime import datetime, timedelta, timezone
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import clickhouse_connect
 from clickhouse_connect import get_client
 from dataclasses import dataclass
 import json
 
+from query_cache import QueryCache
+from query_profiler import QueryProfile, QueryProfiler
+from clickhouse_migrations import MIGRATIONS, QUERY_LOG_DDL, SCHEMA_MIGRATIONS_DDL, TELEMETRY_TABLE_DDL
+from clickhouse_queries import (
+    DOWNSAMPLE_STAGING_SUFFIX, HOURLY_ANALYTICS_COLUMNS, ROLLUP_TABLES,
+    get_query, rollup_table_ddl, rollup_view_ddl
+)
+
 logger = logging.getLogger(__name__)
 
+def to_utc(value: datetime) -> datetime:
+    """
+    Timezone-aware UTC datetime for a telemetry timestamp
+
+    tcp_telemetry stores DateTime64 without a timezone, and every insert path
+    treats naive datetimes as UTC: the Arrow path sends their wall-clock value
+    as epoch milliseconds, and the row-wise path sends them through this
+    helper so clickhouse_connect does not read them as host local time.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
 @dataclass
 class TelemetryRecord:
     """Single telemetry record structure"""
+    # Naive values are UTC (see to_utc)
     timestamp: datetime
     agent_id: str
     transfer_id: str
@@ -55,6 +84,308 @@ class TelemetryRecord:
     optimization_applied: Optional[str] = None
     improvement_percent: Optional[float] = None
 
+@dataclass
+class TrainingSample:
+    """Server-side sampling options for training data reads"""
+    # Fraction of transfers kept, via the tcp_telemetry sampling key
+    ratio: float = 1.0
+    
+    # Max rows per agent, or per agent per time bucket when bucket_minutes is set
+    rows_per_agent: Optional[int] = None
+    bucket_minutes: Optional[int] = None
+    
+    def __post_init__(self):
+        if not 0.0 < self.ratio <= 1.0:
+            raise ValueError(f"Sample ratio must be in (0, 1]: {self.ratio}")
+        if self.bucket_minutes is not None and self.rows_per_agent is None:
+            raise ValueError("bucket_minutes requires rows_per_agent")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Sampling description for model metadata"""
+        return {
+            'ratio': self.ratio,
+            'rows_per_agent': self.rows_per_agent,
+            'bucket_minutes': self.bucket_minutes
+        }
+
+# Column layout of tcp_telemetry, in table order, as sent by the columnar insert path
+TELEMETRY_ARROW_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ms')),
+    ('agent_id', pa.string()),
+    ('transfer_id', pa.string()),
+    ('project_id', pa.string()),
+    ('bandwidth_mbps', pa.float64()),
+    ('latency_ms', pa.float64()),
+    ('packet_loss_rate', pa.float64()),
+    ('jitter_ms', pa.float64()),
+    ('rtt_ms', pa.float64()),
+    ('throughput_mbps', pa.float64()),
+    ('bytes_transferred', pa.uint64()),
+    ('transfer_duration_ms', pa.uint64()),
+    ('chunk_size', pa.uint32()),
+    ('concurrent_connections', pa.uint16()),
+    ('cpu_usage', pa.float64()),
+    ('memory_usage', pa.float64()),
+    ('disk_io_mbps', pa.float64()),
+    ('network_utilization', pa.float64()),
+    ('hour_of_day', pa.uint8()),
+    ('day_of_week', pa.uint8()),
+    ('is_weekend', pa.uint8()),
+    ('predicted_throughput', pa.float64()),
+    ('actual_throughput', pa.float64()),
+    ('optimization_applied', pa.string()),
+    ('improvement_percent', pa.float64()),
+])
+
+TELEMETRY_COLUMNS = TELEMETRY_ARROW_SCHEMA.names
+
+# Optional columns and the values insert_telemetry stores when they are missing
+TELEMETRY_DEFAULTS = {
+    'predicted_throughput': 0.0,
+    'actual_throughput': 0.0,
+    'optimization_applied': '',
+    'improvement_percent': 0.0,
+}
+
+# Fields returned by get_agent_features, in query column order
+AGENT_FEATURE_FIELDS = [
+    'avg_bandwidth', 'avg_latency', 'avg_packet_loss', 'avg_jitter', 'avg_rtt',
+    'max_throughput', 'avg_throughput', 'min_throughput', 'throughput_std',
+    'transfer_count', 'total_bytes',
+    'avg_cpu', 'avg_memory', 'avg_disk_io', 'avg_network_util',
+]
+
+# Count-like fields default to integer zero
+_AGENT_FEATURE_INT_FIELDS = {'transfer_count', 'total_bytes'}
+
+# Default retention in days per storage tier, finest first. Raw telemetry is
+# rolled up into every ROLLUP_TABLES tier before its months are dropped.
+RETENTION_TIERS = [
+    ('tcp_telemetry', 90),
+    ('agent_features_1m', 365),
+    ('agent_features_1h', 3 * 365),
+]
+
+def agent_features_from_row(row) -> Dict[str, float]:
+    """Map an agent features result row onto named fields"""
+    return {
+        name: value or (0 if name in _AGENT_FEATURE_INT_FIELDS else 0.0)
+        for name, value in zip(AGENT_FEATURE_FIELDS, row)
+    }
+
+ColumnarTelemetry = Union[pd.DataFrame, Dict[str, np.ndarray], pa.Table, 'TelemetryBatch']
+
+# Incremental read watermark: (timestamp as epoch milliseconds, agent_id)
+TelemetryCursor = Tuple[int, str]
+
+def to_telemetry_table(data: ColumnarTelemetry) -> pa.Table:
+    """
+    Convert columnar telemetry into an Arrow table matching tcp_telemetry
+    
+    Args:
+        data: pandas DataFrame, dict of NumPy arrays or Arrow table. Extra
+            columns are ignored; optional result columns may be omitted.
+            Naive timestamps are interpreted as UTC (see to_utc).
+            
+    Returns:
+        Arrow table with TELEMETRY_ARROW_SCHEMA
+    """
+    if isinstance(data, TelemetryBatch):
+        return data.table
+    if isinstance(data, pa.Table):
+        table = data
+    elif isinstance(data, pd.DataFrame):
+        table = pa.Table.from_pandas(data, preserve_index=False)
+    elif isinstance(data, dict):
+        table = pa.table({name: np.asarray(values) for name, values in data.items()})
+    else:
+        raise TypeError(f"Unsupported telemetry container: {type(data).__name__}")
+    
+    columns = []
+    for field in TELEMETRY_ARROW_SCHEMA:
+        if field.name in table.column_names:
+            column = table.column(field.name).cast(field.type, safe=False)
+            if field.name in TELEMETRY_DEFAULTS and column.null_count:
+                column = pc.fill_null(column, pa.scalar(TELEMETRY_DEFAULTS[field.name], field.type))
+        elif field.name in TELEMETRY_DEFAULTS:
+            column = pa.repeat(pa.scalar(TELEMETRY_DEFAULTS[field.name], field.type), table.num_rows)
+        else:
+            raise ValueError(f"Missing required telemetry column: {field.name}")
+        columns.append(column)
+    
+    return pa.Table.from_arrays(columns, schema=TELEMETRY_ARROW_SCHEMA)
+
+class TelemetryRow:
+    """Read-only view of one TelemetryBatch row with TelemetryRecord attribute names"""
+    __slots__ = ('_batch', '_index')
+    
+    def __init__(self, batch: 'TelemetryBatch', index: int):
+        self._batch = batch
+        self._index = index
+    
+    def __getattr__(self, name: str) -> Any:
+        if name not in TELEMETRY_ARROW_SCHEMA.names:
+            raise AttributeError(name)
+        return self._batch._value(name, self._index)
+    
+    def to_record(self) -> TelemetryRecord:
+        """Materialise the row as a TelemetryRecord"""
+        return TelemetryRecord(**{name: getattr(self, name) for name in TELEMETRY_COLUMNS})
+    
+    def __repr__(self) -> str:
+        return f"TelemetryRow({self._index}, agent_id={self.agent_id!r}, timestamp={self.timestamp!r})"
+
+class TelemetryBatch:
+    """
+    Telemetry records stored column-wise in an Arrow table
+    
+    Costs roughly the encoded row size per record instead of a Python object
+    and dict per field, and is accepted by insert_telemetry,
+    insert_telemetry_columnar, TelemetryBuffer and
+    FeatureEngineer.prepare_training_data. Indexing yields TelemetryRow views.
+    """
+    __slots__ = ('table', '_numpy')
+    
+    def __init__(self, data: ColumnarTelemetry):
+        """
+        Build a batch from columnar telemetry
+        
+        Args:
+            data: Anything insert_telemetry_columnar accepts
+        """
+        self.table = to_telemetry_table(data).combine_chunks()
+        self._numpy: Dict[str, np.ndarray] = {}
+    
+    @classmethod
+    def from_records(cls, records: List[TelemetryRecord]) -> 'TelemetryBatch':
+        """Convert TelemetryRecord objects into a batch"""
+        if not records:
+            return cls(TELEMETRY_ARROW_SCHEMA.empty_table())
+        columns = {
+            name: pa.array([getattr(record, name) for record in records])
+            for name in TELEMETRY_COLUMNS if name != 'timestamp'
+        }
+        columns['timestamp'] = pa.array([to_utc(record.timestamp) for record in records],
+                                        pa.timestamp('ms', 'UTC'))
+        return cls(pa.table(columns))
+    
+    @classmethod
+    def concat(cls, batches: List['TelemetryBatch']) -> 'TelemetryBatch':
+        """Combine several batches into one"""
+        return cls(pa.concat_tables([batch.table for batch in batches])
+                   if batches else TELEMETRY_ARROW_SCHEMA.empty_table())
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column buffers"""
+        return self.table.nbytes
+    
+    def __len__(self) -> int:
+        return self.table.num_rows
+    
+    def __getitem__(self, key: Union[int, slice]) -> Union[TelemetryRow, 'TelemetryBatch']:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("TelemetryBatch slices must be contiguous")
+            return TelemetryBatch(self.table.slice(start, stop - start))
+        
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError(f"Row {key} out of range for batch of {len(self)}")
+        return TelemetryRow(self, index)
+    
+    def __iter__(self):
+        return (TelemetryRow(self, index) for index in range(len(self)))
+    
+    def column(self, name: str) -> np.ndarray:
+        """A column as a NumPy array (zero-copy for numeric columns)"""
+        if name not in self._numpy:
+            self._numpy[name] = self.table.column(name).to_numpy()
+        return self._numpy[name]
+    
+    def to_pandas(self) -> pd.DataFrame:
+        """Columns as a DataFrame, as returned by get_training_data"""
+        return self.table.to_pandas()
+    
+    def to_records(self) -> List[TelemetryRecord]:
+        """Materialise every row as a TelemetryRecord"""
+        return [row.to_record() for row in self]
+    
+    def _value(self, name: str, index: int) -> Any:
+        """Python value of one cell"""
+        if pa.types.is_string(TELEMETRY_ARROW_SCHEMA.field(name).type):
+            return self.table.column(name)[index].as_py()
+        value = self.column(name)[index].item()
+        if name == 'timestamp':
+            return datetime(1970, 1, 1) + timedelta(milliseconds=value) if isinstance(value, int) else value
+        if name == 'is_weekend':
+            return bool(value)
+        return value
+
+def _analytics_timeline(result: pd.DataFrame) -> Dict[str, Any]:
+    """Per-minute analytics rows plus their summary"""
+    return {
+        'timeline': result.to_dict('records'),
+        'summary': {
+            'total_transfers': int(result['transfer_count'].sum()),
+            'avg_throughput': float(result['avg_throughput'].mean()),
+            'peak_throughput': float(result['max_throughput'].max()),
+            'avg_latency': float(result['avg_latency'].mean()),
+            'optimization_rate': float(result['optimized_transfers'].sum() / result['transfer_count'].sum() * 100) if result['transfer_count'].sum() > 0 else 0.0,
+            'avg_improvement': float(result['avg_improvement'].mean())
+        }
+    }
+
+# Marker for "use the client's query_timeout" in _execute
+_DEFAULT_TIMEOUT = object()
+
+def _insert_settings(dedup_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Settings for an idempotent tcp_telemetry insert
+    
+    Schema migration 5 enables insert deduplication on tcp_telemetry and the
+    rollups, so every insert carries a token: a retry with the same token is
+    dropped by the server (rollup rows included), while distinct batches with
+    identical contents are never mistaken for retries.
+    """
+    return {
+        'insert_deduplication_token': dedup_token or uuid.uuid4().hex,
+        'deduplicate_blocks_in_dependent_materialized_views': 1,
+    }
+
+# Functions between a public ClickHouseClient method and _execute, skipped
+# when attributing a call to its caller
+_PROFILE_WRAPPERS = {'execute_named', 'load', 'get_or_load'}
+
+def _query_label(method: str, args: Tuple) -> str:
+    """Profiler label for a call without a template name"""
+    if method.startswith('insert'):
+        return f"insert {args[0]}" if args else method
+    sql = args[0] if args and isinstance(args[0], str) else ''
+    return ' '.join(sql.split()[:3])[:64] or method
+
+def _result_size(result: Any) -> Tuple[int, int]:
+    """Rows and bytes of a query result held by the client"""
+    if isinstance(result, (pa.Table, pa.RecordBatch)):
+        return result.num_rows, result.nbytes
+    if isinstance(result, pd.DataFrame):
+        return len(result), int(result.memory_usage(index=False).sum())
+    if hasattr(result, 'result_rows'):
+        return len(result.result_rows), 0
+    return 0, 0
+
+def _call_with_summary(session: Any, method: str, args: Tuple, kwargs: Dict) -> Tuple[Any, Dict[str, Any]]:
+    """Run a client method and also return the X-ClickHouse-Summary statistics"""
+    if method == 'query_df':
+        # query_df drops the QueryResult; run the same context through query()
+        context = session.create_query_context(*args, use_numpy=True, as_pandas=True, **kwargs)
+        result = session.query(context=context)
+        return result.df_result, result.summary
+    
+    result = getattr(session, method)(*args, **kwargs)
+    return result, getattr(result, 'summary', None) or {}
+
 class ClickHouseClient:
     """
     ClickHouse client for AI telemetry data management
@@ -62,7 +393,11 @@ class ClickHouseClient:
     
     def __init__(self, host: str = 'localhost', port: int = 8123, 
                  username: str = 'tcp_user', password: str = 'tcp_password', 
-                 database: str = 'tcp_optimization'):
+                 database: str = 'tcp_optimization', pool_size: int = 8,
+                 query_timeout: Optional[float] = 30.0,
+                 acquire_timeout: Optional[float] = None,
+                 cache: Optional[QueryCache] = None,
+                 profiler: Optional[QueryProfiler] = None):
         """
         Initialize ClickHouse client
         
@@ -72,86 +407,324 @@ class ClickHouseClient:
             username: Database username
             password: Database password
             database: Database name
+            pool_size: Number of HTTP sessions (and worker threads) in the pool
+            query_timeout: Per-query timeout in seconds (None to disable)
+            acquire_timeout: Max seconds to wait for a free session before
+                raising (None waits indefinitely)
+            cache: Optional read-through cache for analytics and feature reads
+            profiler: Optional registry recording timings and read statistics
+                of every call
         """
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.database = database
+        self.pool_size = max(1, pool_size)
+        self.query_timeout = query_timeout
+        self.acquire_timeout = acquire_timeout
+        self.cache = cache
+        self.profiler = profiler
         self.client = None
+        self._query_log_ready = False
+        self._query_log_task: Optional[asyncio.Task] = None
+        
+        # Session pool: every query borrows one synchronous client and runs it
+        # on the executor so the event loop is never blocked
+        self._clients: List[Any] = []
+        self._pool: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _create_session(self):
+        """Create a single synchronous ClickHouse session"""
+        settings = {}
+        if self.query_timeout:
+            # Let the server abort queries the caller has already given up on
+            settings['max_execution_time'] = int(self.query_timeout) + 1
+        
+        return get_client(
+            host=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            database=self.database,
+            autogenerate_session_id=False,
+            settings=settings
+        )
         
     async def connect(self):
-        """Establish connection to ClickHouse"""
+        """Establish the pool of connections to ClickHouse"""
         try:
-            self.client = get_client(
-                host=self.host,
-                port=self.port,
-                username=self.username,
-                password=self.password,
-                database=self.database
+            loop = asyncio.get_running_loop()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size,
+                thread_name_prefix='clickhouse'
             )
             
+            # Open all sessions concurrently
+            self._clients = list(await asyncio.gather(*[
+                loop.run_in_executor(self._executor, self._create_session)
+                for _ in range(self.pool_size)
+            ]))
+            self.client = self._clients[0]
+            
+            self._pool = asyncio.Queue()
+            for session in self._clients:
+                self._pool.put_nowait(session)
+            
             # Test connection
-            result = self.client.query('SELECT 1')
-            logger.info(f"Connected to ClickHouse at {self.host}:{self.port}")
+            await self._execute('query', 'SELECT 1')
+            logger.info(f"Connected to ClickHouse at {self.host}:{self.port} "
+                        f"(pool_size={self.pool_size})")
             return True
             
         except Exception as e:
             logger.error(f"Failed to connect to ClickHouse: {e}")
             return False
     
+    async def _acquire_session(self) -> Tuple[asyncio.Queue, Any]:
+        """Borrow a session from the pool, waiting up to acquire_timeout"""
+        if self._pool is None:
+            raise ConnectionError("ClickHouse client is not connected")
+        
+        pool = self._pool
+        session = await asyncio.wait_for(pool.get(), self.acquire_timeout)
+        return pool, session
+    
+    async def _execute(self, method: str, *args, timeout: Any = _DEFAULT_TIMEOUT,
+                       query_name: Optional[str] = None, profile: bool = True, **kwargs):
+        """
+        Run a clickhouse_connect client method on a pooled session
+        
+        Waiting for a free session provides back-pressure when more requests
+        are in flight than the pool can serve.
+        
+        Args:
+            method: Client method name ('query', 'query_df', 'command', 'insert', ...)
+            timeout: Per-call timeout override in seconds (None disables it)
+            query_name: Profiler label (template name); derived from the call if omitted
+            profile: Record the call in the profiler, if one is attached
+            
+        Returns:
+            Whatever the client method returns
+        """
+        profiler = self.profiler if profile else None
+        started = time.perf_counter()
+        pool, session = await self._acquire_session()
+        acquired = time.perf_counter()
+        
+        def call():
+            if profiler:
+                return _call_with_summary(session, method, args, kwargs)
+            return getattr(session, method)(*args, **kwargs), None
+        
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, call)
+        # The session goes back to the pool only once the worker thread is
+        # done with it, even if the awaiting caller timed out or was cancelled
+        future.add_done_callback(lambda _: pool.put_nowait(session))
+        
+        timeout = self.query_timeout if timeout is _DEFAULT_TIMEOUT else timeout
+        if not profiler:
+            return (await asyncio.wait_for(asyncio.shield(future), timeout))[0]
+        
+        caller = self._profile_caller()
+        label = query_name or _query_label(method, args)
+        try:
+            result, summary = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except BaseException as e:
+            self._record_profile(caller, label, method, started, acquired, error=e)
+            raise
+        
+        self._record_profile(caller, label, method, started, acquired,
+                             summary=summary, size=_result_size(result))
+        return result
+    
+    def _profile_caller(self) -> str:
+        """Name of the public method (or outside function) that issued the current call"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            name = frame.f_code.co_name
+            internal = frame.f_globals.get('__name__') in (__name__, 'query_cache')
+            if not (internal and (name.startswith(('_', '<')) or name in _PROFILE_WRAPPERS)):
+                return name
+            frame = frame.f_back
+        return 'unknown'
+    
+    def _record_profile(self, caller: str, query: str, method: str, started: float,
+                        acquired: float, summary: Optional[Dict[str, Any]] = None,
+                        size: Tuple[int, int] = (0, 0), error: Optional[BaseException] = None):
+        """Add one finished call to the profiler and write the log table when due"""
+        summary = summary or {}
+        
+        def counter(key: str) -> int:
+            try:
+                return int(summary.get(key, 0))
+            except (TypeError, ValueError):
+                return 0
+        
+        self.profiler.record(QueryProfile(
+            caller=caller,
+            query=query,
+            method=method,
+            event_time=datetime.now(),
+            wall_ms=(time.perf_counter() - started) * 1000,
+            wait_ms=(acquired - started) * 1000,
+            read_rows=counter('read_rows'),
+            read_bytes=counter('read_bytes'),
+            written_rows=counter('written_rows'),
+            written_bytes=counter('written_bytes'),
+            result_rows=counter('result_rows') or size[0],
+            result_bytes=size[1] or counter('result_bytes'),
+            query_id=str(summary.get('query_id', '')),
+            error=f"{type(error).__name__}: {error}" if error is not None else ''
+        ))
+        
+        if self.profiler.log_due() and (self._query_log_task is None or self._query_log_task.done()):
+            self._query_log_task = asyncio.ensure_future(self.flush_query_log())
+    
+    async def flush_query_log(self) -> int:
+        """
+        Write pending query profiles to the profiler's log table
+        
+        Runs automatically as profiles accumulate; call it before close() to
+        write the tail.
+        
+        Returns:
+            Number of profiles written
+        """
+        if not (self.profiler and self.profiler.log_table):
+            return 0
+        
+        profiles = self.profiler.take_pending()
+        if not profiles:
+            return 0
+        
+        try:
+            table = self.profiler.log_table
+            if not self._query_log_ready:
+                await self._execute('command', QUERY_LOG_DDL.format(table=table), profile=False)
+                self._query_log_ready = True
+            
+            rows = [profile.to_dict() for profile in profiles]
+            await self._execute('insert', table, [list(row.values()) for row in rows],
+                                column_names=list(rows[0]), profile=False)
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"Failed to write query log: {e}")
+            return 0
+    
+    async def execute_named(self, name: str, parameters: Optional[Dict[str, Any]] = None,
+                            method: str = 'query', cached: bool = False, **kwargs):
+        """
+        Run a registered query template with server-side parameter binding
+        
+        The SQL text is fixed per template and values travel as separate
+        query parameters, so nothing is interpolated into the statement.
+        
+        Args:
+            name: Template name registered in clickhouse_queries
+            parameters: Values for the template placeholders
+            method: Client method to run ('query', 'query_df', 'command', ...)
+            cached: Serve the result from the client cache when one is configured
+            
+        Returns:
+            Whatever the client method returns
+        """
+        template = get_query(name)
+        bound = template.bind(parameters)
+        
+        def load():
+            return self._execute(method, template.sql, parameters=bound, query_name=name, **kwargs)
+        
+        if not (cached and self.cache):
+            return await load()
+        
+        result = await self.cache.get_or_load(name, bound, load, variant=method)
+        # Cached DataFrames are shared between callers; hand out copies
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+    
+    async def _stream(self, method: str, *args, prefetch: int = 2,
+                      query_name: Optional[str] = None, **kwargs) -> AsyncIterator[Any]:
+        """
+        Iterate a clickhouse_connect streaming method without blocking the loop
+        
+        A worker thread reads blocks into a small bounded queue, so at most
+        `prefetch` blocks are held in memory ahead of the consumer and a slow
+        consumer throttles the server read.
+        
+        Args:
+            method: Streaming client method ('query_arrow_stream', 'query_df_stream', ...)
+            prefetch: Max blocks buffered ahead of the consumer
+            query_name: Profiler label (template name)
+            
+        Yields:
+            Blocks as produced by the client method
+        """
+        started = time.perf_counter()
+        pool, session = await self._acquire_session()
+        acquired = time.perf_counter()
+        caller = self._profile_caller() if self.profiler else None
+        result_rows = result_bytes = 0
+        loop = asyncio.get_running_loop()
+        blocks: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        
+        def put(item):
+            asyncio.run_coroutine_threadsafe(blocks.put(item), loop).result()
+        
+        def produce():
+            try:
+                with getattr(session, method)(*args, **kwargs) as stream:
+                    for block in stream:
+                        if stop.is_set():
+                            break
+                        put((block, None))
+                put((None, None))
+            except Exception as e:
+                put((None, e))
+        
+        future = loop.run_in_executor(self._executor, produce)
+        future.add_done_callback(lambda _: pool.put_nowait(session))
+        
+        finished = False
+        error = None
+        try:
+            while True:
+                block, error = await blocks.get()
+                if error is not None:
+                    finished = True
+                    raise error
+                if block is None:
+                    finished = True
+                    break
+                if caller:
+                    block_rows, block_bytes = _result_size(block)
+                    result_rows += block_rows
+                    result_bytes += block_bytes
+                yield block
+        finally:
+            if not finished:
+                # Consumer stopped early: unblock the producer and let it close the stream
+                stop.set()
+                while (await blocks.get())[0] is not None:
+                    pass
+            await future
+            if caller:
+                self._record_profile(caller, query_name or _query_label(method, args), method,
+                                     started, acquired, size=(result_rows, result_bytes), error=error)
+        
     async def initialize_schema(self):
         """Create database and tables if they don't exist"""
         try:
             # Create database
-            self.client.command(f'CREATE DATABASE IF NOT EXISTS {self.database}')
+            await self._execute('command', f'CREATE DATABASE IF NOT EXISTS {self.database}')
             
-            # Create telemetry table
-            create_telemetry_table = """
-            CREATE TABLE IF NOT EXISTS tcp_telemetry (
-                timestamp DateTime64(3),
-                agent_id String,
-                transfer_id String,
-                project_id String,
-                
-                -- Network Metrics
-                bandwidth_mbps Float64,
-                latency_ms Float64,
-                packet_loss_rate Float64,
-                jitter_ms Float64,
-                rtt_ms Float64,
-                
-                -- Transfer Metrics
-                throughput_mbps Float64,
-                bytes_transferred UInt64,
-                transfer_duration_ms UInt64,
-                chunk_size UInt32,
-                concurrent_connections UInt16,
-                
-                -- System Metrics
-                cpu_usage Float64,
-                memory_usage Float64,
-                disk_io_mbps Float64,
-                network_utilization Float64,
-                
-                -- Environmental
-                hour_of_day UInt8,
-                day_of_week UInt8,
-                is_weekend UInt8,
-                
-                -- Optimization Results
-                predicted_throughput Float64,
-                actual_throughput Float64,
-                optimization_applied String,
-                improvement_percent Float64
-            )
-            ENGINE = MergeTree()
-            PARTITION BY toYYYYMM(timestamp)
-            ORDER BY (agent_id, timestamp)
-            TTL timestamp + INTERVAL 1 YEAR
-            """
+            # Create telemetry table (baseline layout; migrations upgrade it)
+            create_telemetry_table = TELEMETRY_TABLE_DDL.format(table='tcp_telemetry')
             
-            self.client.command(create_telemetry_table)
+            await self._execute('command', create_telemetry_table)
             
             # Create model performance table
             create_model_table = """
@@ -171,27 +744,27 @@ class ClickHouseClient:
             TTL timestamp + INTERVAL 6 MONTH
             """
             
-            self.client.command(create_model_table)
-            
-            # Create materialized view for real-time analytics
-            create_analytics_view = """
-            CREATE MATERIALIZED VIEW IF NOT EXISTS transfer_analytics_mv
-            ENGINE = SummingMergeTree()
-            ORDER BY (agent_id, toStartOfHour(timestamp))
-            AS SELECT
-                agent_id,
-                toStartOfHour(timestamp) as hour,
-                count() as transfer_count,
-                avg(throughput_mbps) as avg_throughput,
-                max(throughput_mbps) as max_throughput,
-                avg(latency_ms) as avg_latency,
-                avg(packet_loss_rate) as avg_packet_loss,
-                sum(bytes_transferred) as total_bytes
-            FROM tcp_telemetry
+            await self._execute('command', create_model_table)
+            
+            # Create per-agent minute/hour rollups fed by materialized views
+            await self._create_rollups()
+            
+            # Hourly analytics finalised from the hour rollup states. This
+            # replaces the old SummingMergeTree view, whose avg()/max()
+            # columns were summed together on merge.
+            await self._execute('command', 'DROP VIEW IF EXISTS transfer_analytics_mv')
+            
+            create_analytics_view = f"""
+            CREATE VIEW IF NOT EXISTS transfer_analytics
+            AS SELECT {HOURLY_ANALYTICS_COLUMNS}
+            FROM agent_features_1h
             GROUP BY agent_id, hour
             """
             
-            self.client.command(create_analytics_view)
+            await self._execute('command', create_analytics_view)
+            
+            # Bring existing tables up to the current layout
+            await self.apply_migrations()
             
             logger.info("ClickHouse schema initialized successfully")
             return True
@@ -200,14 +773,109 @@ class ClickHouseClient:
             logger.error(f"Failed to initialize schema: {e}")
             return False
     
-    async def insert_telemetry(self, records: List[TelemetryRecord]):
+    async def apply_migrations(self) -> List[int]:
+        """
+        Apply pending schema migrations in version order
+        
+        Migrations that touch tcp_telemetry drop the rollup views while they
+        run. Once the migrations finish, or one of them fails, the views are
+        re-created and every month written to since the first migration
+        started is checked. A rollup month with fewer transfers than the raw
+        data is rebuilt from the raw rows.
+        
+        Returns:
+            Versions applied by this call
+        """
+        await self._execute('command', SCHEMA_MIGRATIONS_DDL)
+        applied = {
+            row[0] for row in
+            (await self._execute('query', 'SELECT version FROM schema_migrations')).result_rows
+        }
+        pending = [migration for migration in MIGRATIONS if migration[0] not in applied]
+        if not pending:
+            return []
+        
+        async def command(statement: str):
+            return await self._execute('command', statement, timeout=None,
+                                       settings={'max_execution_time': 0})
+        
+        async def query(statement: str) -> List[tuple]:
+            return (await self._execute('query', statement)).result_rows
+        
+        started = int((await query('SELECT toUnixTimestamp(now())'))[0][0])
+        newly_applied = []
+        try:
+            for version, name, steps in pending:
+                for step in steps:
+                    if callable(step):
+                        await step(command, query)
+                    else:
+                        await command(step)
+                
+                await self._execute('insert', 'schema_migrations', [(version, name, datetime.now())],
+                                    column_names=['version', 'name', 'applied_at'])
+                newly_applied.append(version)
+                logger.info(f"Applied schema migration {version}: {name}")
+        finally:
+            try:
+                await self._restore_rollups(started)
+            except Exception as e:
+                logger.error(f"Failed to restore rollup views: {e}")
+        
+        return newly_applied
+    
+    async def _restore_rollups(self, since: int):
+        """Re-create the rollup views and rebuild the months they may have missed"""
+        for table, bucket_function, _ in ROLLUP_TABLES:
+            await self._execute('command', rollup_view_ddl(table, bucket_function))
+        
+        months = (await self.execute_named(
+            'partitions_modified_since', {'table': 'tcp_telemetry', 'since': since}
+        )).result_rows
+        for month, in months:
+            await self.downsample_telemetry(month)
+    
+    async def _create_rollups(self):
+        """Create rollup tables and views, backfilling them on first creation"""
+        rollups_existed = all([
+            int(await self._execute('command', f'EXISTS TABLE {table}'))
+            for table, _, _ in ROLLUP_TABLES
+        ])
+        
+        for table, _, ttl in ROLLUP_TABLES:
+            await self._execute('command', rollup_table_ddl(table, ttl))
+        
+        for table, bucket_function, _ in ROLLUP_TABLES:
+            await self._execute('command', rollup_view_ddl(table, bucket_function))
+        
+        if not rollups_existed:
+            # Taken once every view exists: rows inserted before then are
+            # older than the cutoff and backfilled, later ones go through the
+            # views. A row stamped before the cutoff but inserted after the
+            # views were created (e.g. a spool replay) is counted twice, so
+            # pause ingest while the rollups are first created.
+            cutoff_ms = (await self._execute(
+                'query', 'SELECT toUnixTimestamp64Milli(now64(3))'
+            )).result_rows[0][0]
+            for table, _, _ in ROLLUP_TABLES:
+                await self.execute_named(f'backfill_{table}', {'until_ms': cutoff_ms},
+                                         method='command', timeout=None,
+                                         settings={'max_execution_time': 0, 'insert_deduplicate': 0})
+            logger.info("Backfilled agent feature rollups from existing telemetry")
+    
+    async def insert_telemetry(self, records: Union[List[TelemetryRecord], TelemetryBatch]):
         """
         Insert telemetry records in batch
         
         Args:
-            records: List of telemetry records to insert
+            records: List of telemetry records, or a TelemetryBatch (sent
+                through the columnar path)
         """
-        if not records:
+        if not len(records):
+            return
+        
+        if isinstance(records, TelemetryBatch):
+            await self.insert_telemetry_columnar(records)
             return
             
         try:
@@ -215,7 +883,7 @@ class ClickHouseClient:
             data = []
             for record in records:
                 data.append((
-                    record.timestamp,
+                    to_utc(record.timestamp),
                     record.agent_id,
                     record.transfer_id,
                     record.project_id,
@@ -243,64 +911,184 @@ class ClickHouseClient:
                 ))
             
             # Insert batch
-            self.client.insert('tcp_telemetry', data)
+            await self._execute('insert', 'tcp_telemetry', data, settings=_insert_settings())
             logger.info(f"Inserted {len(records)} telemetry records")
             
         except Exception as e:
             logger.error(f"Failed to insert telemetry: {e}")
             raise
     
+    async def insert_telemetry_columnar(self, data: ColumnarTelemetry,
+                                        table: str = 'tcp_telemetry',
+                                        dedup_token: Optional[str] = None) -> int:
+        """
+        Insert telemetry column-wise without building per-row Python objects
+        
+        The data is converted to an Arrow table and streamed to ClickHouse in
+        Arrow format, so the cost is dominated by column casts rather than a
+        Python loop over rows.
+        
+        Args:
+            data: pandas DataFrame, dict of NumPy arrays or Arrow table with
+                tcp_telemetry column names
+            table: Target table with the tcp_telemetry layout
+            dedup_token: insert_deduplication_token; retrying with the same
+                token never inserts the rows twice (random if omitted)
+                
+        Returns:
+            Number of rows inserted
+        """
+        arrow_table = to_telemetry_table(data)
+        if arrow_table.num_rows == 0:
+            return 0
+        
+        try:
+            await self._execute('insert_arrow', table, arrow_table,
+                                settings=_insert_settings(dedup_token))
+            logger.info(f"Inserted {arrow_table.num_rows} telemetry records (columnar)")
+            return arrow_table.num_rows
+            
+        except Exception as e:
+            logger.error(f"Failed to insert columnar telemetry: {e}")
+            raise
+    
     async def get_training_data(self, agent_id: Optional[str] = None, 
-                               hours: int = 24 * 7) -> pd.DataFrame:
+                               hours: int = 24 * 7,
+                               sample: Optional[TrainingSample] = None) -> pd.DataFrame:
         """
         Retrieve training data for ML models
         
         Args:
             agent_id: Specific agent ID (None for all agents)
             hours: Hours of historical data to retrieve
+            sample: Sample transfers by ratio and/or cap rows per agent (and
+                time bucket) on the server; None returns every row
             
         Returns:
             DataFrame with training features and targets
         """
         try:
-            where_clause = f"WHERE timestamp >= now() - INTERVAL {hours} HOUR"
+            name = 'training_data'
+            params = {'hours': hours}
+            
+            if sample is not None:
+                params['sample_ratio'] = sample.ratio
+                if sample.rows_per_agent is None:
+                    name = 'training_data_sampled'
+                else:
+                    name = 'training_data_stratified'
+                    params['rows_per_stratum'] = sample.rows_per_agent
+                    # One bucket spanning the window when only capping per agent
+                    params['bucket_seconds'] = (sample.bucket_minutes * 60
+                                                if sample.bucket_minutes else 0xFFFFFFFF)
+            
             if agent_id:
-                where_clause += f" AND agent_id = '{agent_id}'"
-            
-            query = f"""
-            SELECT 
-                timestamp,
-                agent_id,
-                bandwidth_mbps,
-                latency_ms,
-                packet_loss_rate,
-                jitter_ms,
-                rtt_ms,
-                cpu_usage,
-                memory_usage,
-                disk_io_mbps,
-                network_utilization,
-                hour_of_day,
-                day_of_week,
-                is_weekend,
-                chunk_size,
-                concurrent_connections,
-                throughput_mbps,
-                transfer_duration_ms,
-                bytes_transferred
-            FROM tcp_telemetry
-            {where_clause}
-            ORDER BY timestamp DESC
-            """
+                name += '_agent'
+                params['agent_id'] = agent_id
             
-            result = self.client.query_df(query)
-            logger.info(f"Retrieved {len(result)} training records")
+            result = await self.execute_named(name, params, method='query_df')
+            logger.info(f"Retrieved {len(result)} training records"
+                        f"{f' (sampled: {sample.to_dict()})' if sample else ''}")
             return result
             
         except Exception as e:
             logger.error(f"Failed to get training data: {e}")
             return pd.DataFrame()
     
+    async def get_training_data_since(self, cursor: Optional[TelemetryCursor] = None,
+                                      hours: int = 24 * 7, settle_seconds: int = 5
+                                      ) -> Tuple[pd.DataFrame, Optional[TelemetryCursor]]:
+        """
+        Retrieve training data newer than a watermark
+        
+        Rows come back in (timestamp, agent_id) order, strictly after the
+        cursor and older than settle_seconds, so repeated calls with the
+        returned cursor read each settled row once.
+        
+        Args:
+            cursor: (epoch milliseconds, agent_id) of the last row already
+                seen, or None to read the whole window
+            hours: Hours of historical data to consider
+            settle_seconds: Leave out rows this recent; inserts arriving later
+                than this behind their timestamp are not picked up
+            
+        Returns:
+            Tuple of (DataFrame with the get_training_data columns, cursor of
+            its last row or the unchanged cursor if nothing was new)
+        """
+        try:
+            after_ms, after_agent = cursor or (0, '')
+            result = await self.execute_named('training_data_since', {
+                'hours': hours,
+                'after_ms': after_ms,
+                'after_agent': after_agent,
+                'settle_seconds': settle_seconds
+            }, method='query_df')
+            
+            if len(result):
+                cursor = (int(result['cursor_ms'].iloc[-1]), str(result['agent_id'].iloc[-1]))
+            result = result.drop(columns='cursor_ms')
+            
+            logger.info(f"Retrieved {len(result)} new training records")
+            return result, cursor
+            
+        except Exception as e:
+            logger.error(f"Failed to get incremental training data: {e}")
+            return pd.DataFrame(), cursor
+    
+    async def stream_training_data(self, agent_id: Optional[str] = None,
+                                   hours: int = 24 * 7, block_rows: int = 100_000,
+                                   as_arrow: bool = False
+                                   ) -> AsyncIterator[Union[pd.DataFrame, pa.Table]]:
+        """
+        Stream training data in fixed-size blocks with bounded memory
+        
+        Rows are ordered by (agent_id, timestamp). The table is sorted by
+        agent and hour first, so the server reads in that order and only sorts
+        within each agent-hour instead of sorting the whole window.
+        
+        Args:
+            agent_id: Specific agent ID (None for all agents)
+            hours: Hours of historical data to retrieve
+            block_rows: Rows per yielded block (the last block may be smaller)
+            as_arrow: Yield Arrow tables instead of DataFrames
+            
+        Yields:
+            DataFrame (or Arrow table) blocks with the get_training_data columns
+        """
+        name = 'training_data_stream_agent' if agent_id else 'training_data_stream'
+        params = {'hours': hours, 'agent_id': agent_id} if agent_id else {'hours': hours}
+        template = get_query(name)
+        settings = {'max_block_size': block_rows, 'max_execution_time': 0}
+        
+        pending: List[pa.Table] = []
+        pending_rows = 0
+        total_rows = 0
+        
+        def emit(table: pa.Table):
+            return table if as_arrow else table.to_pandas()
+        
+        async for batch in self._stream('query_arrow_stream', template.sql,
+                                        parameters=template.bind(params), query_name=name,
+                                        settings=settings, use_strings=True):
+            table = batch if isinstance(batch, pa.Table) else pa.Table.from_batches([batch])
+            pending.append(table)
+            pending_rows += table.num_rows
+            
+            # Re-chunk server blocks into exactly block_rows (slices are zero-copy)
+            while pending_rows >= block_rows:
+                combined = pa.concat_tables(pending)
+                remainder = combined.slice(block_rows)
+                pending, pending_rows = [remainder], remainder.num_rows
+                total_rows += block_rows
+                yield emit(combined.slice(0, block_rows))
+        
+        if pending_rows:
+            total_rows += pending_rows
+            yield emit(pa.concat_tables(pending))
+        
+        logger.info(f"Streamed {total_rows} training records")
+    
     async def get_agent_features(self, agent_id: str, hours: int = 24) -> Dict[str, float]:
         """
         Get aggregated features for a specific agent
@@ -313,48 +1101,11 @@ class ClickHouseClient:
             Dictionary of computed features
         """
         try:
-            query = f"""
-            SELECT 
-                avg(bandwidth_mbps) as avg_bandwidth,
-                avg(latency_ms) as avg_latency,
-                avg(packet_loss_rate) as avg_packet_loss,
-                avg(jitter_ms) as avg_jitter,
-                avg(rtt_ms) as avg_rtt,
-                max(throughput_mbps) as max_throughput,
-                avg(throughput_mbps) as avg_throughput,
-                min(throughput_mbps) as min_throughput,
-                stddevPop(throughput_mbps) as throughput_std,
-                count() as transfer_count,
-                sum(bytes_transferred) as total_bytes,
-                avg(cpu_usage) as avg_cpu,
-                avg(memory_usage) as avg_memory,
-                avg(disk_io_mbps) as avg_disk_io,
-                avg(network_utilization) as avg_network_util
-            FROM tcp_telemetry 
-            WHERE agent_id = '{agent_id}' 
-              AND timestamp >= now() - INTERVAL {hours} HOUR
-            """
-            
-            result = self.client.query(query).result_rows
+            result = (await self.execute_named(
+                'agent_features', {'agent_id': agent_id, 'hours': hours}, cached=True
+            )).result_rows
             if result:
-                row = result[0]
-                return {
-                    'avg_bandwidth': row[0] or 0.0,
-                    'avg_latency': row[1] or 0.0,
-                    'avg_packet_loss': row[2] or 0.0,
-                    'avg_jitter': row[3] or 0.0,
-                    'avg_rtt': row[4] or 0.0,
-                    'max_throughput': row[5] or 0.0,
-                    'avg_throughput': row[6] or 0.0,
-                    'min_throughput': row[7] or 0.0,
-                    'throughput_std': row[8] or 0.0,
-                    'transfer_count': row[9] or 0,
-                    'total_bytes': row[10] or 0,
-                    'avg_cpu': row[11] or 0.0,
-                    'avg_memory': row[12] or 0.0,
-                    'avg_disk_io': row[13] or 0.0,
-                    'avg_network_util': row[14] or 0.0
-                }
+                return agent_features_from_row(result[0])
             else:
                 return {}
                 
@@ -362,6 +1113,36 @@ class ClickHouseClient:
             logger.error(f"Failed to get agent features: {e}")
             return {}
     
+    async def get_agent_features_many(self, agent_ids: List[str],
+                                      hours: int = 24) -> Dict[str, Dict[str, float]]:
+        """
+        Get aggregated features for many agents in a single query
+        
+        Args:
+            agent_ids: Agent identifiers
+            hours: Hours of historical data to analyze
+            
+        Returns:
+            Dictionary keyed by agent ID with the get_agent_features fields;
+            agents without data get zeroed features
+        """
+        if not agent_ids:
+            return {}
+        
+        try:
+            result = (await self.execute_named(
+                'agent_features_many',
+                {'agent_ids': list(agent_ids), 'hours': hours}, cached=True
+            )).result_rows
+            
+            features = {row[0]: agent_features_from_row(row[1:]) for row in result}
+            empty = agent_features_from_row([None] * len(AGENT_FEATURE_FIELDS))
+            return {agent_id: features.get(agent_id, dict(empty)) for agent_id in agent_ids}
+            
+        except Exception as e:
+            logger.error(f"Failed to get features for {len(agent_ids)} agents: {e}")
+            return {}
+    
     async def get_real_time_analytics(self, minutes: int = 60) -> Dict[str, Any]:
         """
         Get real-time transfer analytics
@@ -373,41 +1154,120 @@ class ClickHouseClient:
             Dictionary with analytics data
         """
         try:
-            query = f"""
-            SELECT 
-                toStartOfMinute(timestamp) as minute,
-                count() as transfer_count,
-                avg(throughput_mbps) as avg_throughput,
-                max(throughput_mbps) as max_throughput,
-                avg(latency_ms) as avg_latency,
-                avg(packet_loss_rate) as avg_packet_loss,
-                countIf(optimization_applied != '') as optimized_transfers,
-                avg(improvement_percent) as avg_improvement
-            FROM tcp_telemetry 
-            WHERE timestamp >= now() - INTERVAL {minutes} MINUTE
-            GROUP BY minute
-            ORDER BY minute DESC
-            LIMIT 60
-            """
-            
-            result = self.client.query_df(query)
+            result = await self.execute_named(
+                'real_time_analytics', {'minutes': minutes}, method='query_df', cached=True
+            )
             
-            return {
-                'timeline': result.to_dict('records'),
-                'summary': {
-                    'total_transfers': int(result['transfer_count'].sum()),
-                    'avg_throughput': float(result['avg_throughput'].mean()),
-                    'peak_throughput': float(result['max_throughput'].max()),
-                    'avg_latency': float(result['avg_latency'].mean()),
-                    'optimization_rate': float(result['optimized_transfers'].sum() / result['transfer_count'].sum() * 100) if result['transfer_count'].sum() > 0 else 0.0,
-                    'avg_improvement': float(result['avg_improvement'].mean())
-                }
-            }
+            return _analytics_timeline(result)
             
         except Exception as e:
             logger.error(f"Failed to get real-time analytics: {e}")
             return {}
     
+    async def get_hourly_analytics(self, agent_id: Optional[str] = None,
+                                   since: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Get pre-aggregated hourly transfer analytics
+        
+        Args:
+            agent_id: Specific agent ID (None for all agents)
+            since: Earliest hour to include (default: last 24 hours); the
+                hour containing this time is included in full
+                
+        Returns:
+            DataFrame with one row per agent per hour
+        """
+        try:
+            # Whole hours only; also keeps the default stable for the result cache
+            since = since or datetime.now() - timedelta(hours=24)
+            since = since.replace(minute=0, second=0, microsecond=0)
+            if agent_id:
+                result = await self.execute_named(
+                    'hourly_analytics_agent', {'agent_id': agent_id, 'since': since},
+                    method='query_df', cached=True
+                )
+            else:
+                result = await self.execute_named(
+                    'hourly_analytics', {'since': since}, method='query_df', cached=True
+                )
+            
+            logger.info(f"Retrieved {len(result)} hourly analytics rows")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to get hourly analytics: {e}")
+            return pd.DataFrame()
+    
+    async def get_project_training_data(self, project_id: str,
+                                        hours: int = 24 * 7) -> pd.DataFrame:
+        """
+        Retrieve training data for every agent in a project
+        
+        Served by the (project_id, timestamp) projection, so only the
+        project's granules are read.
+        
+        Args:
+            project_id: Project identifier
+            hours: Hours of historical data to retrieve
+            
+        Returns:
+            DataFrame with the get_training_data columns
+        """
+        try:
+            result = await self.execute_named(
+                'training_data_project', {'project_id': project_id, 'hours': hours},
+                method='query_df'
+            )
+            logger.info(f"Retrieved {len(result)} training records for project {project_id}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Failed to get project training data: {e}")
+            return pd.DataFrame()
+    
+    async def get_project_analytics(self, project_id: str, minutes: int = 60) -> Dict[str, Any]:
+        """
+        Get real-time transfer analytics for one project
+        
+        Args:
+            project_id: Project identifier
+            minutes: Minutes of recent data to analyze
+            
+        Returns:
+            Dictionary with the get_real_time_analytics layout
+        """
+        try:
+            result = await self.execute_named(
+                'project_analytics', {'project_id': project_id, 'minutes': minutes},
+                method='query_df', cached=True
+            )
+            return _analytics_timeline(result)
+            
+        except Exception as e:
+            logger.error(f"Failed to get project analytics: {e}")
+            return {}
+    
+    async def get_project_agent_summary(self, project_id: str, hours: int = 24) -> pd.DataFrame:
+        """
+        Get per-agent transfer totals for one project
+        
+        Args:
+            project_id: Project identifier
+            hours: Hours of historical data to analyze
+            
+        Returns:
+            DataFrame with one row per agent, busiest first
+        """
+        try:
+            return await self.execute_named(
+                'project_agent_summary', {'project_id': project_id, 'hours': hours},
+                method='query_df', cached=True
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to get project agent summary: {e}")
+            return pd.DataFrame()
+    
     async def record_model_performance(self, model_name: str, model_version: str,
                                      metrics: Dict[str, float], training_samples: int,
                                      inference_time_ms: float):
@@ -434,48 +1294,154 @@ class ClickHouseClient:
                 inference_time_ms
             )]
             
-            self.client.insert('ml_model_performance', data)
+            await self._execute('insert', 'ml_model_performance', data)
             logger.info(f"Recorded performance for model {model_name} v{model_version}")
             
         except Exception as e:
             logger.error(f"Failed to record model performance: {e}")
     
-    async def cleanup_old_data(self, days: int = 365):
+    async def cleanup_old_data(self, days: int = 365, downsample: bool = True) -> List[int]:
         """
-        Manually cleanup data older than specified days
+        Drop whole months of raw telemetry older than specified days
+        
+        Partitions are dropped instead of running an ALTER TABLE DELETE
+        mutation, so rows are kept until their entire month is outside the
+        window (up to a month longer than `days`).
         
         Args:
             days: Number of days to keep
+            downsample: Make sure the rollups cover each month before dropping it
+            
+        Returns:
+            Months (YYYYMM) dropped
         """
         try:
-            query = f"""
-            ALTER TABLE tcp_telemetry 
-            DELETE WHERE timestamp < now() - INTERVAL {days} DAY
-            """
+            months = await self._expired_partitions('tcp_telemetry', days)
+            for month in months:
+                if downsample:
+                    await self.downsample_telemetry(month)
+                await self._drop_partition('tcp_telemetry', month)
             
-            self.client.command(query)
-            logger.info(f"Cleaned up telemetry data older than {days} days")
+            logger.info(f"Dropped {len(months)} telemetry partitions older than {days} days")
+            return months
             
         except Exception as e:
             logger.error(f"Failed to cleanup old data: {e}")
+            return []
+    
+    async def downsample_telemetry(self, month: int) -> List[str]:
+        """
+        Roll one month of raw telemetry into the per-minute and per-hour rollups
+        
+        The materialized views normally keep the rollups complete; a month is
+        only rebuilt from raw rows when a rollup holds fewer transfers than
+        the raw table (e.g. rows inserted while the views were missing).
+        
+        The month is rebuilt in a staging table and swapped in with REPLACE
+        PARTITION while the views stay live, so readers never see it empty
+        and no row is counted twice. Rows of that month inserted during the
+        rebuild are dropped from the rollup by the swap; the next call finds
+        the month short again and repairs it. Pause ingest for a rebuild that
+        is complete in one pass.
+        
+        Args:
+            month: tcp_telemetry partition (YYYYMM)
+            
+        Returns:
+            Rollup tables rebuilt
+        """
+        rebuilt = []
+        for table, _, _ in ROLLUP_TABLES:
+            raw_rows, rollup_rows = (await self.execute_named(
+                f'rollup_coverage_{table}', {'month': month}
+            )).result_rows[0]
+            if rollup_rows >= raw_rows:
+                continue
+            
+            staging = f"{table}{DOWNSAMPLE_STAGING_SUFFIX}"
+            await self._execute('command', f"DROP TABLE IF EXISTS {staging}")
+            await self._execute('command', f"CREATE TABLE {staging} AS {table}")
+            try:
+                await self.execute_named(f'downsample_{table}', {'month': month}, method='command',
+                                         timeout=None, settings={'max_execution_time': 0, 'insert_deduplicate': 0})
+                await self._execute('command', f"ALTER TABLE {table} REPLACE PARTITION ID '{int(month)}' FROM {staging}")
+            finally:
+                await self._execute('command', f"DROP TABLE IF EXISTS {staging}")
+            rebuilt.append(table)
+            logger.info(f"Rebuilt {table} for {month} from {raw_rows} raw rows")
+        
+        return rebuilt
+    
+    async def apply_retention(self, tiers: List[Tuple[str, int]] = RETENTION_TIERS) -> Dict[str, List[int]]:
+        """
+        Enforce tiered retention by dropping expired monthly partitions
+        
+        Raw telemetry is downsampled into the rollups before it is dropped,
+        so long-range history stays queryable from agent_features_1m and
+        agent_features_1h after the raw rows are gone.
+        
+        Args:
+            tiers: (table, days to keep) pairs, e.g. RETENTION_TIERS
+            
+        Returns:
+            Months (YYYYMM) dropped per table
+        """
+        dropped = {}
+        for table, days in tiers:
+            if table == 'tcp_telemetry':
+                dropped[table] = await self.cleanup_old_data(days)
+                continue
+            
+            try:
+                dropped[table] = await self._expired_partitions(table, days)
+                for month in dropped[table]:
+                    await self._drop_partition(table, month)
+                logger.info(f"Dropped {len(dropped[table])} {table} partitions older than {days} days")
+            except Exception as e:
+                logger.error(f"Failed to apply retention to {table}: {e}")
+                dropped[table] = []
+        
+        return dropped
+    
+    async def _expired_partitions(self, table: str, days: int) -> List[int]:
+        """Monthly partitions of a table whose rows are all older than days"""
+        result = await self.execute_named('expired_partitions', {'table': table, 'days': days})
+        return [row[0] for row in result.result_rows]
+    
+    async def _drop_partition(self, table: str, month: int):
+        """Drop one monthly partition (YYYYMM)"""
+        await self._execute('command', f"ALTER TABLE {table} DROP PARTITION ID '{int(month)}'")
     
     def close(self):
-        """Close the ClickHouse connection"""
+        """Close all pooled ClickHouse connections"""
+        for session in self._clients:
+            session.close()
+        if self._executor:
+            self._executor.shutdown(wait=False)
         if self.client:
-            self.client.close()
             logger.info("ClickHouse connection closed")
+        self._clients = []
+        self._pool = None
+        self._executor = None
+        self.client = None
 
 # Utility functions for easy access
 async def create_clickhouse_client(host: str = 'localhost', port: int = 8123,
                                  username: str = 'tcp_user', password: str = 'tcp_password',
-                                 database: str = 'tcp_optimization') -> ClickHouseClient:
+                                 database: str = 'tcp_optimization', pool_size: int = 8,
+                                 query_timeout: Optional[float] = 30.0,
+                                 acquire_timeout: Optional[float] = None,
+                                 cache: Optional[QueryCache] = None,
+                                 profiler: Optional[QueryProfiler] = None) -> ClickHouseClient:
     """
     Create and initialize ClickHouse client
     
     Returns:
         Initialized ClickHouseClient instance
     """
-    client = ClickHouseClient(host, port, username, password, database)
+    client = ClickHouseClient(host, port, username, password, database,
+                              pool_size=pool_size, query_timeout=query_timeout,
+                              acquire_timeout=acquire_timeout, cache=cache, profiler=profiler)
     
     if await client.connect():
         await client.initialize_schema()
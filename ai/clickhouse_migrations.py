@@ -0,0 +1,275 @@
+"""
+ClickHouse Schema Migrations
+Baseline tcp_telemetry layout and versioned upgrades applied by ClickHouseClient
+"""
+
+from typing import Any, Awaitable, Callable, List, Tuple, Union
+
+from clickhouse_queries import ROLLUP_TABLES, TRAINING_COLUMNS, rollup_view_ddl
+
+# Baseline (version 0) telemetry table; later layouts are reached through MIGRATIONS
+TELEMETRY_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    timestamp DateTime64(3),
+    agent_id String,
+    transfer_id String,
+    project_id String,
+
+    -- Network Metrics
+    bandwidth_mbps Float64,
+    latency_ms Float64,
+    packet_loss_rate Float64,
+    jitter_ms Float64,
+    rtt_ms Float64,
+
+    -- Transfer Metrics
+    throughput_mbps Float64,
+    bytes_transferred UInt64,
+    transfer_duration_ms UInt64,
+    chunk_size UInt32,
+    concurrent_connections UInt16,
+
+    -- System Metrics
+    cpu_usage Float64,
+    memory_usage Float64,
+    disk_io_mbps Float64,
+    network_utilization Float64,
+
+    -- Environmental
+    hour_of_day UInt8,
+    day_of_week UInt8,
+    is_weekend UInt8,
+
+    -- Optimization Results
+    predicted_throughput Float64,
+    actual_throughput Float64,
+    optimization_applied String,
+    improvement_percent Float64
+)
+ENGINE = MergeTree()
+PARTITION BY toYYYYMM(timestamp)
+ORDER BY (agent_id, timestamp)
+TTL timestamp + INTERVAL 1 YEAR
+"""
+
+SCHEMA_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version UInt32,
+    name String,
+    applied_at DateTime64(3)
+)
+ENGINE = MergeTree()
+ORDER BY version
+"""
+
+# Client-side call profiles written by ClickHouseClient when a QueryProfiler has a log_table
+QUERY_LOG_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    event_time DateTime64(3),
+    caller LowCardinality(String),
+    query LowCardinality(String),
+    method LowCardinality(String),
+    wall_ms Float64,
+    wait_ms Float64,
+    read_rows UInt64,
+    read_bytes UInt64,
+    written_rows UInt64,
+    written_bytes UInt64,
+    result_rows UInt64,
+    result_bytes UInt64,
+    query_id String,
+    error String
+)
+ENGINE = MergeTree()
+PARTITION BY toYYYYMM(event_time)
+ORDER BY (caller, query, event_time)
+TTL toDateTime(event_time) + INTERVAL 30 DAY
+"""
+
+# Metrics stored as Float32: sensor-style readings with a few significant digits.
+# packet_loss_rate stays Float64 because its values sit close to zero.
+FLOAT32_METRICS = [
+    'bandwidth_mbps', 'latency_ms', 'jitter_ms', 'rtt_ms', 'throughput_mbps',
+    'cpu_usage', 'memory_usage', 'disk_io_mbps', 'network_utilization',
+    'predicted_throughput', 'actual_throughput', 'improvement_percent',
+]
+
+def telemetry_compression_alters(table: str = 'tcp_telemetry') -> List[str]:
+    """
+    ALTER statements for the compressed telemetry layout (schema version 1)
+
+    Args:
+        table: Telemetry table to upgrade
+
+    Returns:
+        Statements to run in order
+    """
+    columns = [
+        'timestamp DateTime64(3) CODEC(Delta, ZSTD(1))',
+        'agent_id LowCardinality(String) CODEC(ZSTD(1))',
+        'transfer_id String CODEC(ZSTD(3))',
+        'project_id LowCardinality(String) CODEC(ZSTD(1))',
+        'optimization_applied LowCardinality(String) CODEC(ZSTD(1))',
+        'packet_loss_rate Float64 CODEC(ZSTD(1))',
+        'bytes_transferred UInt64 CODEC(T64, ZSTD(1))',
+        'transfer_duration_ms UInt64 CODEC(T64, ZSTD(1))',
+        'chunk_size UInt32 CODEC(T64, ZSTD(1))',
+        'concurrent_connections UInt16 CODEC(T64, ZSTD(1))',
+        'hour_of_day UInt8 CODEC(ZSTD(1))',
+        'day_of_week UInt8 CODEC(ZSTD(1))',
+        'is_weekend UInt8 CODEC(ZSTD(1))',
+    ] + [f'{column} Float32 CODEC(ZSTD(1))' for column in FLOAT32_METRICS]
+
+    indexes = [
+        # Point lookups by transfer and project filters
+        'idx_transfer_id transfer_id TYPE bloom_filter(0.01) GRANULARITY 4',
+        'idx_project_id project_id TYPE bloom_filter(0.01) GRANULARITY 4',
+        # Time-window scans without an agent filter cannot use the primary key
+        'idx_timestamp timestamp TYPE minmax GRANULARITY 1',
+    ]
+
+    statements = [
+        f"ALTER TABLE {table} " + ', '.join(f"MODIFY COLUMN {column}" for column in columns)
+    ]
+    for index in indexes:
+        statements.append(f"ALTER TABLE {table} ADD INDEX IF NOT EXISTS {index}")
+    for index in indexes:
+        statements.append(f"ALTER TABLE {table} MATERIALIZE INDEX {index.split()[0]}")
+    return statements
+
+# Alternative sort orders kept alongside the (agent_id, timestamp) primary order:
+# (projection, SELECT list, ORDER BY)
+TELEMETRY_PROJECTIONS = [
+    # Project-scoped reads: full rows so any project query can be served
+    ('proj_project_time', '*', 'project_id, timestamp'),
+    # Time-window reads across all agents: only the training columns
+    ('proj_time', ', '.join(TRAINING_COLUMNS), 'timestamp'),
+]
+
+def telemetry_projection_alters(table: str = 'tcp_telemetry') -> List[str]:
+    """
+    ALTER statements adding the alternative sort-order projections (schema version 2)
+
+    New parts get the projections on insert; existing parts are rebuilt by a
+    background MATERIALIZE PROJECTION mutation.
+
+    Args:
+        table: Telemetry table to upgrade
+
+    Returns:
+        Statements to run in order
+    """
+    statements = [
+        f"ALTER TABLE {table} ADD PROJECTION IF NOT EXISTS {name} (SELECT {columns} ORDER BY {order})"
+        for name, columns, order in TELEMETRY_PROJECTIONS
+    ]
+    statements += [
+        f"ALTER TABLE {table} MATERIALIZE PROJECTION {name}"
+        for name, _, _ in TELEMETRY_PROJECTIONS
+    ]
+    return statements
+
+# Rows stamped up to this long before the copy started may still be in flight
+# (buffers, retries) and are re-checked against the rebuilt table
+SAMPLING_REBUILD_TAIL_MARGIN = '1 HOUR'
+
+async def telemetry_sampling_rebuild(command: Callable[[str], Awaitable[Any]],
+                                     query: Callable[[str], Awaitable[List[tuple]]],
+                                     table: str = 'tcp_telemetry'):
+    """
+    Rebuild the telemetry table with a sampling key (schema version 3)
+
+    SAMPLE BY must be part of the primary key, which cannot be altered in
+    place, so the table is copied into one sorted by
+    (agent_id, hour, sample_key, timestamp) and swapped in. Within each agent
+    hour rows are ordered by the transfer hash, so a sample reads a matching
+    fraction of the granules. Codecs, skip indexes and projections carry over.
+
+    The swap is a single EXCHANGE TABLES, so the table always exists, and the
+    rebuild can be re-run after a failure at any step: before the swap it
+    starts over, after it it resumes at the tail copy. Rows that reached the
+    old table while it was being copied (stamped after the copy started, less
+    SAMPLING_REBUILD_TAIL_MARGIN) are carried over before it is dropped;
+    pause ingest if late rows with older timestamps can arrive.
+
+    Args:
+        command: Runs a statement
+        query: Runs a query and returns its rows
+        table: Telemetry table to rebuild
+    """
+    staging = f"{table}_sampled"
+
+    async def table_info(name: str, column: str) -> Any:
+        rows = await query(f"SELECT {column} FROM system.tables "
+                           f"WHERE database = currentDatabase() AND name = '{name}'")
+        return rows[0][0] if rows else None
+
+    if not await table_info(table, 'sampling_key'):
+        # Whole transfers are kept or dropped together
+        await command(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "
+                      f"sample_key UInt32 MATERIALIZED xxHash32(transfer_id) CODEC(ZSTD(1))")
+        await command(f"DROP TABLE IF EXISTS {staging}")
+        copy_start_ms = (await query("SELECT toUnixTimestamp64Milli(now64(3))"))[0][0]
+        # The copy start travels with the table so a resumed rebuild knows its tail
+        await command(f"""
+        CREATE TABLE {staging} AS {table}
+        ENGINE = MergeTree()
+        PARTITION BY toYYYYMM(timestamp)
+        ORDER BY (agent_id, toStartOfHour(timestamp), sample_key, timestamp)
+        SAMPLE BY sample_key
+        TTL timestamp + INTERVAL 1 YEAR
+        COMMENT 'copy_start_ms={copy_start_ms}'
+        """)
+        await command(f"INSERT INTO {staging} SELECT * FROM {table}")
+        await command(f"EXCHANGE TABLES {table} AND {staging}")
+
+    # After the swap staging holds the old table (tcp_telemetry_unsampled is
+    # where earlier versions of this migration left it)
+    comment = await table_info(table, 'comment') or ''
+    # Without a recorded copy start every row is re-checked
+    copy_start_ms = int(comment.split('=', 1)[1]) if comment.startswith('copy_start_ms=') else 0
+    tail = (f"timestamp >= fromUnixTimestamp64Milli({copy_start_ms}) "
+            f"- INTERVAL {SAMPLING_REBUILD_TAIL_MARGIN}")
+    for previous in [staging, f"{table}_unsampled"]:
+        if await table_info(previous, 'name') is None:
+            continue
+        # Rows the old table received after the copy, skipping any already present
+        await command(f"""
+        INSERT INTO {table}
+        SELECT * FROM {previous}
+        WHERE {tail}
+          AND (agent_id, transfer_id, timestamp) NOT IN (
+              SELECT agent_id, transfer_id, timestamp FROM {table} WHERE {tail}
+          )
+        """)
+        await command(f"DROP TABLE {previous}")
+    await command(f"ALTER TABLE {table} MODIFY COMMENT ''")
+
+# Views are dropped around changes to tcp_telemetry's columns or table. Rows
+# inserted while they are gone miss the rollups; apply_migrations re-creates
+# the views (even if a migration fails) and rebuilds the months they missed.
+_drop_views = [f"DROP VIEW IF EXISTS {table}_mv" for table, _, _ in ROLLUP_TABLES]
+_create_views = [rollup_view_ddl(table, bucket_function) for table, bucket_function, _ in ROLLUP_TABLES]
+
+# A migration step is a statement, or a coroutine function called with
+# (command, query) for steps that need to inspect the current state
+MigrationStep = Union[str, Callable[..., Awaitable[None]]]
+
+# (version, name, steps) applied in order and recorded in schema_migrations
+MIGRATIONS: List[Tuple[int, str, List[MigrationStep]]] = [
+    (1, 'tcp_telemetry_codecs_and_indexes',
+     _drop_views + telemetry_compression_alters() + _create_views),
+    (2, 'tcp_telemetry_projections', telemetry_projection_alters()),
+    (3, 'tcp_telemetry_sample_key', _drop_views + [telemetry_sampling_rebuild] + _create_views),
+    # TTL expiry drops whole parts instead of rewriting them
+    (4, 'ttl_only_drop_parts', [
+        f"ALTER TABLE {table} MODIFY SETTING ttl_only_drop_parts = 1"
+        for table in ['tcp_telemetry'] + [table for table, _, _ in ROLLUP_TABLES]
+    ]),
+    # Token-based insert deduplication for replayed batches (rollups follow
+    # via deduplicate_blocks_in_dependent_materialized_views)
+    (5, 'telemetry_insert_deduplication', [
+        f"ALTER TABLE {table} MODIFY SETTING non_replicated_deduplication_window = 1000"
+        for table in ['tcp_telemetry'] + [table for table, _, _ in ROLLUP_TABLES]
+    ]),
+]
@@ -0,0 +1,427 @@
+"""
+Named ClickHouse Query Templates
+Pre-registered SQL with server-side parameter binding for ClickHouseClient
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional
+
+# ClickHouse server-side parameter placeholder: {name:Type}
+_PLACEHOLDER_RE = re.compile(r'\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*:\s*[^{}]+\}')
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    """Fixed SQL text whose values are bound on the server"""
+    name: str
+    sql: str
+    parameters: FrozenSet[str] = field(default_factory=frozenset)
+
+    def bind(self, values: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Validate parameter values against the template placeholders
+
+        Args:
+            values: Parameter values keyed by placeholder name
+
+        Returns:
+            Parameters to send alongside the unchanged SQL text
+        """
+        values = values or {}
+        missing = self.parameters - values.keys()
+        if missing:
+            raise ValueError(f"Query '{self.name}' missing parameters: {sorted(missing)}")
+        unexpected = values.keys() - self.parameters
+        if unexpected:
+            raise ValueError(f"Query '{self.name}' got unexpected parameters: {sorted(unexpected)}")
+        return dict(values)
+
+QUERY_TEMPLATES: Dict[str, QueryTemplate] = {}
+
+def register_query(name: str, sql: str, replace: bool = False) -> QueryTemplate:
+    """
+    Register a named query template
+
+    Args:
+        name: Template name used by ClickHouseClient.execute_named
+        sql: SQL text with {name:Type} placeholders
+        replace: Allow overwriting an existing template
+
+    Returns:
+        The registered template
+    """
+    if name in QUERY_TEMPLATES and not replace:
+        raise ValueError(f"Query template already registered: {name}")
+
+    sql = ' '.join(sql.split())
+    template = QueryTemplate(
+        name=name,
+        sql=sql,
+        parameters=frozenset(_PLACEHOLDER_RE.findall(sql))
+    )
+    QUERY_TEMPLATES[name] = template
+    return template
+
+def get_query(name: str) -> QueryTemplate:
+    """Look up a registered query template"""
+    try:
+        return QUERY_TEMPLATES[name]
+    except KeyError:
+        raise KeyError(f"Unknown query template: {name}") from None
+
+# Training data
+
+# Columns returned by the training data readers
+TRAINING_COLUMNS = [
+    'timestamp', 'agent_id',
+    'bandwidth_mbps', 'latency_ms', 'packet_loss_rate', 'jitter_ms', 'rtt_ms',
+    'cpu_usage', 'memory_usage', 'disk_io_mbps', 'network_utilization',
+    'hour_of_day', 'day_of_week', 'is_weekend',
+    'chunk_size', 'concurrent_connections',
+    'throughput_mbps', 'transfer_duration_ms', 'bytes_transferred',
+]
+
+TRAINING_SELECT = f"""
+SELECT {', '.join(TRAINING_COLUMNS)}
+FROM tcp_telemetry
+WHERE timestamp >= now() - toIntervalHour({{hours:UInt32}})
+"""
+
+for _suffix, _order in [('', 'timestamp DESC'), ('_stream', 'agent_id, timestamp')]:
+    register_query(f'training_data{_suffix}', f"{TRAINING_SELECT} ORDER BY {_order}")
+    register_query(
+        f'training_data{_suffix}_agent',
+        f"{TRAINING_SELECT} AND agent_id = {{agent_id:String}} ORDER BY {_order}"
+    )
+
+# Sampled reads. The sample_key range condition is what SAMPLE <ratio> expands
+# to, written out so the ratio can be bound as a parameter.
+_SAMPLE_FILTER = "AND sample_key < toUInt64({sample_ratio:Float64} * 4294967296)"
+# Rows per (agent, time bucket) stratum, chosen by sampling key order
+_STRATUM = "agent_id, intDiv(toUnixTimestamp(timestamp), {bucket_seconds:UInt32})"
+
+for _suffix, _agent_filter in [('', ''), ('_agent', 'AND agent_id = {agent_id:String}')]:
+    register_query(
+        f'training_data_sampled{_suffix}',
+        f"{TRAINING_SELECT} {_SAMPLE_FILTER} {_agent_filter} ORDER BY timestamp DESC"
+    )
+    register_query(f'training_data_stratified{_suffix}', f"""
+    SELECT {', '.join(TRAINING_COLUMNS)}
+    FROM (
+        {TRAINING_SELECT} {_SAMPLE_FILTER} {_agent_filter}
+        ORDER BY {_STRATUM}, sample_key
+        LIMIT {{rows_per_stratum:UInt64}} BY {_STRATUM}
+    )
+    ORDER BY timestamp DESC
+    """)
+
+# Incremental reads: rows strictly after a (timestamp, agent_id) cursor, in
+# cursor order, excluding the last few seconds so late inserts can settle
+register_query('training_data_since', f"""
+SELECT {', '.join(TRAINING_COLUMNS)}, toUnixTimestamp64Milli(timestamp) AS cursor_ms
+FROM tcp_telemetry
+WHERE timestamp >= greatest(now() - toIntervalHour({{hours:UInt32}}),
+                            fromUnixTimestamp64Milli({{after_ms:Int64}}))
+  AND timestamp < now() - toIntervalSecond({{settle_seconds:UInt32}})
+  AND (toUnixTimestamp64Milli(timestamp), agent_id) > ({{after_ms:Int64}}, {{after_agent:String}})
+ORDER BY timestamp, agent_id
+""")
+
+register_query('training_data_project', f"""
+{TRAINING_SELECT} AND project_id = {{project_id:String}} ORDER BY timestamp DESC
+""")
+
+# Rollups
+
+# Aggregate states kept per agent per bucket: (state column, function, source expression, argument type)
+ROLLUP_STATES = [
+    ('bandwidth_avg', 'avg', 'bandwidth_mbps', 'Float64'),
+    ('latency_avg', 'avg', 'latency_ms', 'Float64'),
+    ('packet_loss_avg', 'avg', 'packet_loss_rate', 'Float64'),
+    ('jitter_avg', 'avg', 'jitter_ms', 'Float64'),
+    ('rtt_avg', 'avg', 'rtt_ms', 'Float64'),
+    ('throughput_max', 'max', 'throughput_mbps', 'Float64'),
+    ('throughput_avg', 'avg', 'throughput_mbps', 'Float64'),
+    ('throughput_min', 'min', 'throughput_mbps', 'Float64'),
+    ('throughput_std', 'stddevPop', 'throughput_mbps', 'Float64'),
+    ('transfer_count', 'count', '', ''),
+    ('total_bytes', 'sum', 'bytes_transferred', 'UInt64'),
+    ('cpu_avg', 'avg', 'cpu_usage', 'Float64'),
+    ('memory_avg', 'avg', 'memory_usage', 'Float64'),
+    ('disk_io_avg', 'avg', 'disk_io_mbps', 'Float64'),
+    ('network_util_avg', 'avg', 'network_utilization', 'Float64'),
+    ('optimized_count', 'sum', "optimization_applied != ''", 'UInt64'),
+    ('improvement_avg', 'avg', 'improvement_percent', 'Float64'),
+]
+
+_ROLLUP_FUNCTIONS = {column: function for column, function, _, _ in ROLLUP_STATES}
+
+# Rollup tables from finest to coarsest: (table, bucket function, TTL)
+ROLLUP_TABLES = [
+    ('agent_features_1m', 'toStartOfMinute', 'INTERVAL 1 YEAR'),
+    ('agent_features_1h', 'toStartOfHour', 'INTERVAL 3 YEAR'),
+]
+
+# Suffix of the table a rollup month is rebuilt in before it replaces the live partition
+DOWNSAMPLE_STAGING_SUFFIX = '_downsample'
+
+def _rollup_state_list() -> str:
+    """State column names as selected from a rollup table"""
+    return ', '.join(column for column, _, _, _ in ROLLUP_STATES)
+
+def rollup_state_select() -> str:
+    """-State aggregates over raw tcp_telemetry rows, aliased to the rollup columns"""
+    # Sources are cast to the state argument type so the states stay
+    # compatible whatever physical type the telemetry column has
+    return ', '.join(
+        f"{function}State({f'to{arg_type}({source})' if arg_type else source}) AS {column}"
+        for column, function, source, arg_type in ROLLUP_STATES
+    )
+
+def rollup_merge(column: str) -> str:
+    """Finalising -Merge expression for a rollup state column"""
+    return f"{_ROLLUP_FUNCTIONS[column]}Merge({column})"
+
+def rollup_table_ddl(table: str, ttl: str) -> str:
+    """CREATE TABLE statement for a rollup table"""
+    states = ',\n        '.join(
+        f"{column} AggregateFunction({function}{', ' + arg_type if arg_type else ''})"
+        for column, function, _, arg_type in ROLLUP_STATES
+    )
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        agent_id String,
+        bucket DateTime,
+        {states}
+    )
+    ENGINE = AggregatingMergeTree()
+    PARTITION BY toYYYYMM(bucket)
+    ORDER BY (agent_id, bucket)
+    TTL bucket + {ttl}
+    """
+
+def rollup_view_ddl(table: str, bucket_function: str) -> str:
+    """CREATE MATERIALIZED VIEW statement feeding a rollup table from tcp_telemetry"""
+    return f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {table}_mv TO {table}
+    AS SELECT
+        agent_id,
+        {bucket_function}(timestamp) AS bucket,
+        {rollup_state_select()}
+    FROM tcp_telemetry
+    GROUP BY agent_id, bucket
+    """
+
+def rollup_backfill_sql(table: str, bucket_function: str,
+                        condition: str = 'timestamp < fromUnixTimestamp64Milli({until_ms:Int64})',
+                        target: Optional[str] = None) -> str:
+    """INSERT statement that builds rollup rows for the telemetry matching a condition (into target, default table)"""
+    return f"""
+    INSERT INTO {target or table}
+    SELECT
+        agent_id,
+        {bucket_function}(timestamp) AS bucket,
+        {rollup_state_select()}
+    FROM tcp_telemetry
+    WHERE {condition}
+    GROUP BY agent_id, bucket
+    """
+
+for _table, _bucket_function, _ in ROLLUP_TABLES:
+    register_query(f'backfill_{_table}', rollup_backfill_sql(_table, _bucket_function))
+    
+    # Downsampling: rebuild one month (a tcp_telemetry partition) of a rollup
+    # into its staging table, which then replaces the live partition
+    register_query(f'downsample_{_table}', rollup_backfill_sql(
+        _table, _bucket_function, 'toYYYYMM(timestamp) = {month:UInt32}',
+        target=f'{_table}{DOWNSAMPLE_STAGING_SUFFIX}'
+    ))
+    register_query(f'rollup_coverage_{_table}', f"""
+    SELECT
+        (SELECT count() FROM tcp_telemetry WHERE toYYYYMM(timestamp) = {{month:UInt32}}) AS raw_rows,
+        (SELECT {rollup_merge('transfer_count')} FROM {_table}
+         WHERE toYYYYMM(bucket) = {{month:UInt32}}) AS rollup_rows
+    """)
+
+# Window split used by rollup reads. With W = now() - {hours}:
+#   raw telemetry      [W, ceil_minute(W))
+#   minute rollup      [ceil_minute(W), ceil_hour(W)) and [floor_hour(now), now]
+#   hour rollup        [ceil_hour(W), floor_hour(now))
+_ROLLUP_WINDOW = """
+WITH now() - toIntervalHour({hours:UInt32}) AS window_start,
+     toStartOfMinute(window_start + toIntervalSecond(59)) AS minute_start,
+     toStartOfHour(window_start + toIntervalSecond(3599)) AS hour_start,
+     toStartOfHour(now()) AS hour_end
+"""
+
+def _agent_rollup_union(agent_filter: str, grouped: bool) -> str:
+    """UNION ALL of aggregate states covering the window for the filtered agents"""
+    key = 'agent_id, ' if grouped else ''
+    raw_group = 'GROUP BY agent_id' if grouped else ''
+    return f"""
+    {_ROLLUP_WINDOW}
+    SELECT {key}{_rollup_state_list()} FROM agent_features_1h
+    WHERE {agent_filter} AND bucket >= hour_start AND bucket < hour_end
+    UNION ALL
+    {_ROLLUP_WINDOW}
+    SELECT {key}{_rollup_state_list()} FROM agent_features_1m
+    WHERE {agent_filter} AND bucket >= minute_start AND (bucket < hour_start OR bucket >= hour_end)
+    UNION ALL
+    {_ROLLUP_WINDOW}
+    SELECT {key}{rollup_state_select()} FROM tcp_telemetry
+    WHERE {agent_filter} AND timestamp >= window_start AND timestamp < minute_start
+    {raw_group}
+    """
+
+# Agent features
+
+# get_agent_features field -> rollup state column
+AGENT_FEATURE_STATES = [
+    ('avg_bandwidth', 'bandwidth_avg'),
+    ('avg_latency', 'latency_avg'),
+    ('avg_packet_loss', 'packet_loss_avg'),
+    ('avg_jitter', 'jitter_avg'),
+    ('avg_rtt', 'rtt_avg'),
+    ('max_throughput', 'throughput_max'),
+    ('avg_throughput', 'throughput_avg'),
+    ('min_throughput', 'throughput_min'),
+    ('throughput_std', 'throughput_std'),
+    ('transfer_count', 'transfer_count'),
+    ('total_bytes', 'total_bytes'),
+    ('avg_cpu', 'cpu_avg'),
+    ('avg_memory', 'memory_avg'),
+    ('avg_disk_io', 'disk_io_avg'),
+    ('avg_network_util', 'network_util_avg'),
+]
+
+AGENT_FEATURES_COLUMNS = ', '.join(
+    f"{rollup_merge(column)} AS {field}" for field, column in AGENT_FEATURE_STATES
+)
+
+register_query('agent_features', f"""
+SELECT {AGENT_FEATURES_COLUMNS}
+FROM ({_agent_rollup_union('agent_id = {agent_id:String}', grouped=False)})
+""")
+
+register_query('agent_features_many', f"""
+SELECT agent_id, {AGENT_FEATURES_COLUMNS}
+FROM ({_agent_rollup_union('agent_id IN {agent_ids:Array(String)}', grouped=True)})
+GROUP BY agent_id
+""")
+
+# Real-time analytics
+
+register_query('real_time_analytics', f"""
+SELECT
+    bucket AS minute,
+    {rollup_merge('transfer_count')} AS transfer_count,
+    {rollup_merge('throughput_avg')} AS avg_throughput,
+    {rollup_merge('throughput_max')} AS max_throughput,
+    {rollup_merge('latency_avg')} AS avg_latency,
+    {rollup_merge('packet_loss_avg')} AS avg_packet_loss,
+    {rollup_merge('optimized_count')} AS optimized_transfers,
+    {rollup_merge('improvement_avg')} AS avg_improvement
+FROM (
+    WITH now() - toIntervalMinute({{minutes:UInt32}}) AS window_start,
+         toStartOfMinute(window_start + toIntervalSecond(59)) AS minute_start
+    SELECT bucket, {_rollup_state_list()} FROM agent_features_1m
+    WHERE bucket >= minute_start
+    UNION ALL
+    WITH now() - toIntervalMinute({{minutes:UInt32}}) AS window_start,
+         toStartOfMinute(window_start + toIntervalSecond(59)) AS minute_start
+    SELECT toStartOfMinute(timestamp) AS bucket, {rollup_state_select()} FROM tcp_telemetry
+    WHERE timestamp >= window_start AND timestamp < minute_start
+    GROUP BY bucket
+)
+GROUP BY minute
+ORDER BY minute DESC
+LIMIT 60
+""")
+
+# Project analytics (raw telemetry, served by the proj_project_time projection)
+
+register_query('project_analytics', """
+SELECT
+    toStartOfMinute(timestamp) AS minute,
+    count() AS transfer_count,
+    avg(throughput_mbps) AS avg_throughput,
+    max(throughput_mbps) AS max_throughput,
+    avg(latency_ms) AS avg_latency,
+    avg(packet_loss_rate) AS avg_packet_loss,
+    countIf(optimization_applied != '') AS optimized_transfers,
+    avg(improvement_percent) AS avg_improvement
+FROM tcp_telemetry
+WHERE project_id = {project_id:String}
+  AND timestamp >= now() - toIntervalMinute({minutes:UInt32})
+GROUP BY minute
+ORDER BY minute DESC
+LIMIT 60
+""")
+
+register_query('project_agent_summary', """
+SELECT
+    agent_id,
+    count() AS transfer_count,
+    sum(bytes_transferred) AS total_bytes,
+    avg(throughput_mbps) AS avg_throughput,
+    max(throughput_mbps) AS max_throughput,
+    avg(latency_ms) AS avg_latency,
+    max(timestamp) AS last_seen
+FROM tcp_telemetry
+WHERE project_id = {project_id:String}
+  AND timestamp >= now() - toIntervalHour({hours:UInt32})
+GROUP BY agent_id
+ORDER BY transfer_count DESC
+""")
+
+# Hourly analytics
+
+HOURLY_ANALYTICS_COLUMNS = f"""
+    agent_id,
+    bucket AS hour,
+    {rollup_merge('transfer_count')} AS transfer_count,
+    {rollup_merge('throughput_avg')} AS avg_throughput,
+    {rollup_merge('throughput_max')} AS max_throughput,
+    {rollup_merge('latency_avg')} AS avg_latency,
+    {rollup_merge('packet_loss_avg')} AS avg_packet_loss,
+    {rollup_merge('total_bytes')} AS total_bytes
+"""
+
+register_query('hourly_analytics', f"""
+SELECT {HOURLY_ANALYTICS_COLUMNS}
+FROM agent_features_1h
+WHERE bucket >= toStartOfHour({{since:DateTime}})
+GROUP BY agent_id, hour
+ORDER BY hour DESC, agent_id
+""")
+
+register_query('hourly_analytics_agent', f"""
+SELECT {HOURLY_ANALYTICS_COLUMNS}
+FROM agent_features_1h
+WHERE agent_id = {{agent_id:String}}
+  AND bucket >= toStartOfHour({{since:DateTime}})
+GROUP BY agent_id, hour
+ORDER BY hour DESC
+""")
+
+# Maintenance
+
+# Monthly partitions with a part written (insert or merge) since a Unix time
+register_query('partitions_modified_since', """
+SELECT DISTINCT toUInt32(partition) AS month
+FROM system.parts
+WHERE database = currentDatabase() AND table = {table:String} AND active
+  AND length(partition) = 6
+  AND modification_time >= fromUnixTimestamp({since:UInt32})
+ORDER BY month
+""")
+
+# Monthly partitions whose rows are all older than the retention window
+register_query('expired_partitions', """
+SELECT DISTINCT toUInt32(partition) AS month
+FROM system.parts
+WHERE database = currentDatabase() AND table = {table:String} AND active
+  AND length(partition) = 6
+  AND toUInt32OrZero(partition) < toYYYYMM(now() - toIntervalDay({days:UInt32}))
+ORDER BY month
+""")
@@ -0,0 +1,386 @@
+"""
+Agent Feature Store
+Per-agent feature snapshots precomputed on a schedule and served from memory
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from clickhouse_client import ClickHouseClient, AGENT_FEATURE_FIELDS
+from features.engineering import (
+    FEATURES, FeatureEngineer, ROLLING_METRICS, ROLLING_WINDOWS, rolling_feature_names
+)
+from features.registry import FeatureMatrix
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache', 'feature_store.npz')
+
+# Registry features computed from each agent's latest sample
+LATEST_FEATURES = [
+    'network_health_score', 'bandwidth_utilization', 'throughput_per_stream',
+    'cpu_stress_level', 'memory_pressure',
+]
+
+# Snapshot layout: get_agent_features aggregates, latest-sample features, rolling windows
+SNAPSHOT_COLUMNS = AGENT_FEATURE_FIELDS + LATEST_FEATURES + [
+    name for metric in ROLLING_METRICS for window in ROLLING_WINDOWS
+    for name in rolling_feature_names(metric, window)
+]
+
+@dataclass(frozen=True)
+class FeatureSnapshot:
+    """
+    One agent's features as of updated_at
+
+    values is a read-only view into the table that produced it; a later
+    refresh never modifies it.
+    """
+    agent_id: str
+    values: np.ndarray
+    index: Dict[str, int]
+    updated_at: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was computed"""
+        return time.time() - self.updated_at
+
+    def __getitem__(self, name: str) -> float:
+        return float(self.values[self.index[name]])
+
+    def get(self, name: str, default: Optional[float] = None) -> Optional[float]:
+        """Feature value, or default if the store has no such column"""
+        i = self.index.get(name)
+        return default if i is None else float(self.values[i])
+
+    def to_dict(self) -> Dict[str, float]:
+        """Feature name to value"""
+        return dict(zip(self.index, self.values.tolist()))
+
+@dataclass(frozen=True)
+class _TableState:
+    """Immutable contents of a FeatureTable, swapped whole on every update"""
+    agent_ids: List[str]
+    rows: Dict[str, int]
+    values: np.ndarray
+    updated_at: np.ndarray
+
+class FeatureTable:
+    """
+    In-memory feature snapshots keyed by agent
+
+    Rows live in one float64 array (one row per agent index) with a parallel
+    array of update times. Updates build new arrays and swap them in with a
+    single assignment, so readers never see a partly written row and never
+    need a lock.
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        """
+        Initialize an empty table
+
+        Args:
+            columns: Feature names, in row order
+        """
+        self.columns = list(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self._state = self._freeze([], np.empty((0, len(self.columns))), np.empty(0))
+
+    def __len__(self) -> int:
+        return len(self._state.agent_ids)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._state.rows
+
+    @property
+    def agent_ids(self) -> List[str]:
+        """Agents in row order"""
+        return list(self._state.agent_ids)
+
+    def lookup(self, agent_id: str) -> Optional[FeatureSnapshot]:
+        """
+        Latest snapshot for one agent
+
+        Returns:
+            FeatureSnapshot, or None if the agent has no snapshot
+        """
+        state = self._state
+        row = state.rows.get(agent_id)
+        if row is None:
+            return None
+        return FeatureSnapshot(agent_id, state.values[row], self.index, float(state.updated_at[row]))
+
+    def lookup_many(self, agent_ids: Sequence[str]) -> Tuple[FeatureMatrix, np.ndarray]:
+        """
+        Snapshots for many agents as a model-ready matrix
+
+        Returns:
+            (float32 FeatureMatrix, update times as epoch seconds); agents
+            without a snapshot get NaN in both
+        """
+        state = self._state
+        rows = np.array([state.rows.get(agent_id, -1) for agent_id in agent_ids], dtype=np.int64)
+        found = rows >= 0
+
+        values = np.full((len(rows), len(self.columns)), np.nan, dtype=np.float32)
+        values[found] = state.values[rows[found]]
+        updated_at = np.full(len(rows), np.nan)
+        updated_at[found] = state.updated_at[rows[found]]
+        return FeatureMatrix(values, list(self.columns)), updated_at
+
+    def upsert(self, agent_ids: Sequence[str], values: np.ndarray, updated_at: float):
+        """
+        Replace (or add) the snapshots of some agents
+
+        Args:
+            agent_ids: Agents, one per row of values
+            values: (len(agent_ids), len(columns)) feature values
+            updated_at: Time the values were computed, as epoch seconds
+        """
+        state = self._state
+        new_agents = [agent_id for agent_id in dict.fromkeys(agent_ids) if agent_id not in state.rows]
+        all_agents = state.agent_ids + new_agents
+        rows = {**state.rows, **{agent_id: len(state.agent_ids) + i for i, agent_id in enumerate(new_agents)}}
+
+        table = np.empty((len(all_agents), len(self.columns)))
+        table[:len(state.agent_ids)] = state.values
+        times = np.empty(len(all_agents))
+        times[:len(state.agent_ids)] = state.updated_at
+
+        target = np.array([rows[agent_id] for agent_id in agent_ids], dtype=np.int64)
+        table[target] = values
+        times[target] = updated_at
+        self._state = self._freeze(all_agents, table, times, rows)
+
+    def remove(self, agent_ids: Sequence[str]):
+        """Drop the snapshots of some agents"""
+        state = self._state
+        drop = set(agent_ids)
+        keep = [row for row, agent_id in enumerate(state.agent_ids) if agent_id not in drop]
+        self._state = self._freeze([state.agent_ids[row] for row in keep],
+                                   state.values[keep], state.updated_at[keep])
+
+    def save(self, path: str):
+        """Atomically write the table to an .npz file"""
+        state = self._state
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, agent_ids=np.array(state.agent_ids, dtype=str),
+                     columns=np.array(self.columns, dtype=str),
+                     values=state.values, updated_at=state.updated_at)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path: str, columns: Optional[Sequence[str]] = None) -> 'FeatureTable':
+        """
+        Read a table written by save
+
+        Args:
+            path: .npz file
+            columns: Expected columns; a file with a different layout raises ValueError
+        """
+        with np.load(path) as data:
+            saved_columns = data['columns'].tolist()
+            if columns is not None and list(columns) != saved_columns:
+                raise ValueError(f"Feature store {path} has different columns")
+            table = cls(saved_columns)
+            table._state = table._freeze(data['agent_ids'].tolist(), data['values'], data['updated_at'])
+        return table
+
+    @staticmethod
+    def _freeze(agent_ids: List[str], values: np.ndarray, updated_at: np.ndarray,
+                rows: Optional[Dict[str, int]] = None) -> _TableState:
+        """Table state with read-only arrays, so snapshots can be views"""
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        updated_at = np.ascontiguousarray(updated_at, dtype=np.float64)
+        values.flags.writeable = False
+        updated_at.flags.writeable = False
+        if rows is None:
+            rows = {agent_id: row for row, agent_id in enumerate(agent_ids)}
+        return _TableState(agent_ids, rows, values, updated_at)
+
+def build_snapshots(telemetry: pd.DataFrame, aggregates: Dict[str, Dict[str, float]],
+                    engineer: Optional[FeatureEngineer] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Compute SNAPSHOT_COLUMNS for every agent in telemetry
+
+    Args:
+        telemetry: Recent get_training_data rows (must cover the longest rolling window)
+        aggregates: get_agent_features_many result for the same agents
+        engineer: FeatureEngineer computing the rolling windows
+
+    Returns:
+        (agent IDs, (agents, len(SNAPSHOT_COLUMNS)) float64 values)
+    """
+    engineer = engineer or FeatureEngineer()
+    rolling = engineer.create_rolling_features(telemetry)
+    latest = rolling.drop_duplicates('agent_id', keep='last')
+    agent_ids = latest['agent_id'].tolist()
+
+    aggregate_values = np.array(
+        [[aggregates.get(agent_id, {}).get(name, np.nan) for name in AGENT_FEATURE_FIELDS]
+         for agent_id in agent_ids], dtype=np.float64
+    ).reshape(len(agent_ids), len(AGENT_FEATURE_FIELDS))
+    latest_values = FEATURES.compile(LATEST_FEATURES).frame(latest).to_numpy(dtype=np.float64, na_value=np.nan)
+    rolling_names = SNAPSHOT_COLUMNS[len(AGENT_FEATURE_FIELDS) + len(LATEST_FEATURES):]
+    rolling_values = latest[rolling_names].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return agent_ids, np.hstack([aggregate_values, latest_values, rolling_values])
+
+class FeatureStore:
+    """
+    Scheduled per-agent feature snapshots in front of ClickHouseClient
+
+    Each refresh reads the last hour of telemetry, computes the latest-sample
+    and rolling window features per active agent with FeatureEngineer, joins
+    the get_agent_features aggregates and swaps the rows into a FeatureTable.
+    Lookups never touch ClickHouse; every snapshot carries the time it was
+    computed so callers can decide how stale is too stale. Agents that stop
+    reporting keep their last snapshot (and its old timestamp).
+    """
+
+    def __init__(self, client: ClickHouseClient, hours: int = 24, interval: float = 60.0,
+                 path: Optional[str] = None, engineer: Optional[FeatureEngineer] = None):
+        """
+        Initialize feature store
+
+        Args:
+            client: Connected ClickHouse client
+            hours: Window for the get_agent_features aggregates
+            interval: Seconds between scheduled refreshes
+            path: Persist the table here after each refresh and load it on
+                start-up (None keeps it in memory only)
+            engineer: FeatureEngineer for the rolling windows
+        """
+        self.client = client
+        self.hours = hours
+        self.interval = interval
+        self.path = path
+        self.engineer = engineer or FeatureEngineer()
+        self.table = FeatureTable(SNAPSHOT_COLUMNS)
+
+        if path and os.path.exists(path):
+            try:
+                self.table = FeatureTable.load(path, SNAPSHOT_COLUMNS)
+                logger.info(f"Loaded {len(self.table)} feature snapshots from {path}")
+            except Exception as e:
+                logger.error(f"Failed to load feature snapshots: {e}")
+
+        self._task: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+
+        # Metrics
+        self._refreshes = 0
+        self._failed_refreshes = 0
+        self._last_refresh: Optional[float] = None
+        self._last_refresh_seconds = 0.0
+
+    async def start(self):
+        """Refresh now, then keep refreshing every interval seconds in the background"""
+        if self._task is None:
+            self._stop.clear()
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Feature store started (interval={self.interval}s)")
+
+    async def close(self):
+        """Stop the background refresh task"""
+        self._stop.set()
+        if self._task:
+            await self._task
+            self._task = None
+        logger.info("Feature store closed")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def lookup(self, agent_id: str) -> Optional[FeatureSnapshot]:
+        """Latest snapshot for an agent (None if it has none)"""
+        return self.table.lookup(agent_id)
+
+    def lookup_many(self, agent_ids: Sequence[str]) -> Tuple[FeatureMatrix, np.ndarray]:
+        """Snapshots for many agents; see FeatureTable.lookup_many"""
+        return self.table.lookup_many(agent_ids)
+
+    async def refresh(self) -> int:
+        """
+        Recompute the snapshots of every agent active in the last hour
+
+        Returns:
+            Number of agents refreshed (0 on failure, including an hour with
+            no telemetry; old snapshots are kept)
+        """
+        async with self._refresh_lock:
+            started = time.time()
+            try:
+                # Enough history for the longest rolling window
+                telemetry = await self.client.get_training_data(hours=math.ceil(max(ROLLING_WINDOWS) / 60))
+                if telemetry.empty:
+                    # get_training_data returns an empty frame when the query fails
+                    raise RuntimeError("no telemetry returned")
+
+                agent_ids = telemetry['agent_id'].unique().tolist()
+                aggregates = await self.client.get_agent_features_many(agent_ids, self.hours)
+                if not aggregates:
+                    raise RuntimeError("no agent aggregates returned")
+
+                # Pandas work runs off the event loop so lookups stay fast
+                agent_ids, values = await asyncio.to_thread(
+                    build_snapshots, telemetry, aggregates, self.engineer
+                )
+                self.table.upsert(agent_ids, values, started)
+                if self.path:
+                    await asyncio.to_thread(self.table.save, self.path)
+
+            except Exception as e:
+                self._failed_refreshes += 1
+                logger.error(f"Failed to refresh feature snapshots: {e}")
+                return 0
+
+            self._refreshes += 1
+            self._last_refresh = started
+            self._last_refresh_seconds = time.time() - started
+            logger.info(f"Refreshed feature snapshots for {len(agent_ids)} agents "
+                        f"in {self._last_refresh_seconds:.2f}s")
+            return len(agent_ids)
+
+    async def _run(self):
+        """Background loop that refreshes every interval seconds until closed"""
+        while True:
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            await self.refresh()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get feature store metrics
+
+        Returns:
+            Dictionary with agent count, refresh counts and timings
+        """
+        return {
+            'agents': len(self.table),
+            'refreshes': self._refreshes,
+            'failed_refreshes': self._failed_refreshes,
+            'last_refresh': self._last_refresh,
+            'last_refresh_seconds': self._last_refresh_seconds,
+        }
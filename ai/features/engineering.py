@@ -5,12 +5,251 @@ Feature Engineering Pipeline for TCP Agent AI Optimization
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Mapping, Optional, Tuple, Union
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 import logging
 
+from features.registry import Column, FeatureMatrix, FeatureRegistry
+
 logger = logging.getLogger(__name__)
 
+# Metrics and window lengths (minutes) used for rolling features
+ROLLING_METRICS = ['throughput_mbps', 'latency_ms', 'cpu_usage', 'memory_usage']
+ROLLING_WINDOWS = [5, 15, 30, 60]
+
+def rolling_feature_names(metric: str, window: int) -> Tuple[str, str, str, str]:
+    """Names of the (mean, std, min, max) rolling features for a metric and window"""
+    return (f'{metric}_rolling_{window}m', f'{metric}_rolling_std_{window}m',
+            f'{metric}_rolling_min_{window}m', f'{metric}_rolling_max_{window}m')
+
+def _py_max(a, b):
+    """Elementwise built-in max(a, b): a unless b > a, so max(0, nan) is 0"""
+    return np.where(b > a, b, a)
+
+def _py_min(a, b):
+    """Elementwise built-in min(a, b): a unless b < a, so min(100, nan) is 100"""
+    return np.where(b < a, b, a)
+
+def _float(values: np.ndarray) -> np.ndarray:
+    """Values as float64 for comparisons and arithmetic (missing values become NaN)"""
+    if values.dtype.kind in 'biuf':
+        return np.asarray(values, dtype=np.float64)
+    return pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _iso_week(timestamps: pd.DatetimeIndex) -> np.ndarray:
+    """ISO week number: the week of the year holding the same week's Thursday"""
+    thursday = timestamps + pd.to_timedelta(3 - timestamps.weekday, unit='D')
+    return (thursday.dayofyear - 1) // 7 + 1
+
+def _categorize_usage(values: np.ndarray, thresholds: List[float]) -> np.ndarray:
+    """FeatureEngineer._categorize_usage for a column of values"""
+    values = _float(values)
+    levels = np.full(len(values), len(thresholds), dtype=np.int64)
+    for i, threshold in reversed(list(enumerate(thresholds))):
+        levels[values < threshold] = i
+    return levels
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator where denominator > 0, else 0"""
+    numerator, denominator = _float(numerator), _float(denominator)
+    positive = denominator > 0
+    return np.where(positive, numerator / np.where(positive, denominator, 1), 0)
+
+def _network_health_score(packet_loss_rate: np.ndarray, latency_ms: np.ndarray,
+                          bandwidth_util: np.ndarray) -> np.ndarray:
+    """FeatureEngineer.calculate_network_health_score for columns"""
+    try:
+        packet_loss_score = _py_max(0, 100 - (_float(packet_loss_rate) * 100))
+        latency_score = _py_max(0, 100 - _py_min(_float(latency_ms) / 10, 100))
+        bandwidth_util = _float(bandwidth_util)
+        bandwidth_score = np.where(bandwidth_util <= 80, bandwidth_util, _py_max(0, 160 - bandwidth_util))
+
+        health_score = (
+            packet_loss_score * 0.3 +
+            latency_score * 0.3 +
+            bandwidth_score * 0.4
+        )
+
+        return _py_min(100, _py_max(0, health_score))
+
+    except Exception as e:
+        logger.error(f"Error calculating network health score: {e}")
+        return np.full(len(latency_ms), 50.0)
+
+# Declarative definitions of the create_feature_vector features. Columns carry
+# the row-wise defaults; intermediate features start with an underscore.
+FEATURES = FeatureRegistry()
+
+# Temporal features (only produced when there is a timestamp column)
+FEATURES.feature('_timestamp', Column('timestamp'), func=lambda ts: pd.DatetimeIndex(pd.to_datetime(ts)))
+FEATURES.feature('hour_of_day', '_timestamp', func=lambda ts: ts.hour, dtype='int64')
+FEATURES.feature('day_of_week', '_timestamp', func=lambda ts: ts.weekday, dtype='int64')
+FEATURES.feature('is_weekend', 'day_of_week', func=lambda day: day >= 5, dtype='bool')
+FEATURES.feature('is_business_hours', 'hour_of_day', func=lambda hour: (9 <= hour) & (hour <= 17), dtype='bool')
+FEATURES.feature('month_of_year', '_timestamp', func=lambda ts: ts.month, dtype='int64')
+FEATURES.feature('quarter_of_year', 'month_of_year', func=lambda month: (month - 1) // 3 + 1, dtype='int64')
+FEATURES.feature('week_of_year', '_timestamp', func=lambda ts: _iso_week(ts), dtype='int64')
+FEATURES.feature('day_of_month', '_timestamp', func=lambda ts: ts.day, dtype='int64')
+FEATURES.feature('is_month_end', 'day_of_month', func=lambda day: day >= 28, dtype='bool')  # Rough approximation
+FEATURES.feature('is_month_start', 'day_of_month', func=lambda day: day <= 3, dtype='bool')
+
+# System features
+FEATURES.feature('cpu_usage', Column('cpu_usage', 0))
+FEATURES.feature('cpu_stress_level', 'cpu_usage', func=lambda cpu: _categorize_usage(cpu, [50, 80, 95]))
+FEATURES.feature('memory_usage', Column('memory_usage', 0))
+FEATURES.feature('memory_pressure', 'memory_usage', func=lambda memory: _categorize_usage(memory, [60, 80, 90]))
+FEATURES.feature('disk_io_wait', Column('disk_io_wait', 0))
+FEATURES.feature('disk_bottleneck', 'disk_io_wait', func=lambda wait: _float(wait) > 10, dtype='int64')
+FEATURES.feature('load_average', Column('load_average', 0))
+FEATURES.feature('system_overloaded', 'load_average', func=lambda load: _float(load) > 2.0, dtype='int64')
+
+# Transfer features
+FEATURES.feature('throughput_mbps', Column('throughput_mbps', 0))
+FEATURES.feature('chunk_size', Column('chunk_size', 65536))  # Default 64KB
+FEATURES.feature('concurrent_streams', Column(('concurrent_connections', 'concurrent_streams'), 1))
+FEATURES.feature('retry_count', Column('retry_count', 0))
+FEATURES.feature('compression_ratio', Column('compression_ratio', 1.0))
+FEATURES.feature('has_retries', 'retry_count', func=lambda retries: _float(retries) > 0, dtype='int64')
+FEATURES.feature('high_concurrency', 'concurrent_streams', func=lambda streams: _float(streams) > 4, dtype='int64')
+FEATURES.feature('compression_effective', 'compression_ratio', func=lambda ratio: _float(ratio) > 1.5, dtype='int64')
+FEATURES.feature('throughput_per_stream', 'throughput_mbps', 'concurrent_streams', func=_ratio)
+
+# Network features
+FEATURES.feature('_bandwidth_utilization_estimate', 'throughput_mbps', Column('bandwidth_mbps', 100),
+                 func=lambda throughput, bandwidth: _py_min(100, _ratio(throughput, bandwidth) * 100))
+FEATURES.feature('bandwidth_utilization', Column('bandwidth_utilization', None), '_bandwidth_utilization_estimate',
+                 func=lambda given, estimate: estimate if given is None else given)
+FEATURES.feature('latency_ms', Column('latency_ms', 50))
+FEATURES.feature('packet_loss_rate', Column('packet_loss_rate', 0.01))
+FEATURES.feature('connection_count', Column(('concurrent_connections', 'connection_count'), 1))
+FEATURES.feature('tcp_window_size', Column('tcp_window_size', 65536))
+FEATURES.feature('low_latency', 'latency_ms', func=lambda latency: _float(latency) < 50, dtype='int64')
+FEATURES.feature('high_latency', 'latency_ms', func=lambda latency: _float(latency) > 200, dtype='int64')
+FEATURES.feature('packet_loss_present', 'packet_loss_rate', func=lambda loss: _float(loss) > 0.001, dtype='int64')
+FEATURES.feature('high_packet_loss', 'packet_loss_rate', func=lambda loss: _float(loss) > 0.01, dtype='int64')
+FEATURES.feature('_network_type', Column('network_type', 'unknown'))
+FEATURES.feature('network_type_wifi', '_network_type', func=lambda kind: kind == 'wifi', dtype='int64')
+FEATURES.feature('network_type_ethernet', '_network_type', func=lambda kind: kind == 'ethernet', dtype='int64')
+FEATURES.feature('network_type_cellular', '_network_type', func=lambda kind: kind == 'cellular', dtype='int64')
+# Scored from the raw metrics, with their own defaults
+FEATURES.feature('network_health_score', Column('packet_loss_rate', 0), Column('latency_ms', 0),
+                 Column('bandwidth_utilization', 0), func=_network_health_score)
+
+# Quality metrics
+FEATURES.feature('success_rate', Column('success_rate', 100.0))
+FEATURES.feature('error_rate', Column('error_rate', 0.0))
+FEATURES.feature('user_satisfaction_score', Column('user_satisfaction_score', 3))
+
+TEMPORAL_FEATURES = ['hour_of_day', 'day_of_week', 'is_weekend', 'is_business_hours', 'quarter_of_year',
+                     'week_of_year', 'month_of_year', 'day_of_month', 'is_month_end', 'is_month_start']
+SYSTEM_FEATURES = ['cpu_usage', 'cpu_stress_level', 'memory_usage', 'memory_pressure',
+                   'disk_io_wait', 'disk_bottleneck', 'load_average', 'system_overloaded']
+TRANSFER_FEATURES = ['throughput_mbps', 'chunk_size', 'concurrent_streams', 'retry_count', 'compression_ratio',
+                     'has_retries', 'high_concurrency', 'compression_effective', 'throughput_per_stream']
+NETWORK_FEATURES = ['bandwidth_utilization', 'latency_ms', 'packet_loss_rate', 'connection_count',
+                    'tcp_window_size', 'low_latency', 'high_latency', 'packet_loss_present', 'high_packet_loss',
+                    'network_type_wifi', 'network_type_ethernet', 'network_type_cellular', 'network_health_score']
+QUALITY_FEATURES = ['success_rate', 'error_rate', 'user_satisfaction_score']
+
+class _RollingWindows:
+    """
+    Row ranges of time-based windows over rows sorted by group, then timestamp
+
+    Window w of row i covers the same group's rows with timestamps in
+    (t - w, t], up to and including row i, as pandas' rolling('5min') does.
+    """
+
+    def __init__(self, groups: np.ndarray, timestamps: np.ndarray, windows: List[int]):
+        """
+        Args:
+            groups: Integer group codes, sorted
+            timestamps: int64 nanoseconds, sorted within each group
+            windows: Window lengths in minutes
+        """
+        self.groups = groups
+        self.length = len(groups)
+        first_rows = np.r_[True, groups[1:] != groups[:-1]]
+        group_start = np.maximum.accumulate(np.where(first_rows, np.arange(self.length), 0))
+
+        # Rank timestamps so (group, time) packs into one sorted int64 key
+        sorted_timestamps = np.sort(timestamps)
+        unique_timestamps = sorted_timestamps[np.r_[True, sorted_timestamps[1:] != sorted_timestamps[:-1]]]
+        stride = len(unique_timestamps) + 1
+        keys = groups * stride + np.searchsorted(unique_timestamps, timestamps)
+
+        ends = np.arange(self.length)
+        self.ranges = {}
+        self.max_level = 0
+        for window in windows:
+            lower = np.searchsorted(unique_timestamps, timestamps - pd.Timedelta(minutes=window).value,
+                                    side='right')
+            starts = np.searchsorted(keys, groups * stride + lower, side='left')
+
+            # Prefix index just before the window (length points at the zero pad)
+            before = np.where(starts > group_start, starts - 1, self.length)
+
+            # Two overlapping power-of-two blocks [start, start + 2**k) and
+            # (end - 2**k, end] cover the window; k = floor(log2(rows))
+            levels = np.frexp(ends - starts + 1)[1] - 1
+            heads = levels * self.length + starts
+            tails = levels * self.length + ends - (1 << levels) + 1
+            self.ranges[window] = (before, heads, tails)
+            self.max_level = max(self.max_level, int(levels.max()))
+
+class _RollingStats:
+    """
+    Mean/std/min/max of one metric over every _RollingWindows window
+
+    Sums come from per-group prefix sums of values centred on the group mean
+    and min/max from a sparse table, so each window size costs a handful of
+    vectorised lookups. NaNs are skipped like pandas rolling does.
+    """
+
+    def __init__(self, values: np.ndarray, windows: _RollingWindows):
+        groups = windows.groups
+        valid = ~np.isnan(values)
+        group_totals = np.bincount(groups, weights=np.where(valid, values, 0))
+        group_counts = np.bincount(groups, weights=valid)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._centre = (group_totals / group_counts)[groups]
+        deviations = np.where(valid, values - self._centre, 0.0)
+
+        prefix = pd.DataFrame({'count': valid.astype(np.int64), 'sum': deviations,
+                               'sum_sq': deviations * deviations}).groupby(groups, sort=False).cumsum()
+        self._count = np.r_[prefix['count'].to_numpy(), 0]
+        self._sum = np.r_[prefix['sum'].to_numpy(), 0.0]
+        self._sum_sq = np.r_[prefix['sum_sq'].to_numpy(), 0.0]
+
+        # Level k holds min/max over values[j:j + 2**k], levels stored back to back
+        minimum = [values]
+        maximum = [values]
+        for level in range(1, windows.max_level + 1):
+            span = 1 << (level - 1)
+            minimum.append(minimum[-1].copy())
+            maximum.append(maximum[-1].copy())
+            minimum[-1][:-span] = np.fmin(minimum[-2][:-span], minimum[-2][span:])
+            maximum[-1][:-span] = np.fmax(maximum[-2][:-span], maximum[-2][span:])
+        self._minimum = np.concatenate(minimum)
+        self._maximum = np.concatenate(maximum)
+
+    def window(self, before: np.ndarray, heads: np.ndarray, tails: np.ndarray):
+        """(mean, std, min, max) for one _RollingWindows range"""
+        count = self._count[:-1] - self._count[before]
+        total = self._sum[:-1] - self._sum[before]
+        total_sq = self._sum_sq[:-1] - self._sum_sq[before]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, total / count + self._centre, np.nan)
+            variance = (total_sq - total * total / count) / (count - 1)
+
+        minimum = np.fmin(self._minimum[heads], self._minimum[tails])
+        maximum = np.fmax(self._maximum[heads], self._maximum[tails])
+
+        # Windows of identical values have exactly zero spread
+        std = np.where(count > 1, np.sqrt(np.maximum(variance, 0)), np.nan)
+        std[(count > 1) & (minimum == maximum)] = 0.0
+        return mean, std, minimum, maximum
+
 class FeatureEngineer:
     """
     Handles feature extraction and engineering for ML models
@@ -65,10 +304,12 @@ class FeatureEngineer:
             logger.error(f"Error calculating network health score: {e}")
             return 50.0  # Default neutral score
     
-    def create_rolling_features(self, df: pd.DataFrame, windows: List[int] = [5, 15, 30, 60]) -> pd.DataFrame:
+    def create_rolling_features(self, df: pd.DataFrame, windows: List[int] = ROLLING_WINDOWS) -> pd.DataFrame:
         """
         Create rolling window features for time series data
-        Windows are in minutes
+        Windows are in minutes and cover (t - window, t] of the same agent's
+        rows (the whole frame when there is no agent_id column), like
+        pandas' groupby(...).rolling('5min')
         """
         if 'timestamp' not in df.columns:
             logger.warning("No timestamp column found for rolling features")
@@ -79,34 +320,36 @@ class FeatureEngineer:
         df = df.sort_values('timestamp')
         
         # Create rolling features for key metrics
-        metrics_to_roll = ['throughput_mbps', 'latency_ms', 'cpu_usage', 'memory_usage']
-        
+        metrics_to_roll = [metric for metric in ROLLING_METRICS if metric in df.columns]
+        if not metrics_to_roll or len(df) == 0:
+            return df
+
+        # Rows ordered by agent, then time; results are scattered back to df's order
+        if 'agent_id' in df.columns:
+            groups = pd.factorize(df['agent_id'], use_na_sentinel=False)[0]
+        else:
+            groups = np.zeros(len(df), dtype=np.int64)
+        timestamps = pd.DatetimeIndex(df['timestamp']).as_unit('ns').asi8
+        order = np.lexsort((timestamps, groups))
+        groups = groups[order]
+        timestamps = timestamps[order]
+        rolling_windows = _RollingWindows(groups, timestamps, windows)
+
+        features = {}
         for metric in metrics_to_roll:
-            if metric in df.columns:
-                for window in windows:
-                    # Use simple window size instead of time-based rolling for now
-                    window_size = max(1, window // 5)  # Approximate records per window
-                    
-                    # Rolling mean
-                    df[f'{metric}_rolling_{window}m'] = df[metric].rolling(
-                        window=window_size, min_periods=1
-                    ).mean()
-                    
-                    # Rolling standard deviation
-                    df[f'{metric}_rolling_std_{window}m'] = df[metric].rolling(
-                        window=window_size, min_periods=1
-                    ).std()
-                    
-                    # Rolling min/max
-                    df[f'{metric}_rolling_min_{window}m'] = df[metric].rolling(
-                        window=window_size, min_periods=1
-                    ).min()
-                    
-                    df[f'{metric}_rolling_max_{window}m'] = df[metric].rolling(
-                        window=window_size, min_periods=1
-                    ).max()
+            values = df[metric].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            stats = _RollingStats(values, rolling_windows)
+            
+            for window in windows:
+                # Mean, std, min and max for the window from one set of lookups
+                mean, std, minimum, maximum = stats.window(*rolling_windows.ranges[window])
+                for name, result in zip(rolling_feature_names(metric, window),
+                                        [mean, std, minimum, maximum]):
+                    features[name] = np.empty(len(df))
+                    features[name][order] = result
         
-        return df
+        return pd.concat([df.drop(columns=list(features), errors='ignore'),
+                          pd.DataFrame(features, index=df.index)], axis=1)
     
     def extract_system_features(self, metrics: Dict[str, Any]) -> Dict[str, float]:
         """Extract system-level features"""
@@ -209,27 +452,81 @@ class FeatureEngineer:
         features['success_rate'] = raw_data.get('success_rate', 100.0)
         features['error_rate'] = raw_data.get('error_rate', 0.0)
         features['user_satisfaction_score'] = raw_data.get('user_satisfaction_score', 3)
-        
+
         return features
-    
+
+    # Columnar counterparts of the extractors above, compiled from FEATURES.
+    # Each matches the row-wise output value for value (missing columns use
+    # the same defaults and NaN compares the way it does in the scalar code).
+
+    def extract_temporal_features_columnar(self, timestamps: pd.Series) -> pd.DataFrame:
+        """Extract time-based features for a column of timestamps"""
+        return FEATURES.compile(TEMPORAL_FEATURES).frame({'timestamp': timestamps})
+
+    def calculate_network_health_score_columnar(self, df: pd.DataFrame) -> np.ndarray:
+        """Calculate calculate_network_health_score for every row of df"""
+        return FEATURES.compile(['network_health_score']).evaluate(df)['network_health_score']
+
+    def extract_system_features_columnar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Extract system-level features for every row of df"""
+        return FEATURES.compile(SYSTEM_FEATURES).frame(df)
+
+    def extract_transfer_features_columnar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Extract transfer-specific features for every row of df"""
+        return FEATURES.compile(TRANSFER_FEATURES).frame(df)
+
+    def extract_network_features_columnar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Extract network-specific features for every row of df"""
+        return FEATURES.compile(NETWORK_FEATURES).frame(df)
+
+    def create_feature_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Columnar create_feature_vector: one feature row per row of df
+        """
+        return FEATURES.compile(self.feature_vector_names(df)).frame(df)
+
+    def feature_vector_names(self, df: Union[pd.DataFrame, Mapping[str, Any]]) -> List[str]:
+        """Features create_feature_vector produces for data with these columns"""
+        temporal = TEMPORAL_FEATURES if 'timestamp' in df else []
+        return temporal + SYSTEM_FEATURES + TRANSFER_FEATURES + NETWORK_FEATURES + QUALITY_FEATURES
+
+    def feature_matrix(self, data: Union[pd.DataFrame, Mapping[str, Any], List[Dict[str, Any]]],
+                       names: Optional[List[str]] = None) -> FeatureMatrix:
+        """
+        Unscaled features as a contiguous float32 matrix
+
+        Args:
+            data: Telemetry as a DataFrame, mapping of columns or list of records
+            names: Features to compute, in column order (default: the
+                create_feature_vector features)
+
+        Returns:
+            FeatureMatrix with NaN replaced by 0
+        """
+        if names is None:
+            names = self.feature_vector_names(data[0] if isinstance(data, list) and data else data)
+        return FEATURES.compile(names).matrix(data)
+
     def prepare_training_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Prepare data for model training by applying all feature engineering steps
+        Also accepts a TelemetryBatch (anything with to_pandas)
         """
+        if not isinstance(df, pd.DataFrame) and hasattr(df, 'to_pandas'):
+            df = df.to_pandas()
+        
         logger.info(f"Preparing training data for {len(df)} samples")
         
         # Create rolling features
         df = self.create_rolling_features(df)
         
-        # Create feature vectors for each row
-        feature_rows = []
-        for _, row in df.iterrows():
-            features = self.create_feature_vector(row.to_dict())
-            feature_rows.append(features)
-        
-        # Convert to DataFrame
-        feature_df = pd.DataFrame(feature_rows)
-        
+        if len(df) == 0:
+            logger.warning("No samples to prepare")
+            return pd.DataFrame()
+
+        # Create feature vectors for all rows at once
+        feature_df = self.create_feature_frame(df)
+
         # Handle missing values
         feature_df = feature_df.fillna(0)
         
@@ -244,6 +541,12 @@ class FeatureEngineer:
         
         logger.info(f"Generated {len(feature_df.columns)} features")
         return feature_df
+
+    def prepare_training_matrix(self, df: pd.DataFrame) -> FeatureMatrix:
+        """
+        prepare_training_data as a contiguous float32 matrix with its column index
+        """
+        return FeatureMatrix.from_frame(self.prepare_training_data(df))
     
     def _categorize_usage(self, value: float, thresholds: List[float]) -> int:
         """Categorize usage levels based on thresholds"""
@@ -251,7 +554,7 @@ class FeatureEngineer:
             if value < threshold:
                 return i
         return len(thresholds)
-    
+
     def get_feature_importance(self, model, feature_names: List[str]) -> Dict[str, float]:
         """
         Extract feature importance from trained model
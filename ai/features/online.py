@@ -0,0 +1,228 @@
+"""
+Online Rolling Features
+Incremental per-agent rolling window state for single-sample inference
+"""
+
+import math
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from features.engineering import ROLLING_METRICS, ROLLING_WINDOWS, rolling_feature_names
+
+logger = logging.getLogger(__name__)
+
+class _WindowState:
+    """
+    Samples inside one time window with running statistics per metric
+
+    Mean and variance are kept with Welford's update (add and remove), min
+    and max with monotonic deques, so each sample costs O(1) amortised.
+    """
+
+    __slots__ = ('span', 'samples', 'count', 'mean', 'm2', 'minimum', 'maximum', 'removals')
+
+    def __init__(self, span: int, num_metrics: int):
+        self.span = span
+        self.samples: Deque[Tuple[int, Tuple[float, ...]]] = deque()
+        self.count = [0] * num_metrics
+        self.mean = [0.0] * num_metrics
+        self.m2 = [0.0] * num_metrics
+        # (timestamp, value) with increasing values (minimum) / decreasing values (maximum)
+        self.minimum: List[Deque[Tuple[int, float]]] = [deque() for _ in range(num_metrics)]
+        self.maximum: List[Deque[Tuple[int, float]]] = [deque() for _ in range(num_metrics)]
+        self.removals = 0
+
+    def add(self, timestamp: int, values: Tuple[float, ...]):
+        """Add a sample and evict those at or before timestamp - span"""
+        self.samples.append((timestamp, values))
+        for i, value in enumerate(values):
+            if value != value:  # NaN is skipped, as in pandas rolling
+                continue
+            count = self.count[i] = self.count[i] + 1
+            delta = value - self.mean[i]
+            self.mean[i] += delta / count
+            self.m2[i] += delta * (value - self.mean[i])
+
+            minimum = self.minimum[i]
+            while minimum and minimum[-1][1] > value:
+                minimum.pop()
+            minimum.append((timestamp, value))
+            maximum = self.maximum[i]
+            while maximum and maximum[-1][1] < value:
+                maximum.pop()
+            maximum.append((timestamp, value))
+
+        cutoff = timestamp - self.span
+        samples = self.samples
+        while samples[0][0] <= cutoff:
+            self._remove(samples.popleft()[1])
+        for extremes in (self.minimum, self.maximum):
+            for ordered in extremes:
+                while ordered and ordered[0][0] <= cutoff:
+                    ordered.popleft()
+
+        # Removing samples lets rounding error build up; recompute from time to time
+        if self.removals > 1024 + 4 * len(samples):
+            self._recompute()
+
+    def stats(self, i: int) -> Tuple[float, float, float, float]:
+        """(mean, std, min, max) of metric i, NaN where pandas gives NaN"""
+        count = self.count[i]
+        if count == 0:
+            return math.nan, math.nan, math.nan, math.nan
+        minimum = self.minimum[i][0][1]
+        maximum = self.maximum[i][0][1]
+        if count == 1:
+            std = math.nan
+        elif minimum == maximum:
+            std = 0.0
+        else:
+            std = math.sqrt(max(self.m2[i], 0.0) / (count - 1))
+        return self.mean[i], std, minimum, maximum
+
+    def _remove(self, values: Tuple[float, ...]):
+        """Reverse Welford update for an evicted sample"""
+        self.removals += 1
+        for i, value in enumerate(values):
+            if value != value:
+                continue
+            count = self.count[i] = self.count[i] - 1
+            if count == 0:
+                self.mean[i] = 0.0
+                self.m2[i] = 0.0
+                continue
+            delta = value - self.mean[i]
+            self.mean[i] -= delta / count
+            self.m2[i] -= delta * (value - self.mean[i])
+
+    def _recompute(self):
+        """Rebuild mean and M2 from the samples still in the window"""
+        self.removals = 0
+        for i in range(len(self.count)):
+            values = [sample[i] for _, sample in self.samples if sample[i] == sample[i]]
+            self.count[i] = len(values)
+            self.mean[i] = math.fsum(values) / len(values) if values else 0.0
+            self.m2[i] = math.fsum((value - self.mean[i]) ** 2 for value in values)
+
+class OnlineFeatureState:
+    """
+    Rolling window features for one agent, updated one sample at a time
+
+    Produces the same feature names and values as
+    FeatureEngineer.create_rolling_features over the agent's history, without
+    keeping or rescanning that history. Samples must arrive in time order; a
+    sample older than the previous one is treated as arriving at the previous
+    timestamp and counted in late_samples.
+    """
+
+    def __init__(self, windows: List[int] = ROLLING_WINDOWS, metrics: List[str] = ROLLING_METRICS):
+        """
+        Initialize online feature state
+
+        Args:
+            windows: Window lengths in minutes
+            metrics: Telemetry fields to compute rolling statistics for
+        """
+        self.windows = list(windows)
+        self.metrics = list(metrics)
+        self.last_timestamp: Optional[int] = None
+        self.samples = 0
+        self.late_samples = 0
+
+        self._windows = [_WindowState(pd.Timedelta(minutes=window).value, len(self.metrics))
+                         for window in self.windows]
+        # (metric index, window) pairs in create_rolling_features column order
+        self._pairs = [(i, self._windows[j]) for i in range(len(self.metrics))
+                       for j in range(len(self.windows))]
+        self._feature_names = [name for metric in self.metrics for window in self.windows
+                               for name in rolling_feature_names(metric, window)]
+
+    @property
+    def feature_names(self) -> List[str]:
+        """Feature names in the order create_rolling_features adds them"""
+        return list(self._feature_names)
+
+    def update(self, sample: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Add a telemetry sample and return the rolling features as of its timestamp
+
+        Args:
+            sample: Telemetry record with 'timestamp' and the configured metrics
+                (missing or None metrics are skipped like NaN)
+
+        Returns:
+            Dictionary of rolling feature name to value
+        """
+        timestamp = pd.Timestamp(sample['timestamp']).value
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            self.late_samples += 1
+            timestamp = self.last_timestamp
+        self.last_timestamp = timestamp
+        self.samples += 1
+
+        values = []
+        for metric in self.metrics:
+            value = sample.get(metric)
+            values.append(math.nan if value is None else float(value))
+        values = tuple(values)
+
+        for window in self._windows:
+            window.add(timestamp, values)
+        return self.features()
+
+    def features(self) -> Dict[str, float]:
+        """
+        Current rolling features
+
+        Returns:
+            Dictionary of rolling feature name to value (NaN before any sample)
+        """
+        values = []
+        for i, window in self._pairs:
+            values.extend(window.stats(i))
+        return dict(zip(self._feature_names, values))
+
+class OnlineFeatureStates:
+    """OnlineFeatureState per agent, created on first sample"""
+
+    def __init__(self, windows: List[int] = ROLLING_WINDOWS, metrics: List[str] = ROLLING_METRICS):
+        """
+        Initialize per-agent online feature states
+
+        Args:
+            windows: Window lengths in minutes
+            metrics: Telemetry fields to compute rolling statistics for
+        """
+        self.windows = list(windows)
+        self.metrics = list(metrics)
+        self._states: Dict[str, OnlineFeatureState] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._states
+
+    def get(self, agent_id: str) -> Optional[OnlineFeatureState]:
+        """State for an agent, or None if it has not reported yet"""
+        return self._states.get(agent_id)
+
+    def update(self, sample: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Add a sample to its agent's state (keyed by sample['agent_id'])
+
+        Returns:
+            The agent's rolling features as of the sample
+        """
+        agent_id = sample['agent_id']
+        state = self._states.get(agent_id)
+        if state is None:
+            state = self._states[agent_id] = OnlineFeatureState(self.windows, self.metrics)
+        return state.update(sample)
+
+    def remove(self, agent_id: str):
+        """Drop an agent's state"""
+        self._states.pop(agent_id, None)
@@ -0,0 +1,280 @@
+"""
+Feature Registry
+Declarative feature definitions compiled into a de-duplicated execution plan
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Default of a Column that must be present
+REQUIRED = object()
+
+# Result of a feature whose required column is missing
+_MISSING = object()
+
+@dataclass(frozen=True)
+class Column:
+    """
+    Source column input of a feature
+
+    names can list fallbacks: the first one present in the data is read.
+    When none is present the feature sees default filled to the row count
+    (None is passed as is), or falls back to its own default if the column
+    is REQUIRED.
+    """
+    names: Union[str, Tuple[str, ...]]
+    default: Any = REQUIRED
+
+    @property
+    def candidates(self) -> Tuple[str, ...]:
+        return (self.names,) if isinstance(self.names, str) else tuple(self.names)
+
+    def read(self, data: Mapping[str, Any], length: int) -> Any:
+        """Column values as stored, the default filled to length, or _MISSING"""
+        for name in self.candidates:
+            if name in data:
+                values = data[name]
+                if isinstance(values, pd.Series):
+                    # Keep timezone-aware timestamps as a DatetimeArray
+                    return values.array if isinstance(values.dtype, pd.DatetimeTZDtype) else values.to_numpy()
+                return np.asarray(values)
+        if self.default is REQUIRED:
+            return _MISSING
+        if self.default is None:
+            return None
+        return np.full(length, self.default)
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    One named feature
+
+    inputs are Column sources or names of other features; func receives one
+    array per input and returns the feature column. A feature without func
+    passes its single input through. dtype (e.g. 'bool', 'int64') casts the
+    result; default fills the feature when a REQUIRED column is missing.
+    """
+    name: str
+    inputs: Tuple[Union[str, Column], ...]
+    func: Optional[Callable[..., Any]] = None
+    dtype: Optional[str] = None
+    default: float = 0.0
+    description: str = ''
+
+@dataclass
+class FeatureMatrix:
+    """Contiguous float32 feature matrix with its column index"""
+    values: np.ndarray
+    columns: List[str]
+    index: Dict[str, int] = field(init=False)
+
+    def __post_init__(self):
+        self.index = {name: i for i, name in enumerate(self.columns)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, fill_value: float = 0.0) -> 'FeatureMatrix':
+        """Matrix of a frame's columns (bools become 0/1)"""
+        values = np.ascontiguousarray(df.to_numpy(dtype=np.float32, na_value=np.nan))
+        np.copyto(values, np.float32(fill_value), where=np.isnan(values))
+        return cls(values, list(df.columns))
+
+    def column(self, name: str) -> np.ndarray:
+        """One feature as a (strided) view"""
+        return self.values[:, self.index[name]]
+
+    def take(self, names: Sequence[str], defaults: Optional[Sequence[float]] = None) -> np.ndarray:
+        """
+        Columns in the given order as a new contiguous matrix
+
+        Args:
+            names: Feature names
+            defaults: Values for features not in the matrix (None raises KeyError)
+        """
+        result = np.empty((len(self.values), len(names)), dtype=np.float32)
+        for i, name in enumerate(names):
+            if name in self.index:
+                result[:, i] = self.values[:, self.index[name]]
+            elif defaults is not None:
+                logger.warning(f"Feature {name} not found, using default value {defaults[i]}")
+                result[:, i] = defaults[i]
+            else:
+                raise KeyError(f"Unknown feature: {name}")
+        return result
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Convert to a DataFrame"""
+        return pd.DataFrame(self.values, columns=self.columns)
+
+class FeaturePlan:
+    """
+    Compiled plan for a list of features
+
+    Every column read and intermediate feature needed by the outputs is
+    computed exactly once, in dependency order.
+    """
+
+    def __init__(self, outputs: List[FeatureSpec], steps: List[Union[Column, FeatureSpec]]):
+        self.outputs = outputs
+        self.steps = steps
+        self.columns = [spec.name for spec in outputs]
+        self.index = {name: i for i, name in enumerate(self.columns)}
+
+    def evaluate(self, data: Union[pd.DataFrame, Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Compute the output features
+
+        Args:
+            data: DataFrame or mapping of column name to array
+
+        Returns:
+            Dictionary of feature name to column, in plan order
+        """
+        length = _length(data)
+        results: Dict[Any, Any] = {}
+        for step in self.steps:
+            if isinstance(step, Column):
+                results[step] = step.read(data, length)
+                continue
+
+            args = [results[source] for source in step.inputs]
+            if any(arg is _MISSING for arg in args):
+                results[step.name] = _MISSING
+                continue
+            value = step.func(*args) if step.func else args[0]
+            if step.dtype:
+                value = np.asarray(value).astype(step.dtype, copy=False)
+            results[step.name] = value
+
+        features = {}
+        for spec in self.outputs:
+            value = results[spec.name]
+            features[spec.name] = np.full(length, spec.default) if value is _MISSING else value
+        return features
+
+    def frame(self, data: Union[pd.DataFrame, Mapping[str, Any]]) -> pd.DataFrame:
+        """Output features as a DataFrame with a default index"""
+        return pd.DataFrame(self.evaluate(data), columns=self.columns)
+
+    def matrix(self, data: Union[pd.DataFrame, Mapping[str, Any], List[Dict[str, Any]]],
+               fill_value: float = 0.0) -> FeatureMatrix:
+        """
+        Output features as a row-major float32 matrix
+
+        Args:
+            data: DataFrame, mapping of column name to array, or list of records
+            fill_value: Replacement for NaN (None keeps NaN)
+        """
+        if isinstance(data, list):
+            data = _records_to_columns(data)
+
+        features = self.evaluate(data)
+        # Fill feature-major (contiguous writes), then transpose once to row-major
+        columns = np.empty((len(self.columns), _length(data)), dtype=np.float32)
+        for i, name in enumerate(self.columns):
+            columns[i] = features[name]
+        if fill_value is not None:
+            np.copyto(columns, np.float32(fill_value), where=np.isnan(columns))
+        return FeatureMatrix(np.ascontiguousarray(columns.T), list(self.columns))
+
+class FeatureRegistry:
+    """Named FeatureSpecs and the plans compiled from them"""
+
+    def __init__(self):
+        self._specs: Dict[str, FeatureSpec] = {}
+        self._plans: Dict[Tuple[str, ...], FeaturePlan] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    @property
+    def names(self) -> List[str]:
+        """Registered feature names in registration order"""
+        return list(self._specs)
+
+    def spec(self, name: str) -> FeatureSpec:
+        """Definition of a feature"""
+        return self._specs[name]
+
+    def register(self, spec: FeatureSpec) -> FeatureSpec:
+        """Add or replace a feature definition"""
+        self._specs[spec.name] = spec
+        self._plans.clear()
+        return spec
+
+    def feature(self, name: str, *inputs: Union[str, Column], func: Optional[Callable[..., Any]] = None,
+                dtype: Optional[str] = None, default: float = 0.0, description: str = '') -> FeatureSpec:
+        """Register a feature from its parts"""
+        return self.register(FeatureSpec(name, tuple(inputs), func, dtype, default, description))
+
+    def compile(self, names: Iterable[str]) -> FeaturePlan:
+        """
+        Build (or reuse) the execution plan for a list of features
+
+        Args:
+            names: Output feature names, in matrix column order
+
+        Returns:
+            FeaturePlan computing each needed column and feature once
+        """
+        key = tuple(names)
+        plan = self._plans.get(key)
+        if plan is None:
+            steps: List[Union[Column, FeatureSpec]] = []
+            self._resolve(key, steps, set(), set())
+            plan = self._plans[key] = FeaturePlan([self._specs[name] for name in key], steps)
+        return plan
+
+    def _resolve(self, names: Iterable[Union[str, Column]], steps: List[Union[Column, FeatureSpec]],
+                 done: set, visiting: set):
+        """Depth-first topological ordering of the steps names depend on"""
+        for name in names:
+            if name in done:
+                continue
+            if isinstance(name, Column):
+                steps.append(name)
+                done.add(name)
+                continue
+            if name not in self._specs:
+                raise KeyError(f"Unknown feature: {name}")
+            if name in visiting:
+                raise ValueError(f"Feature {name} depends on itself")
+
+            visiting.add(name)
+            spec = self._specs[name]
+            self._resolve(spec.inputs, steps, done, visiting)
+            visiting.discard(name)
+            steps.append(spec)
+            done.add(name)
+
+def _length(data: Union[pd.DataFrame, Mapping[str, Any]]) -> int:
+    """Row count of a DataFrame or mapping of columns"""
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    for values in data.values():
+        return len(values)
+    return 0
+
+def _records_to_columns(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Columns from a list of records (missing keys become None)"""
+    names = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+
+    columns = {}
+    for name in names:
+        values = [record.get(name) for record in records]
+        column = np.array(values)
+        if column.dtype.kind in 'USO':
+            # Keep strings and mixed values as objects rather than coercing them to text
+            column = np.array(values, dtype=object)
+        columns[name] = column
+    return columns
@@ -0,0 +1,419 @@
+"""
+Telemetry Ingest Server
+Local asyncio endpoint that accepts agent telemetry as NDJSON or binary column frames
+and hands it to ClickHouse through TelemetryBuffer in large blocks
+
+Both protocols are detected from the first bytes of a connection.
+
+NDJSON: one JSON object per line with TelemetryRecord field names. timestamp is
+an ISO-8601 string or epoch milliseconds (UTC); optional result fields may be
+omitted. Lines are parsed in batches by Arrow's JSON reader against a fixed
+schema: numeric fields may be integers or floats on any line, while timestamp
+(and is_weekend, a bool or 0/1) must use one kind per batch. After each batch
+the server writes {"accepted": <total rows>}\n, or {"error": "..."}\n if the
+batch was rejected.
+
+Binary frames (little-endian):
+    header  '<4sBBHII': magic b'TCPF', version 1, 0, 0, row count, body bytes
+    body    one block per TELEMETRY_COLUMNS column, in order:
+            fixed width  row count values (timestamp as int64 epoch ms,
+                         is_weekend as uint8, others as in TELEMETRY_ARROW_SCHEMA)
+            string       (rows + 1) int32 offsets, then offsets[rows] UTF-8 bytes
+After each frame the server writes the total rows accepted as '<Q'. A
+malformed frame closes the connection.
+"""
+
+import json
+import struct
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+from clickhouse_client import (
+    TELEMETRY_ARROW_SCHEMA, ColumnarTelemetry,
+    create_clickhouse_client, to_telemetry_table
+)
+from telemetry_buffer import TelemetryBuffer
+from telemetry_spool import DEFAULT_SPOOL_DIR, TelemetrySpool
+
+logger = logging.getLogger(__name__)
+
+FRAME_MAGIC = b'TCPF'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<4sBBHII')
+ACK = struct.Struct('<Q')
+
+def encode_frame(data: ColumnarTelemetry) -> bytes:
+    """
+    Encode columnar telemetry as one binary ingest frame
+
+    Args:
+        data: Anything ClickHouseClient.insert_telemetry_columnar accepts
+
+    Returns:
+        Frame bytes (header and body)
+    """
+    table = to_telemetry_table(data).combine_chunks()
+    rows = table.num_rows
+    blocks = []
+
+    for field, column in zip(TELEMETRY_ARROW_SCHEMA, table.columns):
+        array = column.chunk(0) if column.num_chunks else pa.array([], field.type)
+        if pa.types.is_string(field.type):
+            offsets_buffer, data_buffer = array.buffers()[1:3]
+            offsets = pa.Array.from_buffers(pa.int32(), rows + 1, [None, offsets_buffer],
+                                            offset=array.offset).to_numpy()
+            start, end = int(offsets[0]), int(offsets[-1])
+            blocks.append((offsets - start).astype('<i4').tobytes())
+            blocks.append(data_buffer.to_pybytes()[start:end] if data_buffer else b'')
+        else:
+            width = field.type.bit_width // 8
+            values = array.buffers()[1]
+            blocks.append(values.to_pybytes()[array.offset * width:(array.offset + rows) * width])
+
+    body = b''.join(blocks)
+    return FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, 0, 0, rows, len(body)) + body
+
+def decode_frame_body(rows: int, body: bytes) -> pa.Table:
+    """
+    Decode a binary frame body into a TELEMETRY_ARROW_SCHEMA table without per-row work
+
+    Args:
+        rows: Row count from the frame header
+        body: Frame body
+
+    Returns:
+        Arrow table referencing the body buffer
+    """
+    buffer = pa.py_buffer(body)
+    position = 0
+    arrays = []
+
+    for field in TELEMETRY_ARROW_SCHEMA:
+        if pa.types.is_string(field.type):
+            offsets = buffer.slice(position, (rows + 1) * 4)
+            position += (rows + 1) * 4
+            if offsets.size != (rows + 1) * 4:
+                raise ValueError(f"Truncated offsets for column {field.name}")
+            size = struct.unpack_from('<i', offsets, rows * 4)[0]
+            values = buffer.slice(position, size)
+            position += size
+            array = pa.StringArray.from_buffers(rows, offsets, values)
+        else:
+            size = rows * (field.type.bit_width // 8)
+            array = pa.Array.from_buffers(field.type, rows, [None, buffer.slice(position, size)])
+            position += size
+
+        if position > len(body):
+            raise ValueError(f"Frame body too short at column {field.name}")
+        array.validate(full=pa.types.is_string(field.type))
+        arrays.append(array)
+
+    if position != len(body):
+        raise ValueError(f"Frame body has {len(body) - position} trailing bytes")
+    return pa.Table.from_arrays(arrays, schema=TELEMETRY_ARROW_SCHEMA)
+
+def _ndjson_schema(iso_timestamps: bool, bool_weekend: bool) -> pa.Schema:
+    """
+    JSON parse schema for TELEMETRY_ARROW_SCHEMA columns
+
+    Every other number is read as float64, so integer and float literals mix
+    freely; to_telemetry_table then casts to the telemetry types.
+    """
+    fields = []
+    for field in TELEMETRY_ARROW_SCHEMA:
+        if field.name == 'timestamp':
+            fields.append(pa.field(field.name, pa.timestamp('us') if iso_timestamps else pa.float64()))
+        elif field.name == 'is_weekend':
+            fields.append(pa.field(field.name, pa.bool_() if bool_weekend else pa.float64()))
+        elif pa.types.is_string(field.type):
+            fields.append(field)
+        else:
+            fields.append(pa.field(field.name, pa.float64()))
+    return pa.schema(fields)
+
+# timestamp may be ISO-8601 or epoch ms and is_weekend a bool or 0/1, one kind per batch
+NDJSON_SCHEMAS = [_ndjson_schema(iso, flag) for iso in (True, False) for flag in (True, False)]
+
+def decode_ndjson(lines: bytes, schema: Optional[pa.Schema] = None) -> Tuple[pa.Table, pa.Schema]:
+    """
+    Parse a block of complete NDJSON lines into a TELEMETRY_ARROW_SCHEMA table
+
+    Args:
+        lines: Newline-terminated JSON objects
+        schema: NDJSON_SCHEMAS entry to try first (the one that parsed the
+            connection's previous batch)
+
+    Returns:
+        (Arrow table ready for TelemetryBuffer.add_columnar, parse schema used)
+    """
+    candidates = [schema] if schema is not None else []
+    candidates += [candidate for candidate in NDJSON_SCHEMAS if candidate is not schema]
+
+    error = None
+    for candidate in candidates:
+        try:
+            table = pa_json.read_json(
+                pa.BufferReader(lines),
+                read_options=pa_json.ReadOptions(block_size=max(len(lines), 1 << 20)),
+                parse_options=pa_json.ParseOptions(explicit_schema=candidate,
+                                                   unexpected_field_behavior='ignore')
+            )
+        except pa.ArrowInvalid as e:
+            error = error or e
+            continue
+        if table.schema.field('timestamp').type == pa.float64():
+            index = table.schema.get_field_index('timestamp')
+            table = table.set_column(index, 'timestamp',
+                                     table['timestamp'].cast(pa.int64()).cast(pa.timestamp('ms')))
+        return to_telemetry_table(table), candidate
+    raise error
+
+class TelemetryIngestServer:
+    """
+    Local TCP / Unix socket endpoint for agent telemetry
+
+    Each connection decodes whole batches (a read chunk of NDJSON lines or a
+    binary frame) into Arrow columns and queues them on a TelemetryBuffer,
+    whose back-pressure is propagated to the agent by delaying the ack.
+    """
+
+    def __init__(self, buffer: TelemetryBuffer, host: str = '127.0.0.1', port: int = 9010,
+                 unix_path: Optional[str] = None, read_chunk_bytes: int = 1024 * 1024,
+                 max_frame_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize ingest server
+
+        Args:
+            buffer: Started telemetry buffer that receives decoded batches
+            host: TCP listen address (ignored when unix_path is set)
+            port: TCP listen port (0 picks a free port)
+            unix_path: Listen on this Unix socket instead of TCP
+            read_chunk_bytes: NDJSON bytes read and parsed per batch
+            max_frame_bytes: Largest binary frame body accepted
+        """
+        self.buffer = buffer
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.read_chunk_bytes = read_chunk_bytes
+        self.max_frame_bytes = max_frame_bytes
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+
+        # Metrics
+        self._connections_total = 0
+        self._records = 0
+        self._batches = 0
+        self._bytes = 0
+        self._decode_errors = 0
+
+    @property
+    def address(self) -> Any:
+        """Bound address: (host, port) for TCP or the socket path"""
+        if self.unix_path:
+            return self.unix_path
+        return self._server.sockets[0].getsockname()[:2] if self._server else (self.host, self.port)
+
+    async def start(self):
+        """Start accepting connections"""
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Telemetry ingest server listening on {self.address}")
+
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled"""
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections and wait for open ones to finish their batch"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        logger.info("Telemetry ingest server closed")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get ingest metrics
+
+        Returns:
+            Dictionary with connection, record and error counters
+        """
+        return {
+            'connections_total': self._connections_total,
+            'active_connections': len(self._connections),
+            'records': self._records,
+            'batches': self._batches,
+            'bytes': self._bytes,
+            'decode_errors': self._decode_errors
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one agent connection"""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        self._connections_total += 1
+        try:
+            head = await reader.read(1)
+            if not head:
+                return
+            # JSON lines start with '{' (or whitespace), frames with the magic
+            if head == FRAME_MAGIC[:1]:
+                await self._serve_frames(reader, writer, head)
+            else:
+                await self._serve_ndjson(reader, writer, head)
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to serve ingest connection: {e}")
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _accept(self, table: pa.Table, nbytes: int) -> bool:
+        """Queue a decoded batch, waiting for buffer space"""
+        if not await self.buffer.add_columnar(table):
+            return False
+        self._records += table.num_rows
+        self._batches += 1
+        self._bytes += nbytes
+        return True
+
+    async def _serve_ndjson(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter, pending: bytes):
+        """NDJSON protocol: parse whole lines a read chunk at a time"""
+        schema = None
+        accepted = 0
+        while True:
+            chunk = await reader.read(self.read_chunk_bytes)
+            pending += chunk
+            end = len(pending) if not chunk else pending.rfind(b'\n') + 1
+            if not end:
+                if not chunk:
+                    return
+                continue
+
+            lines, pending = pending[:end], pending[end:]
+            if not lines.strip():
+                if not chunk:
+                    return
+                continue
+
+            try:
+                table, schema = decode_ndjson(lines, schema)
+            except Exception as e:
+                self._decode_errors += 1
+                logger.warning(f"Rejected NDJSON batch: {e}")
+                writer.write(json.dumps({'error': str(e)}).encode() + b'\n')
+            else:
+                if await self._accept(table, len(lines)):
+                    accepted += table.num_rows
+                writer.write(b'{"accepted": %d}\n' % accepted)
+            await writer.drain()
+
+            if not chunk:
+                return
+
+    async def _serve_frames(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter, head: bytes):
+        """Binary protocol: one frame per batch"""
+        accepted = 0
+        while True:
+            header = head + await reader.readexactly(FRAME_HEADER.size - len(head))
+            magic, version, _, _, rows, size = FRAME_HEADER.unpack(header)
+            if magic != FRAME_MAGIC or version != FRAME_VERSION or size > self.max_frame_bytes:
+                self._decode_errors += 1
+                logger.warning(f"Closing ingest connection after bad frame header "
+                               f"(magic={magic!r}, version={version}, size={size})")
+                return
+
+            body = await reader.readexactly(size)
+            try:
+                table = decode_frame_body(rows, body)
+            except Exception as e:
+                self._decode_errors += 1
+                logger.warning(f"Closing ingest connection after malformed frame: {e}")
+                return
+
+            if await self._accept(table, FRAME_HEADER.size + size):
+                accepted += rows
+            writer.write(ACK.pack(accepted))
+            await writer.drain()
+
+            head = await reader.read(1)
+            if not head:
+                return
+
+async def main_async(args):
+    client = await create_clickhouse_client(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, database=args.database
+    )
+    # Acknowledged rows survive a ClickHouse outage in the spool unless disabled
+    spool = None if args.no_spool else TelemetrySpool(client, directory=args.spool_dir)
+    if spool:
+        await spool.start()
+    try:
+        async with TelemetryBuffer(client, max_rows=args.max_rows, max_latency=args.max_latency,
+                                   spool=spool) as buffer:
+            server = TelemetryIngestServer(buffer, host=args.listen_host, port=args.listen_port,
+                                           unix_path=args.unix)
+            try:
+                await server.serve_forever()
+            finally:
+                await server.close()
+                logger.info(f"Ingest metrics: {server.metrics()}, buffer: {buffer.metrics()}")
+    finally:
+        if spool:
+            await spool.close()
+        client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Local telemetry ingest server")
+    parser.add_argument("--listen-host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=9010)
+    parser.add_argument("--unix", help="Listen on a Unix socket path instead of TCP")
+    parser.add_argument("--max-rows", type=int, default=50_000, help="Buffer flush size")
+    parser.add_argument("--max-latency", type=float, default=1.0, help="Buffer flush latency (s)")
+    parser.add_argument("--spool-dir", default=DEFAULT_SPOOL_DIR,
+                        help="Spill batches whose insert fails here and replay them")
+    parser.add_argument("--no-spool", action="store_true",
+                        help="Disable the spool (failed inserts are dropped)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main_async(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,8 @@ import os
 import json
 from datetime import datetime
 
+from features.engineering import FEATURES
+
 logger = logging.getLogger(__name__)
 
 class AnomalyDetector:
@@ -70,12 +72,13 @@ class AnomalyDetector:
         if not available_features:
             raise ValueError("No statistical features found in data")
         
-        logger.info(f"Using {len(available_features)} statistical features: {available_features}")
-        
-        # Extract and clean data
-        X = df[available_features].fillna(0)
+        missing = [col for col in self.statistical_features if col not in available_features]
+        logger.info(f"Using {len(self.statistical_features)} statistical features"
+                    + (f" ({len(missing)} at registry defaults: {missing})" if missing else ""))
         
-        return X.values
+        # Extract and clean data; absent features take their registry defaults so
+        # training and detect_single_anomaly see the same columns
+        return FEATURES.compile(self.statistical_features).matrix(df).values
     
     def prepare_sequence_data(self, df: pd.DataFrame) -> np.ndarray:
         """
@@ -297,7 +300,7 @@ class AnomalyDetector:
             raise ValueError("Models not trained. Call train() first.")
         
         # Prepare statistical features
-        statistical_vector = np.array([[features.get(col, 0) for col in self.statistical_features]])
+        statistical_vector = FEATURES.compile(self.statistical_features).matrix([features]).values
         statistical_scaled = self.statistical_scaler.transform(statistical_vector)
         
         # Statistical anomaly detection
@@ -88,9 +88,13 @@ class TransferPerformancePredictor:
     
     def train(self, X_train: np.ndarray, y_throughput: np.ndarray, y_completion_time: np.ndarray,
               X_val: Optional[np.ndarray] = None, y_throughput_val: Optional[np.ndarray] = None,
-              y_completion_time_val: Optional[np.ndarray] = None) -> Dict[str, float]:
+              y_completion_time_val: Optional[np.ndarray] = None,
+              sampling: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
         """
         Train both throughput and completion time models
+        
+        sampling describes how the training rows were sampled (see
+        TrainingSample.to_dict) and is stored in the model metadata.
         """
         logger.info("Training performance prediction models...")
         
@@ -144,6 +148,7 @@ class TransferPerformancePredictor:
             'trained_at': datetime.now().isoformat(),
             'training_samples': len(X_train),
             'feature_count': len(self.feature_names),
+            'sampling': sampling or {'ratio': 1.0},
             'metrics': metrics
         }
         
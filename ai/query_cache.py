@@ -0,0 +1,159 @@
+"""
+In-Process Query Result Cache
+TTL/LRU read-through cache with single-flight loading for ClickHouseClient reads
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def _freeze(value: Any) -> Hashable:
+    """Turn query parameters into a hashable cache key component"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value) if isinstance(value, (set, frozenset)) else value
+        return tuple(_freeze(item) for item in items)
+    return value
+
+class _LoaderCancelled(Exception):
+    """Raised to coalesced waiters when the caller running the load is cancelled"""
+
+class QueryCache:
+    """
+    Read-through cache keyed by (query template, parameters, time bucket)
+
+    Entries live for the TTL of their template and are additionally scoped to
+    a wall-clock bucket of that length, so all readers in a window share one
+    result. Concurrent misses for the same key share a single load; if the
+    caller running it is cancelled, one of the waiting callers loads instead.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 30.0,
+                 ttls: Optional[Dict[str, float]] = None):
+        """
+        Initialize query cache
+
+        Args:
+            max_entries: LRU size limit
+            default_ttl: TTL in seconds for templates without an explicit TTL
+            ttls: Per-template TTL overrides in seconds (0 disables caching)
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def ttl_for(self, name: str) -> float:
+        """TTL in seconds for a query template"""
+        return self.ttls.get(name, self.default_ttl)
+
+    async def get_or_load(self, name: str, parameters: Optional[Dict[str, Any]],
+                          loader: Callable[[], Awaitable[Any]], variant: Hashable = None) -> Any:
+        """
+        Return a cached result or load it once for all concurrent callers
+
+        Args:
+            name: Query template name
+            parameters: Query parameters
+            loader: Coroutine factory that runs the query on a miss
+            variant: Extra key component (e.g. result format)
+
+        Returns:
+            Query result
+        """
+        ttl = self.ttl_for(name)
+        if ttl <= 0:
+            return await loader()
+
+        key = (name, variant, _freeze(parameters or {}), int(time.time() // ttl))
+        while True:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                return await self._load(key, now + ttl, loader)
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(in_flight)
+            except _LoaderCancelled:
+                # The leading caller was cancelled, not us: load (or join) again
+                continue
+
+    async def _load(self, key: Tuple, expires_at: float, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run loader as the leading caller for key and share its outcome"""
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Waiters were not cancelled themselves; let one of them retry
+            future.set_exception(_LoaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not reported on GC
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            self._store(key, expires_at, value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def invalidate(self, name: Optional[str] = None):
+        """Drop cached entries for one template, or all entries"""
+        if name is None:
+            self._entries.clear()
+        else:
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with size, hits, misses and hit rate
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+    def _store(self, key: Tuple, expires_at: float, value: Any):
+        """Insert an entry, evicting least recently used ones over the limit"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,167 @@
+"""
+Client-side Query Profiler
+Per-call timings and ClickHouse read/write statistics for ClickHouseClient
+"""
+
+import time
+import logging
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class QueryProfile:
+    """One ClickHouseClient call"""
+    caller: str                # public ClickHouseClient method that issued the call
+    query: str                 # template name, insert target or leading SQL keywords
+    method: str                # clickhouse_connect method ('query_df', 'insert', ...)
+    event_time: datetime
+    wall_ms: float             # including wait_ms
+    wait_ms: float = 0.0       # time spent waiting for a pooled session
+    read_rows: int = 0         # from X-ClickHouse-Summary, 0 when not reported
+    read_bytes: int = 0
+    written_rows: int = 0
+    written_bytes: int = 0
+    result_rows: int = 0
+    result_bytes: int = 0
+    query_id: str = ''
+    error: str = ''
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary"""
+        return asdict(self)
+
+@dataclass
+class _QueryStats:
+    """Running totals for one (caller, query) pair"""
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    wait_ms: float = 0.0
+    read_rows: int = 0
+    read_bytes: int = 0
+    written_rows: int = 0
+    result_rows: int = 0
+    result_bytes: int = 0
+    recent_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+class QueryProfiler:
+    """
+    In-process metrics registry for ClickHouseClient calls
+
+    Attach one with ClickHouseClient(profiler=QueryProfiler()). Every query,
+    command, insert and stream is recorded with its wall time, the rows and
+    bytes ClickHouse reports reading, and the size of the result. Profiles
+    can also be written in batches to a ClickHouse table.
+    """
+
+    def __init__(self, history: int = 1000, slow_query_ms: Optional[float] = None,
+                 log_table: Optional[str] = None, log_batch_rows: int = 1000,
+                 log_interval: float = 10.0):
+        """
+        Initialize query profiler
+
+        Args:
+            history: Number of recent profiles kept for recent()
+            slow_query_ms: Log a warning for calls slower than this
+            log_table: Table the client writes profiles to (None disables it)
+            log_batch_rows: Pending profiles that trigger a log table write
+            log_interval: Max seconds between log table writes while calls arrive
+        """
+        self.slow_query_ms = slow_query_ms
+        self.log_table = log_table
+        self.log_batch_rows = log_batch_rows
+        self.log_interval = log_interval
+
+        self._recent: Deque[QueryProfile] = deque(maxlen=history)
+        self._stats: Dict[Tuple[str, str], _QueryStats] = {}
+        self._pending: List[QueryProfile] = []
+        self._last_log_write = time.monotonic()
+
+    def record(self, profile: QueryProfile):
+        """Add a finished call to the registry"""
+        self._recent.append(profile)
+
+        stats = self._stats.get((profile.caller, profile.query))
+        if stats is None:
+            stats = self._stats[(profile.caller, profile.query)] = _QueryStats()
+        stats.calls += 1
+        stats.errors += bool(profile.error)
+        stats.total_ms += profile.wall_ms
+        stats.max_ms = max(stats.max_ms, profile.wall_ms)
+        stats.wait_ms += profile.wait_ms
+        stats.read_rows += profile.read_rows
+        stats.read_bytes += profile.read_bytes
+        stats.written_rows += profile.written_rows
+        stats.result_rows += profile.result_rows
+        stats.result_bytes += profile.result_bytes
+        stats.recent_ms.append(profile.wall_ms)
+
+        if self.log_table:
+            self._pending.append(profile)
+
+        if self.slow_query_ms is not None and profile.wall_ms >= self.slow_query_ms:
+            logger.warning(f"Slow ClickHouse call {profile.caller}/{profile.query}: "
+                           f"{profile.wall_ms:.1f} ms, {profile.read_rows} rows read")
+
+    def stats(self, sort_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        """
+        Aggregated statistics per caller and query
+
+        Args:
+            sort_by: Field to sort by, descending (e.g. 'total_ms', 'read_bytes', 'p95_ms')
+
+        Returns:
+            One dictionary per (caller, query), most expensive first
+        """
+        rows = []
+        for (caller, query), stats in self._stats.items():
+            recent = np.fromiter(stats.recent_ms, dtype=float)
+            rows.append({
+                'caller': caller,
+                'query': query,
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'total_ms': stats.total_ms,
+                'avg_ms': stats.total_ms / stats.calls,
+                'p50_ms': float(np.percentile(recent, 50)),
+                'p95_ms': float(np.percentile(recent, 95)),
+                'max_ms': stats.max_ms,
+                'wait_ms': stats.wait_ms,
+                'read_rows': stats.read_rows,
+                'read_bytes': stats.read_bytes,
+                'written_rows': stats.written_rows,
+                'result_rows': stats.result_rows,
+                'result_bytes': stats.result_bytes,
+            })
+        return sorted(rows, key=lambda row: row[sort_by], reverse=True)
+
+    def recent(self, limit: Optional[int] = None) -> List[QueryProfile]:
+        """Most recent profiles, newest last"""
+        profiles = list(self._recent)
+        return profiles[-limit:] if limit else profiles
+
+    def reset(self):
+        """Clear all recorded statistics"""
+        self._recent.clear()
+        self._stats.clear()
+        self._pending.clear()
+
+    def log_due(self) -> bool:
+        """Whether pending profiles should be written to the log table now"""
+        if not self._pending:
+            return False
+        return (len(self._pending) >= self.log_batch_rows or
+                time.monotonic() - self._last_log_write >= self.log_interval)
+
+    def take_pending(self) -> List[QueryProfile]:
+        """Hand pending profiles to the log table writer"""
+        pending, self._pending = self._pending, []
+        self._last_log_write = time.monotonic()
+        return pending
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Agent Features Benchmark
+Compares latency of looped get_agent_features calls against one
+get_agent_features_many query for 10/100/1000 agents
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient
+from benchmark_telemetry_insert import make_columns
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+async def run_benchmark(client: ClickHouseClient, agent_counts: List[int],
+                        hours: int, repeat: int) -> List[Dict]:
+    """Time looped and batched feature lookups for each agent count"""
+    results = []
+
+    for count in agent_counts:
+        agent_ids = [f"agent-{i + 1:03d}" for i in range(count)]
+
+        async def looped():
+            return {agent_id: await client.get_agent_features(agent_id, hours)
+                    for agent_id in agent_ids}
+
+        async def batched():
+            return await client.get_agent_features_many(agent_ids, hours)
+
+        for path, call in [('looped', looped), ('batched', batched)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await call()
+                timings.append(time.perf_counter() - start)
+
+            best = min(timings)
+            results.append({'agents': count, 'path': path, 'seconds': best})
+            print(f"{count:>6} agents  {path:<8} {best * 1000:10.1f} ms")
+
+    return results
+
+async def main_async(args):
+    client = ClickHouseClient(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, database=args.database
+    )
+    if not await client.connect():
+        sys.exit(1)
+
+    try:
+        await client.initialize_schema()
+        if args.seed_rows:
+            await client.insert_telemetry_columnar(
+                make_columns(args.seed_rows, num_agents=max(args.agents))
+            )
+        await run_benchmark(client, args.agents, args.hours, args.repeat)
+    finally:
+        client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark agent feature lookups")
+    parser.add_argument("--agents", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Agent counts to benchmark")
+    parser.add_argument("--hours", type=int, default=24, help="Feature window in hours")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (best is reported)")
+    parser.add_argument("--seed-rows", type=int, default=0,
+                        help="Insert this many synthetic rows before benchmarking")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Feature Engineering Benchmark
+Compares the columnar FeatureEngineer.prepare_training_data with the previous
+iterrows/create_feature_vector path, create_rolling_features with pandas'
+groupby().rolling('5min'), OnlineFeatureStates with create_rolling_features and
+the registry's float32 matrices with create_feature_frame, checking that each
+pair gives the same output
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features.engineering import FeatureEngineer
+from features.online import OnlineFeatureStates
+from synthetic_telemetry import generate_synthetic_telemetry
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+def prepare_training_data_rowwise(engineer: FeatureEngineer, df: pd.DataFrame) -> pd.DataFrame:
+    """The previous prepare_training_data: one create_feature_vector call per row"""
+    df = engineer.create_rolling_features(df)
+    feature_df = pd.DataFrame([engineer.create_feature_vector(row.to_dict()) for _, row in df.iterrows()])
+    feature_df = feature_df.fillna(0)
+
+    numeric_columns = feature_df.select_dtypes(include=[np.number]).columns
+    if len(numeric_columns) > 0:
+        if 'scaler' not in engineer.scalers:
+            engineer.scalers['scaler'] = StandardScaler()
+            feature_df[numeric_columns] = engineer.scalers['scaler'].fit_transform(feature_df[numeric_columns])
+        else:
+            feature_df[numeric_columns] = engineer.scalers['scaler'].transform(feature_df[numeric_columns])
+    return feature_df
+
+def rolling_reference(df: pd.DataFrame, windows: List[int] = [5, 15, 30, 60]) -> pd.DataFrame:
+    """create_rolling_features via pandas groupby(agent_id).rolling('<w>min'), one pass per statistic"""
+    df = df.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = df.sort_values('timestamp')
+    by_agent = df.sort_values(['agent_id', 'timestamp'], kind='stable')
+
+    features = {}
+    for metric in ['throughput_mbps', 'latency_ms', 'cpu_usage', 'memory_usage']:
+        series = by_agent.set_index('timestamp').groupby(by_agent['agent_id'].to_numpy())[metric]
+        for window in windows:
+            rolling = series.rolling(f'{window}min')
+            for name, result in [(f'{metric}_rolling_{window}m', rolling.mean()),
+                                 (f'{metric}_rolling_std_{window}m', rolling.std()),
+                                 (f'{metric}_rolling_min_{window}m', rolling.min()),
+                                 (f'{metric}_rolling_max_{window}m', rolling.max())]:
+                features[name] = pd.Series(result.to_numpy(), index=by_agent.index)
+    return df.assign(**features)
+
+def make_frame(rows: int, seed: int) -> pd.DataFrame:
+    """Synthetic telemetry as returned by get_training_data"""
+    agents = 100
+    columns = generate_synthetic_telemetry(agents, -(-rows // agents), seed=seed,
+                                           start=datetime(2024, 1, 1), stagger=True)
+    return pd.DataFrame(columns).head(rows)
+
+def make_edge_frame(seed: int) -> pd.DataFrame:
+    """Optional columns, NaNs, zero divisors and threshold boundaries"""
+    rng = np.random.default_rng(seed)
+    n = 2000
+    df = make_frame(n, seed)
+    df['network_type'] = rng.choice(['wifi', 'ethernet', 'cellular', 'unknown'], n)
+    df['retry_count'] = rng.integers(0, 3, n)
+    df['compression_ratio'] = rng.choice([1.0, 1.5, 2.0], n)
+    df['disk_io_wait'] = rng.choice([0.0, 10.0, 11.0, np.nan], n)
+    df['load_average'] = rng.choice([1.0, 2.0, 2.5], n)
+    df['cpu_usage'] = rng.choice([49.9, 50.0, 80.0, 95.0, np.nan], n)
+    df['latency_ms'] = rng.choice([10.0, 50.0, 200.0, 1500.0, np.nan], n)
+    df['packet_loss_rate'] = rng.choice([0.0, 0.001, 0.01, 2.0, np.nan], n)
+    df['bandwidth_mbps'] = rng.choice([0.0, 50.0, 100.0, np.nan], n)
+    df['concurrent_connections'] = rng.choice([0, 1, 4, 5], n)
+    return df
+
+def check_parity(df: pd.DataFrame, label: str) -> bool:
+    """Compare both paths on copies of df"""
+    expected = prepare_training_data_rowwise(FeatureEngineer(), df.copy())
+    actual = FeatureEngineer().prepare_training_data(df.copy())
+
+    try:
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    except AssertionError as e:
+        print(f"parity {label}: FAILED\n{e}")
+        return False
+    print(f"parity {label}: identical ({len(actual)} rows x {len(actual.columns)} features)")
+    return True
+
+def check_rolling(df: pd.DataFrame, label: str) -> bool:
+    """Compare create_rolling_features with the pandas reference"""
+    expected = rolling_reference(df)
+    actual = FeatureEngineer().create_rolling_features(df.copy())
+
+    columns = [column for column in expected.columns if '_rolling_' in column]
+    # pandas' running sums drift by ~1e-6 on constant stretches; ours are exact there
+    mismatched = [column for column in columns if not np.allclose(
+        actual.loc[expected.index, column], expected[column], rtol=1e-6, atol=1e-4, equal_nan=True)]
+    if mismatched:
+        print(f"rolling {label}: FAILED for {', '.join(mismatched)}")
+        return False
+    print(f"rolling {label}: matches pandas ({len(columns)} window features)")
+    return True
+
+def check_matrix(df: pd.DataFrame, label: str) -> float:
+    """Compare feature_matrix on the frame and on its records with create_feature_frame; returns us/record"""
+    engineer = FeatureEngineer()
+    expected = engineer.create_feature_frame(df).fillna(0).to_numpy(dtype=np.float32)
+    records = df.to_dict('records')
+
+    from_frame = engineer.feature_matrix(df).values
+    start = time.perf_counter()
+    from_records = np.concatenate([engineer.feature_matrix([record]).values for record in records[:1000]])
+    elapsed = time.perf_counter() - start
+
+    if not (np.array_equal(from_frame, expected) and np.array_equal(from_records, expected[:1000])):
+        print(f"matrix {label}: FAILED")
+        return 0.0
+    print(f"matrix {label}: identical ({from_frame.shape[0]} rows x {from_frame.shape[1]} features)")
+    return elapsed / min(len(records), 1000) * 1e6
+
+def check_online(df: pd.DataFrame, label: str) -> float:
+    """Replay df one sample at a time and compare with create_rolling_features; returns us/sample"""
+    expected = FeatureEngineer().create_rolling_features(df.copy())
+    samples = expected.to_dict('records')
+
+    states = OnlineFeatureStates()
+    start = time.perf_counter()
+    rows = [states.update(sample) for sample in samples]
+    elapsed = time.perf_counter() - start
+    actual = pd.DataFrame(rows, index=expected.index)
+
+    mismatched = [column for column in actual.columns if not np.allclose(
+        actual[column], expected[column], rtol=1e-6, atol=1e-6, equal_nan=True)]
+    if mismatched:
+        print(f"online {label}: FAILED for {', '.join(mismatched)}")
+        return 0.0
+    print(f"online {label}: matches batch ({len(actual.columns)} window features)")
+    return elapsed / len(samples) * 1e6
+
+def time_call(func, df: pd.DataFrame, repeat: int) -> float:
+    """Best wall time of func over fresh copies of df"""
+    timings = []
+    for _ in range(repeat):
+        data = df.copy()
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark feature engineering")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows for the columnar path")
+    parser.add_argument("--rowwise-rows", type=int, default=50_000,
+                        help="Rows for the row-wise path (it is extrapolated from these)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path (best is reported)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--skip-parity", action="store_true", help="Only measure throughput")
+    parser.add_argument("--parity-only", action="store_true",
+                        help="Only run the parity checks (exit status 1 on a mismatch)")
+    args = parser.parse_args()
+
+    if not args.skip_parity:
+        ok = check_parity(make_frame(20_000, args.seed), 'telemetry')
+        ok = check_parity(make_edge_frame(args.seed), 'edge cases') and ok
+        ok = check_parity(make_edge_frame(args.seed).drop(columns=['timestamp']), 'no timestamp') and ok
+        ok = check_rolling(make_frame(20_000, args.seed), 'telemetry') and ok
+        ok = check_rolling(make_edge_frame(args.seed), 'edge cases') and ok
+        ok = bool(check_matrix(make_edge_frame(args.seed), 'edge cases')) and ok
+        ok = bool(check_online(make_edge_frame(args.seed), 'edge cases')) and ok
+        if not ok:
+            sys.exit(1)
+        if args.parity_only:
+            return
+
+    rowwise_df = make_frame(args.rowwise_rows, args.seed)
+    columnar_df = make_frame(args.rows, args.seed)
+
+    rowwise = time_call(lambda data: prepare_training_data_rowwise(FeatureEngineer(), data),
+                        rowwise_df, 1)
+    columnar = time_call(lambda data: FeatureEngineer().prepare_training_data(data),
+                         columnar_df, args.repeat)
+
+    rowwise_rate = len(rowwise_df) / rowwise
+    columnar_rate = len(columnar_df) / columnar
+    print(f"row-wise: {len(rowwise_df):>10,} rows in {rowwise:8.2f}s ({rowwise_rate:>12,.0f} rows/s)")
+    print(f"columnar: {len(columnar_df):>10,} rows in {columnar:8.2f}s ({columnar_rate:>12,.0f} rows/s)")
+    print(f"speedup:  {columnar_rate / rowwise_rate:.0f}x")
+
+    matrix = time_call(lambda data: FeatureEngineer().feature_matrix(data), columnar_df, args.repeat)
+    print(f"float32 matrix: {len(columnar_df):>10,} rows in {matrix:8.2f}s")
+
+    reference = time_call(rolling_reference, columnar_df, 1)
+    rolling = time_call(lambda data: FeatureEngineer().create_rolling_features(data),
+                        columnar_df, args.repeat)
+    print(f"rolling windows, {len(columnar_df):,} rows x 64 features:")
+    print(f"  pandas groupby().rolling(): {reference:8.2f}s")
+    print(f"  create_rolling_features:    {rolling:8.2f}s ({reference / rolling:.1f}x)")
+
+    record_us = check_matrix(make_frame(20_000, args.seed), 'telemetry')
+    print(f"single-record matrix: {record_us:.0f} us/record")
+
+    update_us = check_online(make_frame(20_000, args.seed), 'telemetry')
+    print(f"online update: {update_us:.1f} us/sample")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Feature Store Benchmark
+Compares per-agent feature lookups through get_agent_features with
+FeatureStore point lookups, and times a full snapshot refresh
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient
+from feature_store import FeatureStore, SNAPSHOT_COLUMNS
+from synthetic_telemetry import generate_synthetic_telemetry
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+async def run_benchmark(client: ClickHouseClient, lookups: int, repeat: int):
+    """Time a refresh, then the same agents through each lookup path"""
+    store = FeatureStore(client)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        agents = await store.refresh()
+        timings.append(time.perf_counter() - start)
+    if not agents:
+        print("No telemetry in the last hour; use --seed-agents")
+        return
+    print(f"refresh: {agents} agents x {len(SNAPSHOT_COLUMNS)} features in {min(timings):.2f}s")
+
+    agent_ids = store.table.agent_ids
+    sample = [agent_ids[i % len(agent_ids)] for i in range(min(lookups, 200))]
+
+    start = time.perf_counter()
+    for agent_id in sample:
+        await client.get_agent_features(agent_id)
+    remote = (time.perf_counter() - start) / len(sample)
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        store.lookup(agent_ids[i % len(agent_ids)])
+    local = (time.perf_counter() - start) / lookups
+
+    print(f"get_agent_features:  {remote * 1e6:10.1f} us/lookup")
+    print(f"FeatureStore.lookup: {local * 1e6:10.1f} us/lookup")
+
+async def main_async(args):
+    client = ClickHouseClient(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, database=args.database
+    )
+    if not await client.connect():
+        sys.exit(1)
+
+    try:
+        await client.initialize_schema()
+        if args.seed_agents:
+            # Samples ending now, so they fall inside the rolling windows
+            await client.insert_telemetry_columnar(generate_synthetic_telemetry(
+                args.seed_agents, 90, seed=42,
+                start=datetime.now(timezone.utc) - timedelta(minutes=90), stagger=True
+            ))
+        await run_benchmark(client, args.lookups, args.repeat)
+    finally:
+        client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark feature store lookups")
+    parser.add_argument("--lookups", type=int, default=100_000, help="FeatureStore lookups to time")
+    parser.add_argument("--repeat", type=int, default=3, help="Refreshes (best is reported)")
+    parser.add_argument("--seed-agents", type=int, default=0,
+                        help="Insert 90 minutes of synthetic telemetry for this many agents first")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
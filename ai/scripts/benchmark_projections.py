@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Telemetry Projection Benchmark
+Times project-scoped and time-window-only queries on a synthetic tcp_telemetry
+table with the schema migration 2 projections disabled and enabled
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient
+from clickhouse_migrations import (
+    TELEMETRY_TABLE_DDL, telemetry_compression_alters, telemetry_projection_alters
+)
+from clickhouse_queries import get_query
+from benchmark_telemetry_insert import make_columns
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+TABLE = 'tcp_telemetry_bench_projections'
+
+async def create_table(client: ClickHouseClient, rows: int, chunk_rows: int,
+                       days: int, projects: int):
+    """Create the benchmark table with projections and fill it with synthetic telemetry"""
+    await client._execute('command', f"DROP TABLE IF EXISTS {TABLE}")
+    await client._execute('command', TELEMETRY_TABLE_DDL.format(table=TABLE))
+    for statement in telemetry_compression_alters(TABLE) + telemetry_projection_alters(TABLE):
+        await client._execute('command', statement)
+
+    # Spread rows evenly over the window, newest last
+    start = np.datetime64(datetime.now() - timedelta(days=days), 'ms')
+    step_ms = max(1, days * 86_400_000 // rows)
+
+    for offset in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - offset)
+        columns = make_columns(size, seed=offset)
+        columns['timestamp'] = start + ((offset + np.arange(size)) * step_ms).astype('timedelta64[ms]')
+        columns['project_id'] = np.array([f"project-{i % projects + 1:02d}"
+                                          for i in range(offset, offset + size)])
+        await client.insert_telemetry_columnar(columns, table=TABLE)
+        print(f"  inserted {offset + size:>11,} / {rows:,} rows", end='\r')
+    print()
+
+    await client._execute('command', f"OPTIMIZE TABLE {TABLE} FINAL", timeout=None)
+
+def _bench_sql(name: str) -> str:
+    """Registered template SQL pointed at the benchmark table"""
+    return get_query(name).sql.replace('FROM tcp_telemetry', f'FROM {TABLE}')
+
+async def explain(client: ClickHouseClient, sql: str, parameters: Dict,
+                  use_projections: bool) -> Tuple[str, Optional[str]]:
+    """Read source and granules selected by the planner"""
+    result = await client._execute(
+        'query', f"EXPLAIN indexes = 1 {sql}", parameters=parameters,
+        settings={'optimize_use_projections': int(use_projections)}
+    )
+    lines = [row[0].strip(' │└─') for row in result.result_rows]
+    source = next((line.replace('ReadFromMergeTree', '').strip(' ()') or TABLE
+                   for line in lines if 'ReadFromMergeTree' in line), TABLE)
+    granules = next((line.split(':', 1)[1].strip()
+                     for line in reversed(lines) if line.startswith('Granules:')), None)
+    return source, granules
+
+async def measure(client: ClickHouseClient, sql: str, parameters: Dict,
+                  use_projections: bool, repeat: int) -> float:
+    """Best wall time of a query, results discarded server-side"""
+    settings = {'optimize_use_projections': int(use_projections), 'max_execution_time': 0}
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await client._execute('command', f"{sql} FORMAT Null", parameters=parameters,
+                              settings=settings, timeout=None)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+async def run_benchmark(client: ClickHouseClient, days: int, projects: int,
+                        repeat: int) -> List[Dict]:
+    """Compare each access pattern with projections off and on"""
+    cases = [
+        ('project training data', 'training_data_project',
+         {'project_id': 'project-01', 'hours': days * 24}),
+        ('project analytics', 'project_analytics',
+         {'project_id': 'project-01', 'minutes': 60}),
+        ('project agent summary', 'project_agent_summary',
+         {'project_id': 'project-01', 'hours': 24}),
+        ('time-window training data', 'training_data', {'hours': 1}),
+    ]
+
+    results = []
+    for label, name, parameters in cases:
+        sql = _bench_sql(name)
+        for use_projections in (False, True):
+            seconds = await measure(client, sql, parameters, use_projections, repeat)
+            source, granules = await explain(client, sql, parameters, use_projections)
+            results.append({
+                'query': label,
+                'projections': use_projections,
+                'seconds': seconds,
+                'source': source,
+                'granules': granules
+            })
+            print(f"{label:<26} projections={'on ' if use_projections else 'off'}  "
+                  f"{seconds * 1000:9.1f} ms  granules {granules or '?':>13}  via {source}")
+
+    return results
+
+async def main_async(args):
+    client = ClickHouseClient(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, database=args.database
+    )
+    if not await client.connect():
+        sys.exit(1)
+
+    try:
+        if not args.reuse:
+            await create_table(client, args.rows, args.chunk_rows, args.days, args.projects)
+        await run_benchmark(client, args.days, args.projects, args.repeat)
+        if not args.keep:
+            await client._execute('command', f"DROP TABLE IF EXISTS {TABLE}")
+    finally:
+        client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark tcp_telemetry projections")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="Rows in the benchmark table")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Rows per insert")
+    parser.add_argument("--days", type=int, default=7, help="Days of telemetry to generate")
+    parser.add_argument("--projects", type=int, default=20, help="Distinct project IDs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (best is reported)")
+    parser.add_argument("--reuse", action="store_true", help="Reuse an existing benchmark table")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark table afterwards")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
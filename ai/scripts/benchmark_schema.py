@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Telemetry Schema Benchmark
+Reports on-disk bytes per row and training-query scan time for the baseline
+tcp_telemetry layout and the compressed layout from schema migration 1
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient
+from clickhouse_migrations import TELEMETRY_TABLE_DDL, telemetry_compression_alters
+from clickhouse_queries import get_query
+from benchmark_telemetry_insert import make_columns
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+LAYOUTS = ['baseline', 'compressed']
+
+async def create_table(client: ClickHouseClient, layout: str, rows: int, chunk_rows: int) -> str:
+    """Create and fill a benchmark table with the given layout"""
+    table = f"tcp_telemetry_bench_{layout}"
+    await client._execute('command', f"DROP TABLE IF EXISTS {table}")
+    await client._execute('command', TELEMETRY_TABLE_DDL.format(table=table))
+    if layout == 'compressed':
+        for statement in telemetry_compression_alters(table):
+            await client._execute('command', statement)
+
+    for offset in range(0, rows, chunk_rows):
+        size = min(chunk_rows, rows - offset)
+        await client.insert_telemetry_columnar(make_columns(size, seed=offset), table=table)
+
+    await client._execute('command', f"OPTIMIZE TABLE {table} FINAL", timeout=None)
+    return table
+
+async def measure_storage(client: ClickHouseClient, table: str) -> Dict[str, float]:
+    """On-disk and uncompressed bytes per row from system.parts"""
+    result = await client._execute('query', f"""
+        SELECT sum(rows), sum(bytes_on_disk), sum(data_uncompressed_bytes)
+        FROM system.parts
+        WHERE database = currentDatabase() AND table = '{table}' AND active
+    """)
+    rows, on_disk, uncompressed = result.result_rows[0]
+    return {
+        'rows': rows,
+        'bytes_per_row': on_disk / rows if rows else 0.0,
+        'uncompressed_bytes_per_row': uncompressed / rows if rows else 0.0
+    }
+
+async def measure_scan(client: ClickHouseClient, table: str, hours: int, repeat: int) -> float:
+    """Best wall time of the standard training data query, results discarded server-side"""
+    template = get_query('training_data')
+    sql = template.sql.replace('FROM tcp_telemetry', f'FROM {table}') + ' FORMAT Null'
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await client._execute('command', sql, parameters=template.bind({'hours': hours}),
+                              timeout=None)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+async def run_benchmark(client: ClickHouseClient, rows: int, chunk_rows: int,
+                        hours: int, repeat: int, keep: bool) -> List[Dict]:
+    """Build both layouts and compare them"""
+    results = []
+
+    for layout in LAYOUTS:
+        table = await create_table(client, layout, rows, chunk_rows)
+        storage = await measure_storage(client, table)
+        scan = await measure_scan(client, table, hours, repeat)
+        results.append({'layout': layout, **storage, 'scan_seconds': scan})
+        print(f"{layout:<11} {storage['rows']:>11,} rows  "
+              f"{storage['bytes_per_row']:7.1f} B/row on disk  "
+              f"({storage['uncompressed_bytes_per_row']:6.1f} B/row uncompressed)  "
+              f"scan {scan * 1000:8.1f} ms")
+
+        if not keep:
+            await client._execute('command', f"DROP TABLE IF EXISTS {table}")
+
+    return results
+
+async def main_async(args):
+    client = ClickHouseClient(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, database=args.database
+    )
+    if not await client.connect():
+        sys.exit(1)
+
+    try:
+        await run_benchmark(client, args.rows, args.chunk_rows, args.hours, args.repeat, args.keep)
+    finally:
+        client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark tcp_telemetry storage layouts")
+    parser.add_argument("--rows", type=int, default=5_000_000, help="Rows per layout")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Rows per insert")
+    parser.add_argument("--hours", type=int, default=24 * 7, help="Training query window")
+    parser.add_argument("--repeat", type=int, default=3, help="Scan runs (best is reported)")
+    parser.add_argument("--keep", action="store_true", help="Keep benchmark tables afterwards")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Telemetry Batch Benchmark
+Compares memory per record and construction time of a list of TelemetryRecord
+objects against an Arrow-backed TelemetryBatch
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import TelemetryBatch
+from benchmark_telemetry_insert import columns_to_records, make_columns
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+def measure_memory(build: Callable[[], object]) -> Tuple[object, int]:
+    """
+    Bytes held by the built object: Python heap allocations plus, for a
+    batch, its Arrow buffers (which may alias the source NumPy columns and
+    are not visible to tracemalloc)
+    """
+    tracemalloc.start()
+    result = build()
+    python_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if isinstance(result, TelemetryBatch):
+        python_bytes += result.nbytes
+    return result, python_bytes
+
+def measure_time(build: Callable[[], object], repeat: int) -> float:
+    """Best wall time of a constructor"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_benchmark(sizes: List[int], repeat: int) -> List[Dict]:
+    """Compare both representations for each batch size"""
+    results = []
+    for size in sizes:
+        columns = make_columns(size)
+        records = columns_to_records(columns)
+        batch = TelemetryBatch(columns)
+
+        cases = [
+            ('list[TelemetryRecord]', lambda: columns_to_records(columns)),
+            ('TelemetryBatch(columns)', lambda: TelemetryBatch(columns)),
+            ('TelemetryBatch.from_records', lambda: TelemetryBatch.from_records(records)),
+        ]
+        for label, build in cases:
+            built, retained = measure_memory(build)
+            seconds = measure_time(build, repeat)
+            del built
+            results.append({
+                'rows': size,
+                'representation': label,
+                'bytes_per_record': retained / size,
+                'seconds': seconds
+            })
+            print(f"{size:>9,} rows  {label:<28} {retained / size:8.1f} B/record  "
+                  f"{seconds * 1000:9.1f} ms  ({size / seconds:,.0f} rows/s)")
+
+        # Column access: attribute walk over objects vs one NumPy view
+        start = time.perf_counter()
+        sum(record.throughput_mbps for record in records)
+        object_scan = time.perf_counter() - start
+        start = time.perf_counter()
+        batch.column('throughput_mbps').sum()
+        column_scan = time.perf_counter() - start
+        print(f"{size:>9,} rows  column scan: records {object_scan * 1000:.2f} ms, "
+              f"batch {column_scan * 1000:.2f} ms")
+
+    return results
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark TelemetryBatch against TelemetryRecord lists")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[10_000, 100_000, 500_000],
+                        help="Batch sizes to test")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best is reported)")
+
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.repeat)
+
+if __name__ == "__main__":
+    main()
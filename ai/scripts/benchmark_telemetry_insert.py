@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Telemetry Insert Benchmark
+Compares rows/second of the per-record insert_telemetry path against the
+columnar insert_telemetry_columnar path
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient, TelemetryRecord, TELEMETRY_COLUMNS
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+def make_columns(num_rows: int, seed: int = 42, num_agents: int = 100) -> Dict[str, np.ndarray]:
+    """Build a synthetic telemetry batch as NumPy columns"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(datetime.now() - timedelta(days=1), 'ms')
+    timestamps = start + np.arange(num_rows, dtype='timedelta64[ms]')
+    hours = (timestamps.astype('datetime64[h]').astype(np.int64) % 24).astype(np.uint8)
+    days = ((timestamps.astype('datetime64[D]').astype(np.int64) + 3) % 7).astype(np.uint8)
+    bandwidth = rng.normal(100, 25, num_rows).clip(10, 1000)
+    throughput = (bandwidth * 0.7).clip(1)
+
+    return {
+        'timestamp': timestamps,
+        'agent_id': np.array([f"agent-{i % num_agents + 1:03d}" for i in range(num_rows)]),
+        'transfer_id': np.array([f"transfer-{i + 1:08d}" for i in range(num_rows)]),
+        'project_id': np.array([f"project-{i % 5 + 1:02d}" for i in range(num_rows)]),
+        'bandwidth_mbps': bandwidth,
+        'latency_ms': rng.normal(50, 15, num_rows).clip(1),
+        'packet_loss_rate': rng.exponential(0.01, num_rows).clip(0, 0.1),
+        'jitter_ms': rng.exponential(5, num_rows),
+        'rtt_ms': rng.normal(100, 30, num_rows).clip(1),
+        'throughput_mbps': throughput,
+        'bytes_transferred': rng.integers(1 << 20, 1 << 30, num_rows, dtype=np.uint64),
+        'transfer_duration_ms': rng.integers(100, 600_000, num_rows, dtype=np.uint64),
+        'chunk_size': rng.choice(np.array([32, 64, 128, 256], dtype=np.uint32) * 1024, num_rows),
+        'concurrent_connections': rng.integers(1, 9, num_rows, dtype=np.uint16),
+        'cpu_usage': rng.normal(50, 20, num_rows).clip(0, 100),
+        'memory_usage': rng.normal(60, 25, num_rows).clip(0, 100),
+        'disk_io_mbps': rng.normal(150, 50, num_rows),
+        'network_utilization': (throughput / bandwidth * 100).clip(0, 100),
+        'hour_of_day': hours,
+        'day_of_week': days,
+        'is_weekend': days >= 5,
+        'predicted_throughput': throughput * rng.normal(1.0, 0.1, num_rows),
+        'actual_throughput': throughput,
+        'optimization_applied': np.full(num_rows, 'chunk_size_optimized'),
+        'improvement_percent': rng.normal(5, 15, num_rows),
+    }
+
+def columns_to_records(columns: Dict[str, np.ndarray]) -> List[TelemetryRecord]:
+    """Materialise the same batch as TelemetryRecord objects"""
+    frame = pd.DataFrame({name: columns[name] for name in TELEMETRY_COLUMNS})
+    return [TelemetryRecord(**row) for row in frame.to_dict('records')]
+
+class _NullSession:
+    """Stand-in for the pooled session when only client-side cost is measured"""
+
+    def insert(self, table, data, **kwargs):
+        pass
+
+    def insert_arrow(self, table, arrow_table, **kwargs):
+        pass
+
+async def run_benchmark(client: ClickHouseClient, sizes: List[int], repeat: int) -> List[Dict]:
+    """Time both insert paths for each batch size"""
+    results = []
+
+    for size in sizes:
+        columns = make_columns(size)
+        records = columns_to_records(columns)
+        frame = pd.DataFrame(columns)
+
+        for path, call in [
+            ('records', lambda: client.insert_telemetry(records)),
+            ('columnar_numpy', lambda: client.insert_telemetry_columnar(columns)),
+            ('columnar_pandas', lambda: client.insert_telemetry_columnar(frame)),
+        ]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await call()
+                timings.append(time.perf_counter() - start)
+
+            best = min(timings)
+            results.append({
+                'rows': size,
+                'path': path,
+                'seconds': best,
+                'rows_per_second': size / best if best > 0 else float('inf')
+            })
+            print(f"{size:>9,} rows  {path:<16} {best:8.3f}s  {size / best:>14,.0f} rows/s")
+
+    return results
+
+async def main_async(args):
+    client = ClickHouseClient(
+        host=args.host, port=args.port, username=args.username,
+        password=args.password, database=args.database
+    )
+
+    if args.encode_only:
+        # Measure serialisation cost only; no server round trip
+        client._clients = [_NullSession()]
+        client._pool = asyncio.Queue()
+        client._pool.put_nowait(client._clients[0])
+    else:
+        if not await client.connect():
+            sys.exit(1)
+        await client.initialize_schema()
+
+    try:
+        await run_benchmark(client, args.sizes, args.repeat)
+    finally:
+        if not args.encode_only:
+            client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark telemetry insert paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Batch sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (best is reported)")
+    parser.add_argument("--encode-only", action="store_true",
+                        help="Skip the server and measure client-side encoding only")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Synthetic Telemetry Loader
+Streams N agents x M minutes of synthetic telemetry into ClickHouse or the
+local Parquet dataset cache for scale testing
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient, TelemetryBatch
+from synthetic_telemetry import iter_synthetic_telemetry
+from telemetry_dataset import TelemetryDatasetCache
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+async def main_async(args):
+    client = None
+    cache = None
+    if args.sink == 'clickhouse':
+        client = ClickHouseClient(
+            host=args.host, port=args.port, username=args.username,
+            password=args.password, database=args.database
+        )
+        if not await client.connect():
+            sys.exit(1)
+    elif args.sink == 'parquet':
+        cache = TelemetryDatasetCache(name=args.dataset)
+
+    rows = 0
+    generate_seconds = 0.0
+    start = time.perf_counter()
+    try:
+        chunks = iter_synthetic_telemetry(
+            args.agents, args.minutes, interval_minutes=args.interval, seed=args.seed,
+            num_projects=args.projects, chunk_rows=args.chunk_rows
+        )
+        while True:
+            chunk_start = time.perf_counter()
+            columns = next(chunks, None)
+            generate_seconds += time.perf_counter() - chunk_start
+            if columns is None:
+                break
+
+            if client:
+                await client.insert_telemetry_columnar(columns)
+            elif cache:
+                cache.write(TelemetryBatch(columns).table)
+            rows += len(columns['timestamp'])
+            print(f"  {rows:>13,} rows", end='\r')
+    finally:
+        if client:
+            client.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nagents={args.agents} minutes={args.minutes} interval={args.interval} sink={args.sink}")
+    print(f"generated:  {rows:,} rows in {generate_seconds:.2f}s ({rows / generate_seconds:,.0f} rows/s)")
+    print(f"end to end: {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Generate synthetic telemetry at scale")
+    parser.add_argument("--agents", type=int, default=100, help="Number of agents")
+    parser.add_argument("--minutes", type=int, default=7 * 24 * 60, help="Window length in minutes")
+    parser.add_argument("--interval", type=int, default=1, help="Minutes between reports per agent")
+    parser.add_argument("--projects", type=int, default=5, help="Distinct project IDs")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Rows per generated chunk")
+    parser.add_argument("--sink", choices=['clickhouse', 'parquet', 'none'], default='clickhouse',
+                        help="Where to write (none only measures generation)")
+    parser.add_argument("--dataset", default='synthetic', help="Dataset name for --sink parquet")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
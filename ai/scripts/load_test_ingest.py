@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Telemetry Ingest Load Test
+Replays synthetic agents against TelemetryIngestServer and reports sustained
+records/second and ack latency percentiles
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import deque
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clickhouse_client import ClickHouseClient
+from ingest_server import ACK, TelemetryIngestServer, encode_frame
+from telemetry_buffer import TelemetryBuffer
+from benchmark_telemetry_insert import _NullSession, make_columns
+
+logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+def make_payloads(agent: int, protocol: str, batch_rows: int, count: int) -> List[bytes]:
+    """Pre-encode an agent's batches so the load generator does no per-row work"""
+    payloads = []
+    for i in range(count):
+        columns = make_columns(batch_rows, seed=agent * 1000 + i)
+        columns['agent_id'] = np.full(batch_rows, f"agent-{agent + 1:04d}")
+        if protocol == 'binary':
+            payloads.append(encode_frame(columns))
+        else:
+            frame = pd.DataFrame(columns)
+            frame['is_weekend'] = frame['is_weekend'].astype(bool)
+            payloads.append(frame.to_json(orient='records', lines=True,
+                                          date_format='epoch', date_unit='ms').encode() + b'\n')
+    return payloads
+
+async def run_agent(agent: int, address, protocol: str, payloads: List[bytes], batch_rows: int,
+                    rate: float, max_in_flight: int, deadline: float,
+                    latencies: List[float]) -> int:
+    """Send batches until the deadline and record send-to-ack latency"""
+    if isinstance(address, str):
+        reader, writer = await asyncio.open_unix_connection(address)
+    else:
+        reader, writer = await asyncio.open_connection(*address)
+
+    in_flight = asyncio.Semaphore(max_in_flight)
+    pending = deque()  # (cumulative rows sent, send time)
+    acked = 0
+
+    async def read_acks():
+        nonlocal acked
+        while True:
+            if protocol == 'binary':
+                (accepted,) = ACK.unpack(await reader.readexactly(ACK.size))
+            else:
+                line = await reader.readline()
+                if not line:
+                    return
+                reply = json.loads(line)
+                if 'error' in reply:
+                    logger.warning(f"Agent {agent} batch rejected: {reply['error']}")
+                accepted = reply.get('accepted', acked)
+            now = time.perf_counter()
+            while pending and pending[0][0] <= accepted:
+                latencies.append(now - pending.popleft()[1])
+                in_flight.release()
+            acked = accepted
+
+    ack_task = asyncio.create_task(read_acks())
+    sent = 0
+    interval = batch_rows / rate if rate else 0.0
+    next_send = time.perf_counter()
+    try:
+        while time.perf_counter() < deadline:
+            await in_flight.acquire()
+            if interval:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_send += interval
+
+            sent += batch_rows
+            pending.append((sent, time.perf_counter()))
+            writer.write(payloads[(sent // batch_rows) % len(payloads)])
+            await writer.drain()
+
+        # Wait for outstanding acks
+        for _ in range(max_in_flight):
+            await asyncio.wait_for(in_flight.acquire(), 30)
+    finally:
+        ack_task.cancel()
+        writer.close()
+    return acked
+
+async def main_async(args):
+    server = None
+    buffer = None
+    client = None
+    address = args.unix
+
+    if args.target:
+        host, port = args.target.rsplit(':', 1)
+        address = address or (host, int(port))
+    else:
+        client = ClickHouseClient(
+            host=args.host, port=args.port, username=args.username,
+            password=args.password, database=args.database
+        )
+        if args.null_sink:
+            # Measure the ingest path only; inserts are discarded client-side
+            client._clients = [_NullSession()]
+            client._pool = asyncio.Queue()
+            client._pool.put_nowait(client._clients[0])
+        elif not await client.connect():
+            sys.exit(1)
+
+        buffer = TelemetryBuffer(client, max_rows=args.flush_rows, max_latency=args.flush_latency)
+        await buffer.start()
+        server = TelemetryIngestServer(buffer, port=0, unix_path=args.unix)
+        await server.start()
+        address = server.address
+
+    print(f"Encoding payloads for {args.agents} agents ({args.protocol})...")
+    payloads = [make_payloads(agent, args.protocol, args.batch_rows, args.payloads)
+                for agent in range(args.agents)]
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    acked = await asyncio.gather(*[
+        run_agent(agent, address, args.protocol, payloads[agent], args.batch_rows,
+                  args.rate, args.max_in_flight, deadline, latencies)
+        for agent in range(args.agents)
+    ])
+    elapsed = time.perf_counter() - start
+
+    records = sum(acked)
+    latency_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    print(f"agents={args.agents} protocol={args.protocol} batch_rows={args.batch_rows}")
+    print(f"records acked:   {records:,} in {elapsed:.2f}s")
+    print(f"throughput:      {records / elapsed:,.0f} records/s")
+    print(f"ack latency:     p50 {np.percentile(latency_ms, 50):.2f} ms  "
+          f"p99 {np.percentile(latency_ms, 99):.2f} ms  max {latency_ms.max():.2f} ms")
+
+    if server:
+        await server.close()
+        await buffer.close()
+        print(f"server:          {server.metrics()}")
+        print(f"buffer:          {buffer.metrics()}")
+        if not args.null_sink:
+            client.close()
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Load test the telemetry ingest server")
+    parser.add_argument("--agents", type=int, default=50, help="Concurrent synthetic agents")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send for")
+    parser.add_argument("--protocol", choices=['binary', 'ndjson'], default='binary')
+    parser.add_argument("--batch-rows", type=int, default=500, help="Records per message")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Records/second per agent (0 sends as fast as acks allow)")
+    parser.add_argument("--max-in-flight", type=int, default=4,
+                        help="Unacknowledged messages per agent")
+    parser.add_argument("--payloads", type=int, default=4, help="Distinct batches per agent")
+    parser.add_argument("--target", help="host:port of a running ingest server "
+                                         "(default: start one in-process)")
+    parser.add_argument("--unix", help="Unix socket path to listen on / connect to")
+    parser.add_argument("--null-sink", action="store_true",
+                        help="In-process server discards inserts instead of writing to ClickHouse")
+    parser.add_argument("--flush-rows", type=int, default=50_000)
+    parser.add_argument("--flush-latency", type=float, default=1.0)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--username", default="tcp_user")
+    parser.add_argument("--password", default="tcp_password")
+    parser.add_argument("--database", default="tcp_optimization")
+
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
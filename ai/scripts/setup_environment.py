@@ -57,7 +57,7 @@ class EnvironmentSetup:
             # Install core dependencies first to avoid conflicts
             core_deps = [
                 "torch", "xgboost", "scikit-learn", "numpy", "pandas", 
-                "clickhouse-connect", "python-dotenv", "joblib"
+                "clickhouse-connect", "pyarrow", "python-dotenv", "joblib"
             ]
             
             cmd = [sys.executable, "-m", "pip", "install"] + core_deps
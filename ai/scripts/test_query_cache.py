@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Query Cache Tests
+Single-flight loading in QueryCache.get_or_load; runs standalone or under pytest
+"""
+
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_cache import QueryCache
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache = QueryCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'rows'
+
+        results = await asyncio.gather(*[cache.get_or_load('q', {'a': 1}, loader) for _ in range(5)])
+        assert results == ['rows'] * 5
+        assert len(calls) == 1
+        assert cache.stats()['coalesced'] == 4
+
+    asyncio.run(run())
+
+def test_cancelled_leader_hands_load_to_waiter():
+    async def run():
+        cache = QueryCache()
+        started = asyncio.Event()
+
+        async def slow_loader():
+            started.set()
+            await asyncio.sleep(10)
+            return 'leader'
+
+        async def loader():
+            return 'waiter'
+
+        leader = asyncio.create_task(cache.get_or_load('q', None, slow_loader))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_load('q', None, loader))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        assert await asyncio.wait_for(waiter, 1) == 'waiter'
+        try:
+            await leader
+            assert False, "leader was not cancelled"
+        except asyncio.CancelledError:
+            pass
+
+        # The waiter's result is cached for later callers
+        assert await cache.get_or_load('q', None, slow_loader) == 'waiter'
+
+    asyncio.run(run())
+
+def test_cancelled_waiter_leaves_leader_running():
+    async def run():
+        cache = QueryCache()
+
+        async def loader():
+            await asyncio.sleep(0.05)
+            return 'rows'
+
+        leader = asyncio.create_task(cache.get_or_load('q', None, loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load('q', None, loader))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        assert await leader == 'rows'
+        assert waiter.cancelled()
+
+    asyncio.run(run())
+
+def main():
+    failed = 0
+    for name, test in [(name, value) for name, value in globals().items() if name.startswith('test_')]:
+        try:
+            test()
+            print(f"✓ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {name}: {e!r}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
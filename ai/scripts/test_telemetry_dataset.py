@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Telemetry Dataset Cache Tests
+Materializes from an in-memory stand-in for ClickHouseClient and checks the
+cached partitions; runs standalone or under pytest
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telemetry_dataset import TelemetryDatasetCache
+
+class FakeClient:
+    """Serves stream_training_data from a fixed Arrow table"""
+
+    def __init__(self, table: pa.Table):
+        self.table = table
+
+    async def stream_training_data(self, agent_id=None, hours=24 * 7, block_rows=100_000, as_arrow=False):
+        table = self.table
+        if agent_id:
+            table = table.filter(pc.equal(table['agent_id'], agent_id))
+        yield table
+
+def make_table(agents, throughput: float) -> pa.Table:
+    """Two rows per agent on each of the last three days"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [(agent, now - timedelta(days=day, minutes=minute))
+            for agent in agents for day in range(3) for minute in (1, 2)]
+    return pa.table({
+        'agent_id': [agent for agent, _ in rows],
+        'timestamp': pa.array([timestamp for _, timestamp in rows], pa.timestamp('ms')),
+        'throughput_mbps': [throughput] * len(rows),
+    })
+
+def agent_rows(cache: TelemetryDatasetCache, agent: str):
+    """Cached throughput values of one agent"""
+    return cache.read(agent_ids=[agent], as_arrow=True)['throughput_mbps'].to_pylist()
+
+def test_agent_materialize_keeps_other_agents():
+    with tempfile.TemporaryDirectory() as root:
+        cache = TelemetryDatasetCache(root=root)
+        asyncio.run(cache.materialize(FakeClient(make_table(['agent-a', 'agent-b'], 1.0)), hours=72))
+        assert len(agent_rows(cache, 'agent-b')) == 6
+
+        # Agent A only: its rows are replaced, agent B's stay
+        written = asyncio.run(cache.materialize(FakeClient(make_table(['agent-a'], 2.0)),
+                                                hours=72, agent_id='agent-a'))
+        assert written == 6
+        assert agent_rows(cache, 'agent-a') == [2.0] * 6
+        assert agent_rows(cache, 'agent-b') == [1.0] * 6
+
+def test_materialize_removes_stale_days():
+    with tempfile.TemporaryDirectory() as root:
+        cache = TelemetryDatasetCache(root=root)
+        asyncio.run(cache.materialize(FakeClient(make_table(['agent-a'], 1.0)), hours=72))
+        assert len(cache.partitions()) >= 3
+
+        assert asyncio.run(cache.materialize(FakeClient(make_table([], 1.0)), hours=72)) == 0
+        assert cache.partitions() == []
+
+def main():
+    failed = 0
+    for name, test in [(name, value) for name, value in globals().items() if name.startswith('test_')]:
+        try:
+            test()
+            print(f"✓ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {name}: {e!r}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
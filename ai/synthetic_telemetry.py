@@ -0,0 +1,139 @@
+"""
+Synthetic Telemetry Generator
+Vectorised version of the generate_sample_data network model for load and scale testing
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from clickhouse_client import to_utc
+
+# Transfer tuning choices and simulated optimizer outcomes
+CHUNK_SIZES = np.array([32 * 1024, 64 * 1024, 128 * 1024, 256 * 1024], dtype=np.uint32)
+OPTIMIZATIONS = np.array(['', 'chunk_size_optimized', 'connection_count_optimized',
+                          'bandwidth_throttled', 'retry_optimized'])
+OPTIMIZATION_WEIGHTS = [0.3, 0.2, 0.2, 0.15, 0.15]
+
+def iter_synthetic_telemetry(num_agents: int, minutes: int, interval_minutes: int = 1,
+                             start: Optional[datetime] = None, seed: Optional[int] = None,
+                             num_projects: int = 5, chunk_rows: int = 1_000_000,
+                             stagger: bool = False) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Generate telemetry for num_agents agents over a window, in chunks
+
+    Every agent reports once per interval. Rows are in time order and each
+    chunk is a dict of NumPy columns accepted by insert_telemetry_columnar
+    and TelemetryBatch. The same seed, start and chunk_rows always give the
+    same data.
+
+    Args:
+        num_agents: Number of agents
+        minutes: Length of the window in minutes
+        interval_minutes: Minutes between reports from one agent
+        start: First timestamp (default: `minutes` before now); naive values
+            are UTC, like every telemetry insert path
+        seed: Random seed (None for non-deterministic output)
+        num_projects: Agents are assigned to projects round-robin
+        chunk_rows: Approximate rows per yielded chunk (rounded to whole intervals)
+        stagger: Spread agents evenly within each interval instead of
+            reporting at the same instant
+
+    Yields:
+        Dict of column name to NumPy array
+    """
+    start = to_utc(start or datetime.now(timezone.utc) - timedelta(minutes=minutes))
+    start = np.datetime64(start.replace(tzinfo=None), 'ms')
+    interval_ms = interval_minutes * 60_000
+    steps = -(-minutes // interval_minutes)
+    steps_per_chunk = max(1, chunk_rows // num_agents)
+
+    agent_ids = np.array([f"agent-{i + 1:03d}" for i in range(num_agents)])
+    project_ids = np.array([f"project-{i % num_projects + 1:02d}" for i in range(num_agents)])
+    agent_offsets = np.arange(num_agents) * interval_ms // num_agents
+    if not stagger:
+        agent_offsets[:] = 0
+
+    rng = np.random.default_rng(seed)
+    for first_step in range(0, steps, steps_per_chunk):
+        step_count = min(steps_per_chunk, steps - first_step)
+        agents = np.tile(np.arange(num_agents), step_count)
+        step_index = np.repeat(np.arange(first_step, first_step + step_count), num_agents)
+        row_index = step_index * num_agents + agents
+        timestamps = start + (step_index * interval_ms + agent_offsets[agents]).astype('timedelta64[ms]')
+        yield _telemetry_columns(rng, timestamps, row_index,
+                                 agent_ids[agents], project_ids[agents])
+
+def generate_synthetic_telemetry(num_agents: int, minutes: int, interval_minutes: int = 1,
+                                 start: Optional[datetime] = None, seed: Optional[int] = None,
+                                 num_projects: int = 5, stagger: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Generate the whole window as one set of NumPy columns
+
+    See iter_synthetic_telemetry for the arguments.
+    """
+    return next(iter_synthetic_telemetry(
+        num_agents, minutes, interval_minutes=interval_minutes, start=start, seed=seed,
+        num_projects=num_projects, chunk_rows=num_agents * -(-minutes // interval_minutes),
+        stagger=stagger
+    ))
+
+def _telemetry_columns(rng: np.random.Generator, timestamps: np.ndarray, row_index: np.ndarray,
+                       agent_ids: np.ndarray, project_ids: np.ndarray) -> Dict[str, np.ndarray]:
+    """Apply the generate_sample_data network model to a block of rows"""
+    n = len(timestamps)
+    hours = (timestamps.astype('datetime64[h]').astype(np.int64) % 24).astype(np.uint8)
+    days = ((timestamps.astype('datetime64[D]').astype(np.int64) + 3) % 7).astype(np.uint8)
+
+    # Network conditions vary by time of day (business hours are congested)
+    is_peak_hour = (hours >= 9) & (hours <= 17)
+    bandwidth = np.where(is_peak_hour, 80 + 20 * rng.standard_normal(n), 120 + 30 * rng.standard_normal(n))
+    latency = np.where(is_peak_hour, 80 + 30 * rng.standard_normal(n), 40 + 15 * rng.standard_normal(n))
+    packet_loss = rng.exponential(1.0, n) * np.where(is_peak_hour, 0.02, 0.005)
+
+    bandwidth = bandwidth.clip(10, 1000)
+    latency = latency.clip(10, 500)
+    packet_loss = packet_loss.clip(0, 0.1)
+
+    cpu_usage = rng.normal(50, 20, n)
+    memory_usage = rng.normal(60, 25, n)
+
+    # Throughput model: 70% efficiency minus latency, loss and CPU penalties
+    latency_penalty = np.maximum(0, (latency - 50) / 100)
+    loss_penalty = packet_loss * 100
+    cpu_penalty = np.maximum(0, (cpu_usage - 80) / 100)
+    throughput = bandwidth * 0.7 * (1 - latency_penalty - loss_penalty - cpu_penalty)
+    throughput = np.minimum(bandwidth * 0.95, np.maximum(1, throughput))
+
+    # 1MB to 10GB, log-normal
+    file_size = rng.lognormal(15, 2, n).clip(1024 * 1024, 10 * 1024 * 1024 * 1024)
+    transfer_duration = file_size / (throughput * 1024 * 1024 / 8) * 1000
+
+    return {
+        'timestamp': timestamps,
+        'agent_id': agent_ids,
+        'transfer_id': np.char.add('transfer-', np.char.zfill((row_index + 1).astype(str), 8)),
+        'project_id': project_ids,
+        'bandwidth_mbps': bandwidth,
+        'latency_ms': latency,
+        'packet_loss_rate': packet_loss,
+        'jitter_ms': rng.exponential(5, n),
+        'rtt_ms': latency * 2,
+        'throughput_mbps': throughput,
+        'bytes_transferred': file_size.astype(np.uint64),
+        'transfer_duration_ms': transfer_duration.astype(np.uint64),
+        'chunk_size': rng.choice(CHUNK_SIZES, n),
+        'concurrent_connections': rng.integers(1, 9, n, dtype=np.uint16),
+        'cpu_usage': cpu_usage.clip(0, 100),
+        'memory_usage': memory_usage.clip(0, 100),
+        'disk_io_mbps': rng.normal(150, 50, n),
+        'network_utilization': np.minimum(100, throughput / bandwidth * 100),
+        'hour_of_day': hours,
+        'day_of_week': days,
+        'is_weekend': days >= 5,
+        'predicted_throughput': throughput * rng.normal(1.0, 0.1, n),
+        'actual_throughput': throughput,
+        'optimization_applied': rng.choice(OPTIMIZATIONS, n, p=OPTIMIZATION_WEIGHTS),
+        'improvement_percent': rng.normal(5, 15, n),
+    }
@@ -0,0 +1,305 @@
+"""
+Buffered Telemetry Writer
+Accumulates telemetry from many producers and flushes it to ClickHouse in large blocks
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import pyarrow as pa
+
+from clickhouse_client import (
+    ClickHouseClient, TelemetryBatch, TelemetryRecord, ColumnarTelemetry, to_telemetry_table
+)
+from telemetry_spool import TelemetrySpool
+
+logger = logging.getLogger(__name__)
+
+# Approximate encoded size of one tcp_telemetry row, used to size record batches
+ESTIMATED_RECORD_BYTES = 200
+
+class TelemetryBuffer:
+    """
+    Write buffer in front of ClickHouseClient
+
+    Records are accumulated until a row count, byte size or latency limit is
+    reached and then inserted by a background task, so ClickHouse sees a few
+    large parts instead of many tiny ones.
+
+    Without a spool a flush whose insert fails is dropped (counted in
+    failed_rows), even though add() already accepted its rows; pass a
+    TelemetrySpool whenever producers treat acceptance as delivery.
+    """
+
+    def __init__(self, client: ClickHouseClient, max_rows: int = 50_000,
+                 max_bytes: int = 32 * 1024 * 1024, max_latency: float = 1.0,
+                 high_water_rows: int = 500_000, overflow_policy: str = 'block',
+                 spool: Optional[TelemetrySpool] = None):
+        """
+        Initialize telemetry buffer
+
+        Args:
+            client: Connected ClickHouse client used for flushing
+            max_rows: Flush once this many rows are pending
+            max_bytes: Flush once pending data reaches this estimated size
+            max_latency: Flush once the oldest pending row is this many seconds old
+            high_water_rows: Max rows pending or in flight before producers are
+                throttled
+            overflow_policy: 'block' to make producers wait for space, 'drop' to
+                discard incoming rows above the high-water mark
+            spool: Write flushes through this TelemetrySpool so a failed insert
+                is spilled to disk and replayed instead of lost
+        """
+        if overflow_policy not in ('block', 'drop'):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.client = client
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.high_water_rows = high_water_rows
+        self.overflow_policy = overflow_policy
+        self.spool = spool
+
+        # Pending data
+        self._records: List[TelemetryRecord] = []
+        self._tables: List[pa.Table] = []
+        self._pending_rows = 0
+        self._pending_bytes = 0
+        self._oldest: Optional[float] = None
+        self._in_flight_rows = 0
+
+        # Coordination
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Metrics
+        self._flush_latencies = deque(maxlen=1000)
+        self._flush_count = 0
+        self._flushed_rows = 0
+        self._failed_flushes = 0
+        self._failed_rows = 0
+        self._dropped_rows = 0
+        self._spooled_rows = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Rows accepted but not yet written (pending plus in flight)"""
+        return self._pending_rows + self._in_flight_rows
+
+    async def start(self):
+        """Start the background flush task"""
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Telemetry buffer started (max_rows={self.max_rows}, "
+                        f"max_latency={self.max_latency}s)")
+
+    async def close(self):
+        """Flush everything still pending and stop the background task"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        else:
+            await self.flush()
+        logger.info("Telemetry buffer closed")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def add(self, records: Union[List[TelemetryRecord], TelemetryBatch]) -> bool:
+        """
+        Queue telemetry records for insertion
+
+        Args:
+            records: Telemetry records to buffer; a TelemetryBatch is queued
+                as a columnar block
+
+        Returns:
+            False if the records were dropped by the overflow policy
+        """
+        if not len(records):
+            return True
+        if isinstance(records, TelemetryBatch):
+            return await self.add_columnar(records)
+        if not await self._reserve(len(records)):
+            return False
+
+        self._records.extend(records)
+        self._account(len(records), len(records) * ESTIMATED_RECORD_BYTES)
+        return True
+
+    async def add_columnar(self, data: ColumnarTelemetry) -> bool:
+        """
+        Queue a columnar telemetry block for insertion
+
+        Args:
+            data: DataFrame, dict of NumPy arrays or Arrow table (see
+                ClickHouseClient.insert_telemetry_columnar)
+
+        Returns:
+            False if the block was dropped by the overflow policy
+        """
+        table = to_telemetry_table(data)
+        if table.num_rows == 0:
+            return True
+        if not await self._reserve(table.num_rows):
+            return False
+
+        self._tables.append(table)
+        self._account(table.num_rows, table.nbytes)
+        return True
+
+    async def flush(self):
+        """Write all pending data now"""
+        await self._flush_pending()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get buffer metrics
+
+        Returns:
+            Dictionary with queue depth and flush statistics; every flushed
+            row is counted once, in flushed_rows, spooled_rows or failed_rows
+        """
+        latencies = list(self._flush_latencies)
+        return {
+            'queue_depth_rows': self.queue_depth,
+            'pending_rows': self._pending_rows,
+            'pending_bytes': self._pending_bytes,
+            'in_flight_rows': self._in_flight_rows,
+            'flush_count': self._flush_count,
+            'flushed_rows': self._flushed_rows,
+            'failed_flushes': self._failed_flushes,
+            'failed_rows': self._failed_rows,
+            'dropped_rows': self._dropped_rows,
+            'spooled_rows': self._spooled_rows,
+            'last_flush_latency_ms': latencies[-1] * 1000 if latencies else 0.0,
+            'avg_flush_latency_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'max_flush_latency_ms': max(latencies) * 1000 if latencies else 0.0
+        }
+
+    async def _reserve(self, rows: int) -> bool:
+        """Wait for (or refuse) space below the high-water mark"""
+        async with self._space:
+            # A single oversized batch is still accepted into an empty buffer
+            while self.queue_depth > 0 and self.queue_depth + rows > self.high_water_rows:
+                if self.overflow_policy == 'drop':
+                    self._dropped_rows += rows
+                    logger.warning(f"Telemetry buffer full, dropped {rows} rows")
+                    return False
+                await self._space.wait()
+        return True
+
+    def _account(self, rows: int, nbytes: int):
+        """Track newly queued data and wake the flusher if a limit is hit"""
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+            # Let the flusher start its latency timer
+            self._wakeup.set()
+
+        self._pending_rows += rows
+        self._pending_bytes += nbytes
+
+        if self._pending_rows >= self.max_rows or self._pending_bytes >= self.max_bytes:
+            self._wakeup.set()
+
+    def _should_flush(self) -> bool:
+        """Check whether any flush trigger has been reached"""
+        if not self._pending_rows:
+            return False
+        return (
+            self._closing or
+            self._pending_rows >= self.max_rows or
+            self._pending_bytes >= self.max_bytes or
+            time.monotonic() - self._oldest >= self.max_latency
+        )
+
+    async def _run(self):
+        """Background loop that flushes on size or age"""
+        while True:
+            timeout = None
+            if self._oldest is not None:
+                timeout = max(0.0, self._oldest + self.max_latency - time.monotonic())
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._should_flush():
+                await self._flush_pending()
+
+            if self._closing and not self._pending_rows:
+                break
+
+    async def _flush_pending(self):
+        """Swap out the pending data and insert it"""
+        async with self._flush_lock:
+            if not self._pending_rows:
+                return
+
+            records, tables, rows = self._records, self._tables, self._pending_rows
+            self._records, self._tables = [], []
+            self._pending_rows = 0
+            self._pending_bytes = 0
+            self._oldest = None
+            self._in_flight_rows += rows
+
+            start = time.perf_counter()
+            failed = 0
+            try:
+                if self.spool:
+                    if records:
+                        tables.append(TelemetryBatch.from_records(records).table)
+                    if await self.spool.insert(pa.concat_tables(tables)):
+                        self._flushed_rows += rows
+                    else:
+                        self._spooled_rows += rows
+                else:
+                    # Record and columnar inserts succeed or fail independently
+                    if records:
+                        failed += await self._insert(self.client.insert_telemetry, records, len(records))
+                    if tables:
+                        table = pa.concat_tables(tables)
+                        failed += await self._insert(self.client.insert_telemetry_columnar, table,
+                                                     table.num_rows)
+
+            except Exception as e:
+                failed = rows
+                logger.error(f"Failed to flush {rows} buffered telemetry rows: {e}")
+
+            finally:
+                self._in_flight_rows -= rows
+                async with self._space:
+                    self._space.notify_all()
+
+            if failed:
+                self._failed_flushes += 1
+                self._failed_rows += failed
+            else:
+                self._flush_latencies.append(time.perf_counter() - start)
+                self._flush_count += 1
+
+    async def _insert(self, insert: Callable[[Any], Awaitable[Any]], data: Any, rows: int) -> int:
+        """Run one insert of a flush; returns the number of rows that failed"""
+        try:
+            await insert(data)
+        except Exception as e:
+            logger.error(f"Failed to flush {rows} buffered telemetry rows: {e}")
+            return rows
+        self._flushed_rows += rows
+        return 0
@@ -0,0 +1,262 @@
+"""
+Local Telemetry Dataset Cache
+Materialises ClickHouse training data into day-partitioned Parquet for offline and repeated training runs
+"""
+
+import os
+import uuid
+import shutil
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from clickhouse_client import ClickHouseClient, to_utc
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache', 'telemetry')
+
+# Hive partition column derived from timestamp (UTC day)
+PARTITION_COLUMN = 'date'
+
+class TelemetryDatasetCache:
+    """
+    Parquet copy of tcp_telemetry training data, partitioned by day
+
+    Files are written in (agent_id, timestamp) order with moderate row groups,
+    so filters on agent_id and timestamp skip whole partitions and row groups
+    using Parquet statistics. Reads are memory-mapped.
+    """
+
+    def __init__(self, name: str = 'training', root: str = DEFAULT_DATASET_DIR,
+                 row_group_rows: int = 64 * 1024):
+        """
+        Initialize dataset cache
+
+        Args:
+            name: Dataset name (subdirectory of root)
+            root: Root directory for cached datasets
+            row_group_rows: Rows per Parquet row group
+        """
+        self.name = name
+        self.directory = os.path.join(root, name)
+        self.row_group_rows = row_group_rows
+        self._filesystem = pafs.LocalFileSystem(use_mmap=True)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    async def materialize(self, client: ClickHouseClient, hours: int = 24 * 7,
+                          agent_id: Optional[str] = None, block_rows: int = 500_000) -> int:
+        """
+        Download a window of training data and replace the cached days it covers
+
+        The window is widened to start at midnight UTC so every partition it
+        touches is rewritten in full; cached days in the window without rows
+        in the download are removed. With agent_id only that agent's rows in
+        the window are replaced; other agents' cached rows are kept.
+
+        Args:
+            client: Connected ClickHouse client
+            hours: Hours of historical data to download
+            agent_id: Specific agent ID (None for all agents)
+            block_rows: Rows per streamed block
+
+        Returns:
+            Number of rows written
+        """
+        now = datetime.now(timezone.utc)
+        day_start = datetime.combine((now - timedelta(hours=hours)).date(), datetime.min.time(),
+                                     tzinfo=timezone.utc)
+        hours = int((now - day_start).total_seconds() // 3600) + 1
+
+        staging = os.path.join(self.directory, f".staging-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        rows = 0
+        try:
+            async for block in client.stream_training_data(agent_id=agent_id, hours=hours,
+                                                            block_rows=block_rows, as_arrow=True):
+                block = block.filter(pc.greater_equal(
+                    block['timestamp'], self._timestamp_scalar(day_start, block.schema)
+                ))
+                self._write(block, staging, f"part-{rows:012d}-{{i}}.parquet")
+                rows += block.num_rows
+
+            if agent_id:
+                # Only one agent was fetched: carry the other agents' cached rows over
+                for day in self.partitions():
+                    if day >= day_start.date():
+                        self._stage_other_agents(day, agent_id, staging)
+
+            # Swap each staged day in for the cached one
+            staged = set(os.listdir(staging))
+            for partition in sorted(staged):
+                target = os.path.join(self.directory, partition)
+                shutil.rmtree(target, ignore_errors=True)
+                os.replace(os.path.join(staging, partition), target)
+
+            # Cached days in the window that got no rows this time are stale
+            for day in self.partitions():
+                partition = f"{PARTITION_COLUMN}={day.isoformat()}"
+                if day >= day_start.date() and partition not in staged:
+                    shutil.rmtree(os.path.join(self.directory, partition))
+
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        logger.info(f"Materialized {rows} telemetry rows into {self.directory}")
+        return rows
+
+    def write(self, data: Union[pd.DataFrame, pa.Table]) -> int:
+        """
+        Append rows to the cache (e.g. from get_training_data or TelemetrySync)
+
+        Args:
+            data: Rows with at least a timestamp column
+
+        Returns:
+            Number of rows written
+        """
+        table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+        if table.num_rows == 0:
+            return 0
+
+        if 'agent_id' in table.column_names:
+            table = table.sort_by([('agent_id', 'ascending'), ('timestamp', 'ascending')])
+        self._write(table, self.directory, f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+        return table.num_rows
+
+    def read(self, columns: Optional[List[str]] = None, start: Optional[datetime] = None,
+             end: Optional[datetime] = None, agent_ids: Optional[List[str]] = None,
+             as_arrow: bool = False) -> Union[pd.DataFrame, pa.Table]:
+        """
+        Read cached rows with column pruning and predicate pushdown
+
+        Args:
+            columns: Columns to load (None for all)
+            start: Earliest timestamp, inclusive (naive values are UTC)
+            end: Latest timestamp, exclusive (naive values are UTC)
+            agent_ids: Only these agents
+            as_arrow: Return an Arrow table instead of a DataFrame
+
+        Returns:
+            Matching rows in (day, agent_id, timestamp) order
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return pa.table({}) if as_arrow else pd.DataFrame()
+
+        schema = dataset.schema
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field(PARTITION_COLUMN) >= to_utc(start).date().isoformat())
+            conditions.append(ds.field('timestamp') >= self._timestamp_scalar(start, schema))
+        if end is not None:
+            conditions.append(ds.field(PARTITION_COLUMN) <= to_utc(end).date().isoformat())
+            conditions.append(ds.field('timestamp') < self._timestamp_scalar(end, schema))
+        if agent_ids is not None:
+            conditions.append(ds.field('agent_id').isin(list(agent_ids)))
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        if columns is None:
+            columns = [name for name in schema.names if name != PARTITION_COLUMN]
+        table = dataset.to_table(columns=columns, filter=expression)
+        return table if as_arrow else table.to_pandas()
+
+    def load(self, hours: int = 24 * 7, agent_id: Optional[str] = None,
+             columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Offline equivalent of ClickHouseClient.get_training_data
+
+        Args:
+            hours: Hours of historical data to return
+            agent_id: Specific agent ID (None for all agents)
+            columns: Columns to load (None for all)
+
+        Returns:
+            DataFrame with the cached training data
+        """
+        return self.read(
+            columns=columns,
+            start=datetime.now(timezone.utc) - timedelta(hours=hours),
+            agent_ids=[agent_id] if agent_id else None
+        )
+
+    def partitions(self) -> List[date]:
+        """Days present in the cache"""
+        return sorted(
+            date.fromisoformat(name.split('=', 1)[1])
+            for name in os.listdir(self.directory)
+            if name.startswith(f"{PARTITION_COLUMN}=")
+        )
+
+    def drop_before(self, day: date) -> int:
+        """
+        Delete cached days older than the given day
+
+        Returns:
+            Number of partitions removed
+        """
+        removed = [partition for partition in self.partitions() if partition < day]
+        for partition in removed:
+            shutil.rmtree(os.path.join(self.directory, f"{PARTITION_COLUMN}={partition.isoformat()}"))
+        return len(removed)
+
+    def clear(self):
+        """Delete the whole cached dataset"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _stage_other_agents(self, day: date, agent_id: str, staging: str):
+        """Copy one cached day's rows of every agent but agent_id into staging"""
+        partition = os.path.join(self.directory, f"{PARTITION_COLUMN}={day.isoformat()}")
+        table = ds.dataset(partition, format='parquet', filesystem=self._filesystem,
+                           exclude_invalid_files=True, ignore_prefixes=['.', '_']).to_table(
+            filter=ds.field('agent_id') != agent_id
+        )
+        if table.num_rows:
+            self._write(table, staging, f"kept-{uuid.uuid4().hex}-{{i}}.parquet")
+
+    def _dataset(self) -> Optional[ds.Dataset]:
+        """Open the cached partitions, or None when nothing is cached"""
+        if not self.partitions():
+            return None
+        return ds.dataset(
+            self.directory, format='parquet', filesystem=self._filesystem,
+            partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive'),
+            exclude_invalid_files=True, ignore_prefixes=['.', '_']
+        )
+
+    def _write(self, table: pa.Table, directory: str, basename_template: str):
+        """Write a table into day partitions under a directory"""
+        timestamps = table['timestamp']
+        if pa.types.is_timestamp(timestamps.type) and timestamps.type.tz:
+            timestamps = pc.cast(timestamps, pa.timestamp(timestamps.type.unit, 'UTC'))
+        days = pc.strftime(timestamps, format='%Y-%m-%d')
+        table = table.append_column(PARTITION_COLUMN, days)
+
+        ds.write_dataset(
+            table, directory, format='parquet',
+            partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive'),
+            basename_template=basename_template,
+            existing_data_behavior='overwrite_or_ignore',
+            max_rows_per_group=self.row_group_rows,
+            min_rows_per_group=min(self.row_group_rows, table.num_rows)
+        )
+
+    @staticmethod
+    def _timestamp_scalar(value: datetime, schema: pa.Schema) -> pa.Scalar:
+        """Timestamp bound typed like the cached timestamp column"""
+        column_type = schema.field('timestamp').type
+        value = to_utc(value)
+        if pa.types.is_timestamp(column_type) and column_type.tz is None:
+            value = value.replace(tzinfo=None)
+        return pa.scalar(value, type=column_type)
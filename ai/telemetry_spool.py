@@ -0,0 +1,292 @@
+"""
+Durable Telemetry Spool
+Spills failed telemetry inserts to local Arrow IPC segments and replays them into ClickHouse
+"""
+
+import os
+import uuid
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from clickhouse_client import (
+    ClickHouseClient, ColumnarTelemetry, TELEMETRY_ARROW_SCHEMA, to_telemetry_table
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'spool')
+
+SEGMENT_SUFFIX = '.arrows'
+
+# Record batch metadata key holding the batch's insert_deduplication_token
+TOKEN_KEY = b'dedup_token'
+
+class TelemetrySpool:
+    """
+    Local write-ahead spill in front of insert_telemetry_columnar
+
+    While ClickHouse is healthy batches are inserted directly. A batch whose
+    insert fails is appended, with its deduplication token, to the current
+    segment file (an Arrow IPC stream) and a background task replays the
+    segments in order with exponential backoff. New batches queue behind the
+    backlog until it is drained, so rows still reach ClickHouse in arrival
+    order. Replays reuse the original token, so a batch whose first insert
+    did commit (e.g. the response was lost) is not written twice.
+    """
+
+    def __init__(self, client: ClickHouseClient, directory: str = DEFAULT_SPOOL_DIR,
+                 segment_bytes: int = 64 * 1024 * 1024, base_delay: float = 0.5,
+                 max_delay: float = 30.0, max_attempts: Optional[int] = None):
+        """
+        Initialize telemetry spool
+
+        Args:
+            client: ClickHouse client used for inserts and replays
+            directory: Directory holding spool segments
+            segment_bytes: Start a new segment once the current one reaches this size
+            base_delay: First replay retry delay in seconds
+            max_delay: Max replay retry delay in seconds
+            max_attempts: Replay attempts before a batch is moved to rejected/
+                (None retries forever)
+        """
+        self.client = client
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        self._next_segment = int(segments[-1].split('-')[1].split('.')[0]) + 1 if segments else 1
+
+        # Current segment being appended to
+        self._file = None
+        self._writer: Optional[ipc.RecordBatchStreamWriter] = None
+        self._active: Optional[str] = None
+
+        # Coordination
+        self._lock = asyncio.Lock()
+        self._replay_task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+
+        # Metrics
+        self._backlog_rows = sum(self._segment_rows(segment) for segment in segments)
+        self._direct_rows = 0
+        self._spilled_rows = 0
+        self._replayed_rows = 0
+        self._replay_failures = 0
+        self._rejected_rows = 0
+
+    @property
+    def backlog_rows(self) -> int:
+        """Rows spilled to disk and not yet replayed"""
+        return self._backlog_rows
+
+    async def start(self):
+        """Replay segments left over from a previous run"""
+        self._closing.clear()
+        if self._backlog_rows:
+            logger.info(f"Telemetry spool has {self._backlog_rows} rows to replay")
+            self._ensure_replay()
+
+    async def close(self):
+        """Stop replaying and close the current segment; the backlog stays on disk"""
+        self._closing.set()
+        if self._replay_task:
+            await self._replay_task
+            self._replay_task = None
+        async with self._lock:
+            self._seal()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def insert(self, data: ColumnarTelemetry) -> bool:
+        """
+        Insert telemetry, spilling it to disk if ClickHouse rejects it
+
+        Args:
+            data: Anything insert_telemetry_columnar accepts
+
+        Returns:
+            True if the rows were written to ClickHouse, False if they were spooled
+        """
+        # Direct inserts and replays must send the same blocks for the token to match
+        table = to_telemetry_table(data).combine_chunks()
+        if table.num_rows == 0:
+            return True
+
+        token = uuid.uuid4().hex
+        if not self._backlog_rows:
+            try:
+                await self.client.insert_telemetry_columnar(table, dedup_token=token)
+                self._direct_rows += table.num_rows
+                return True
+            except Exception as e:
+                logger.warning(f"Spooling {table.num_rows} telemetry rows after failed insert: {e}")
+
+        async with self._lock:
+            await asyncio.to_thread(self._append, table, token)
+        self._backlog_rows += table.num_rows
+        self._spilled_rows += table.num_rows
+        self._ensure_replay()
+        return False
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the backlog has been replayed
+
+        Args:
+            timeout: Max seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the backlog is empty
+        """
+        if self._replay_task:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._replay_task), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return not self._backlog_rows
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get spool metrics
+
+        Returns:
+            Dictionary with backlog size and row counters
+        """
+        return {
+            'backlog_rows': self._backlog_rows,
+            'segments': len(self._segments()),
+            'direct_rows': self._direct_rows,
+            'spilled_rows': self._spilled_rows,
+            'replayed_rows': self._replayed_rows,
+            'replay_failures': self._replay_failures,
+            'rejected_rows': self._rejected_rows,
+        }
+
+    def _ensure_replay(self):
+        """Start the replay task unless it is already running"""
+        if not self._closing.is_set() and (self._replay_task is None or self._replay_task.done()):
+            self._replay_task = asyncio.create_task(self._replay())
+
+    async def _replay(self):
+        """Insert spooled batches oldest first until the backlog is empty"""
+        while not self._closing.is_set():
+            async with self._lock:
+                segments = self._segments()
+                if not segments:
+                    return
+                if segments[0] == self._active:
+                    # Nothing older left: take the current segment off the writer
+                    self._seal()
+
+            segment = segments[0]
+            for token, table in await asyncio.to_thread(lambda: list(self._read_segment(segment))):
+                if not await self._replay_batch(token, table):
+                    return
+
+            os.remove(os.path.join(self.directory, segment))
+            logger.info(f"Replayed spool segment {segment}")
+
+    async def _replay_batch(self, token: str, table: pa.Table) -> bool:
+        """Insert one spooled batch, retrying with backoff; False if closing"""
+        attempt = 0
+        while True:
+            try:
+                await self.client.insert_telemetry_columnar(table, dedup_token=token)
+                self._replayed_rows += table.num_rows
+                self._backlog_rows -= table.num_rows
+                return True
+            except Exception as e:
+                attempt += 1
+                self._replay_failures += 1
+                if self.max_attempts is not None and attempt >= self.max_attempts:
+                    await asyncio.to_thread(self._reject, token, table)
+                    logger.error(f"Rejected {table.num_rows} spooled rows after {attempt} attempts: {e}")
+                    return True
+
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            try:
+                await asyncio.wait_for(self._closing.wait(), delay)
+                return False
+            except asyncio.TimeoutError:
+                pass
+
+    def _append(self, table: pa.Table, token: str):
+        """Durably append one batch to the current segment"""
+        if self._writer is None:
+            self._active = f"segment-{self._next_segment:012d}{SEGMENT_SUFFIX}"
+            self._next_segment += 1
+            self._file = open(os.path.join(self.directory, self._active), 'wb')
+            self._writer = ipc.new_stream(self._file, TELEMETRY_ARROW_SCHEMA)
+
+        for batch in table.to_batches():
+            self._writer.write_batch(batch, custom_metadata={TOKEN_KEY: token.encode()})
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        if self._file.tell() >= self.segment_bytes:
+            self._seal()
+
+    def _seal(self):
+        """Finish the current segment so it can be replayed"""
+        if self._writer is not None:
+            self._writer.close()
+            self._file.close()
+            self._writer = None
+            self._file = None
+            self._active = None
+
+    def _reject(self, token: str, table: pa.Table):
+        """Move a batch that keeps failing out of the replay path"""
+        directory = os.path.join(self.directory, 'rejected')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{token}{SEGMENT_SUFFIX}"), 'wb') as f:
+            with ipc.new_stream(f, TELEMETRY_ARROW_SCHEMA) as writer:
+                writer.write_table(table)
+        self._rejected_rows += table.num_rows
+        self._backlog_rows -= table.num_rows
+
+    def _read_segment(self, segment: str) -> Iterator[Tuple[str, pa.Table]]:
+        """(token, rows) per spooled insert, stopping at a torn trailing write"""
+        batches: List[pa.RecordBatch] = []
+        token = None
+        with pa.OSFile(os.path.join(self.directory, segment), 'rb') as source:
+            try:
+                reader = ipc.open_stream(source)
+                while True:
+                    try:
+                        batch, metadata = reader.read_next_batch_with_custom_metadata()
+                    except StopIteration:
+                        break
+                    batch_token = metadata[TOKEN_KEY].decode()
+                    if batches and batch_token != token:
+                        yield token, pa.Table.from_batches(batches)
+                        batches = []
+                    token = batch_token
+                    batches.append(batch)
+            except pa.ArrowInvalid as e:
+                logger.warning(f"Spool segment {segment} ends with a partial write: {e}")
+        if batches:
+            yield token, pa.Table.from_batches(batches)
+
+    def _segment_rows(self, segment: str) -> int:
+        """Rows held by a segment"""
+        return sum(table.num_rows for _, table in self._read_segment(segment))
+
+    def _segments(self) -> List[str]:
+        """Segment files in replay order"""
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith('segment-') and name.endswith(SEGMENT_SUFFIX))
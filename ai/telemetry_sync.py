@@ -0,0 +1,264 @@
+"""
+Incremental Telemetry Sync
+Keeps a local append-only copy of training data and only fetches rows newer than a watermark
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from clickhouse_client import ClickHouseClient, TelemetryCursor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache', 'sync')
+
+MANIFEST_FILE = 'manifest.json'
+
+def _new_rows(fetched: pd.DataFrame, cached: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows of fetched not already in cached
+
+    Rows are matched on every column; identical rows are matched one to one,
+    so genuine duplicates in ClickHouse are kept as often as they occur there.
+    """
+    if cached.empty:
+        return fetched
+    columns = list(fetched.columns)
+    occurrence = '_occurrence'
+    left = fetched.assign(**{occurrence: fetched.groupby(columns, dropna=False).cumcount()})
+    right = cached[columns].astype(fetched.dtypes.to_dict())
+    right = right.assign(**{occurrence: right.groupby(columns, dropna=False).cumcount()})
+    merged = left.merge(right, on=columns + [occurrence], how='left', indicator=True)
+    return fetched[(merged['_merge'] == 'left_only').to_numpy()]
+
+class TelemetrySync:
+    """
+    Watermark-based incremental reader for one consumer
+
+    Each sync appends the rows newer than the consumer's cursor as a new
+    Parquet segment and then commits the segment list and cursor together in
+    a manifest, so a crash between the two never duplicates or loses rows.
+    Every sync also re-reads lookback_seconds behind the cursor and keeps
+    only rows not already cached, so inserts that land late (buffer flushes,
+    spool replays after an outage, retries) are still picked up.
+    The manifest also records where the cached window starts; asking for a
+    wider window refetches it, and the segments are compacted to the
+    requested window once there are more than max_segments.
+    """
+
+    def __init__(self, client: ClickHouseClient, consumer: str,
+                 cache_dir: str = DEFAULT_SYNC_DIR, settle_seconds: int = 5,
+                 lookback_seconds: int = 3600, max_segments: int = 32):
+        """
+        Initialize incremental sync
+
+        Args:
+            client: Connected ClickHouse client
+            consumer: Consumer name; each consumer keeps its own cursor and cache
+            cache_dir: Root directory for consumer caches
+            settle_seconds: Passed to get_training_data_since
+            lookback_seconds: Re-read this far behind the cursor on every
+                sync; rows inserted later than this behind the cursor are
+                missed, so cover the longest outage the spool should replay
+            max_segments: Compact once a sync leaves more segments than this
+        """
+        self.client = client
+        self.consumer = consumer
+        self.directory = os.path.join(cache_dir, consumer)
+        self.settle_seconds = settle_seconds
+        self.lookback_seconds = lookback_seconds
+        self.max_segments = max_segments
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    @property
+    def cursor(self) -> Optional[TelemetryCursor]:
+        """Last row already fetched, as (epoch milliseconds, agent_id)"""
+        cursor = self._manifest.get('cursor')
+        return tuple(cursor) if cursor else None
+
+    @property
+    def window_start(self) -> Optional[int]:
+        """Earliest time the cache covers, as epoch milliseconds (None if empty or unknown)"""
+        return self._manifest.get('window_start_ms')
+
+    async def sync(self, hours: int = 24 * 7) -> int:
+        """
+        Fetch rows newer than the cursor and append them to the local cache
+
+        Args:
+            hours: Oldest data to fetch when the cursor is older than the
+                window; a window starting before the cached one is refetched
+
+        Returns:
+            Number of rows appended
+        """
+        requested_start = int((time.time() - hours * 3600) * 1000)
+        if self.cursor is not None and (self.window_start is None or requested_start < self.window_start):
+            # The cursor only moves forward, so older rows can only come from a refetch
+            logger.info(f"Refetching {hours}h for {self.consumer}: wider than the cached window")
+            self.reset()
+
+        since = self.cursor
+        if since is not None and self.lookback_seconds > 0:
+            # Rewind so rows inserted behind the cursor since the last sync are seen
+            since = (since[0] - self.lookback_seconds * 1000, '')
+        df, cursor = await self.client.get_training_data_since(
+            since, hours=hours, settle_seconds=self.settle_seconds
+        )
+        if since != self.cursor and not df.empty:
+            df = _new_rows(df, self._read_segments(since=df['timestamp'].min()))
+            cursor = max(cursor, self.cursor)
+        if df.empty:
+            return 0
+
+        segment = f"segment-{int(time.time() * 1000)}-{len(self._manifest['segments']):06d}.parquet"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                       os.path.join(self.directory, segment))
+
+        window_start = self.window_start if self.cursor is not None else requested_start
+        self._commit(self._manifest['segments'] + [segment], cursor, window_start)
+        logger.info(f"Synced {len(df)} new rows for {self.consumer}")
+
+        if len(self._manifest['segments']) > self.max_segments:
+            self.compact(retention_hours=hours)
+        return len(df)
+
+    async def load(self, hours: int = 24 * 7) -> pd.DataFrame:
+        """
+        Sync, then return the window from the local cache
+
+        Args:
+            hours: Hours of historical data to return
+
+        Returns:
+            DataFrame with the get_training_data columns, newest first
+        """
+        await self.sync(hours)
+        return self.read(hours)
+
+    def read(self, hours: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read cached rows without contacting ClickHouse
+
+        Args:
+            hours: Only return rows from the last N hours (None for everything)
+
+        Returns:
+            DataFrame with the get_training_data columns, newest first
+        """
+        df = self._read_segments()
+        if df.empty:
+            return df
+        if hours is not None:
+            df = df[df['timestamp'] >= self._window_start(df['timestamp'], hours)]
+        # Late rows are appended after newer ones, so order explicitly
+        return df.sort_values(['timestamp', 'agent_id'], ascending=False,
+                              kind='stable').reset_index(drop=True)
+
+    def compact(self, retention_hours: Optional[int] = None) -> int:
+        """
+        Merge all segments into one, dropping rows older than the retention
+
+        Args:
+            retention_hours: Keep only rows from the last N hours (None keeps all)
+
+        Returns:
+            Number of rows kept
+        """
+        old_segments = list(self._manifest['segments'])
+        if not old_segments:
+            return 0
+
+        df = self._read_segments()
+        if retention_hours is not None:
+            df = df[df['timestamp'] >= self._window_start(df['timestamp'], retention_hours)]
+
+        window_start = self.window_start
+        if retention_hours is not None and window_start is not None:
+            window_start = max(window_start, int((time.time() - retention_hours * 3600) * 1000))
+
+        segment = f"segment-{int(time.time() * 1000)}-compacted.parquet"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                       os.path.join(self.directory, segment))
+        self._commit([segment], self.cursor, window_start)
+        self._remove(old_segments)
+
+        logger.info(f"Compacted {len(old_segments)} segments into {len(df)} rows for {self.consumer}")
+        return len(df)
+
+    def reset(self):
+        """Forget the cursor and delete the cached rows"""
+        old_segments = list(self._manifest['segments'])
+        self._commit([], None, None)
+        self._remove(old_segments)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        """Load the committed manifest and discard uncommitted segments"""
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        manifest = {'cursor': None, 'segments': []}
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+
+        # Segments written by a sync that crashed before committing
+        committed = set(manifest['segments'])
+        orphans = [name for name in os.listdir(self.directory)
+                   if name.endswith('.parquet') and name not in committed]
+        self._remove(orphans)
+        return manifest
+
+    def _commit(self, segments: List[str], cursor: Optional[TelemetryCursor],
+                window_start: Optional[int]):
+        """Atomically replace the manifest"""
+        manifest = {
+            'cursor': list(cursor) if cursor else None,
+            'segments': segments,
+            'window_start_ms': window_start,
+            'updated_at': datetime.now().isoformat()
+        }
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        self._manifest = manifest
+
+    def _read_segments(self, since: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Concatenate committed segments in append order, optionally from a timestamp on"""
+        frames = []
+        for segment in self._manifest['segments']:
+            path = os.path.join(self.directory, segment)
+            filters = None
+            if since is not None:
+                column_type = pq.read_schema(path).field('timestamp').type
+                filters = ds.field('timestamp') >= pa.scalar(since, type=column_type)
+            frames.append(pq.read_table(path, filters=filters).to_pandas())
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _remove(self, segments: List[str]):
+        """Delete segment files that are no longer referenced"""
+        for segment in segments:
+            try:
+                os.remove(os.path.join(self.directory, segment))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _window_start(timestamps: pd.Series, hours: int):
+        """Window start comparable with the cached timestamp column"""
+        start = datetime.now(timezone.utc) - timedelta(hours=hours)
+        if getattr(timestamps.dt, 'tz', None) is None:
+            return pd.Timestamp(start).tz_localize(None)
+        return pd.Timestamp(start)
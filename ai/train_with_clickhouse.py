@@ -7,7 +7,7 @@ import asyncio
 import logging
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 import os
 import sys
@@ -15,7 +15,9 @@ import sys
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from clickhouse_client import create_clickhouse_client, TelemetryRecord
+from clickhouse_client import create_clickhouse_client, TelemetryBatch, TrainingSample
+from telemetry_sync import TelemetrySync
+from synthetic_telemetry import generate_synthetic_telemetry
 from models.performance_predictor import TransferPerformancePredictor
 from models.anomaly_detector_simple import AnomalyDetector
 from features.engineering import FeatureEngineer
@@ -28,10 +30,20 @@ class MLTrainingPipeline:
     Complete ML training pipeline using ClickHouse data
     """
     
-    def __init__(self, clickhouse_host: str = 'localhost', clickhouse_port: int = 8123):
+    def __init__(self, clickhouse_host: str = 'localhost', clickhouse_port: int = 8123,
+                 incremental: bool = False, sync_consumer: str = 'ml_training',
+                 sample: Optional[TrainingSample] = None):
         self.clickhouse_host = clickhouse_host
         self.clickhouse_port = clickhouse_port
         self.client = None
+        
+        # Incremental loading (opt-in): only rows newer than the last run are fetched
+        self.incremental = incremental
+        self.sync_consumer = sync_consumer
+        self.telemetry_sync = None
+        
+        # Server-side sampling; sampled loads bypass the incremental cache
+        self.sample = sample
         self.feature_engineer = FeatureEngineer()
         
         # Models
@@ -46,116 +58,46 @@ class MLTrainingPipeline:
                 port=self.clickhouse_port
             )
             logger.info("✅ Connected to ClickHouse")
+            
+            if self.incremental:
+                self.telemetry_sync = TelemetrySync(self.client, self.sync_consumer)
             return True
         except Exception as e:
             logger.error(f"❌ Failed to connect to ClickHouse: {e}")
             return False
     
-    async def generate_sample_data(self, num_records: int = 1000):
+    async def generate_sample_data(self, num_records: int = 1000, seed: Optional[int] = None):
         """
         Generate sample telemetry data for testing
         In production, this would come from real TCP agents
+        
+        Records are 10 minutes apart over the last week, round-robin across
+        10 agents. Use synthetic_telemetry directly for larger datasets.
         """
         logger.info(f"Generating {num_records} sample telemetry records...")
         
-        records = []
-        base_time = datetime.now() - timedelta(days=7)
-        
-        for i in range(num_records):
-            # Simulate realistic network conditions
-            hour = (base_time + timedelta(minutes=i*10)).hour
-            is_peak_hour = 9 <= hour <= 17  # Business hours
-            
-            # Network conditions vary by time of day
-            if is_peak_hour:
-                bandwidth = np.random.normal(80, 20)  # Lower during peak
-                latency = np.random.normal(80, 30)    # Higher during peak
-                packet_loss = np.random.exponential(0.02)
-            else:
-                bandwidth = np.random.normal(120, 30)  # Higher off-peak
-                latency = np.random.normal(40, 15)     # Lower off-peak
-                packet_loss = np.random.exponential(0.005)
-            
-            # Ensure realistic bounds
-            bandwidth = max(10, min(1000, bandwidth))
-            latency = max(10, min(500, latency))
-            packet_loss = max(0, min(0.1, packet_loss))
-            
-            # System metrics
-            cpu_usage = np.random.normal(50, 20)
-            memory_usage = np.random.normal(60, 25)
-            
-            # Transfer settings
-            chunk_size = np.random.choice([32*1024, 64*1024, 128*1024, 256*1024])
-            concurrent_connections = np.random.randint(1, 9)
-            
-            # Calculate realistic throughput based on conditions
-            base_throughput = bandwidth * 0.7  # 70% efficiency baseline
-            latency_penalty = max(0, (latency - 50) / 100)  # Penalty for high latency
-            loss_penalty = packet_loss * 100  # Packet loss penalty
-            cpu_penalty = max(0, (cpu_usage - 80) / 100)  # CPU bottleneck
-            
-            throughput = base_throughput * (1 - latency_penalty - loss_penalty - cpu_penalty)
-            throughput = max(1, min(bandwidth * 0.95, throughput))
-            
-            # File size affects transfer duration
-            file_size = np.random.lognormal(15, 2)  # Log-normal distribution for file sizes
-            file_size = max(1024*1024, min(10*1024*1024*1024, file_size))  # 1MB to 10GB
-            
-            transfer_duration = (file_size / (throughput * 1024 * 1024 / 8)) * 1000  # ms
-            
-            record = TelemetryRecord(
-                timestamp=base_time + timedelta(minutes=i*10),
-                agent_id=f"agent-{(i % 10) + 1:03d}",
-                transfer_id=f"transfer-{i+1:06d}",
-                project_id=f"project-{(i % 5) + 1:02d}",
-                
-                # Network metrics
-                bandwidth_mbps=bandwidth,
-                latency_ms=latency,
-                packet_loss_rate=packet_loss,
-                jitter_ms=np.random.exponential(5),
-                rtt_ms=latency * 2,
-                
-                # Transfer metrics
-                throughput_mbps=throughput,
-                bytes_transferred=int(file_size),
-                transfer_duration_ms=int(transfer_duration),
-                chunk_size=chunk_size,
-                concurrent_connections=concurrent_connections,
-                
-                # System metrics
-                cpu_usage=max(0, min(100, cpu_usage)),
-                memory_usage=max(0, min(100, memory_usage)),
-                disk_io_mbps=np.random.normal(150, 50),
-                network_utilization=min(100, throughput / bandwidth * 100),
-                
-                # Environmental
-                hour_of_day=hour,
-                day_of_week=(base_time + timedelta(minutes=i*10)).weekday(),
-                is_weekend=(base_time + timedelta(minutes=i*10)).weekday() >= 5,
-                
-                # Optimization results (simulated)
-                predicted_throughput=throughput * np.random.normal(1.0, 0.1),
-                actual_throughput=throughput,
-                optimization_applied=np.random.choice([
-                    '', 'chunk_size_optimized', 'connection_count_optimized', 
-                    'bandwidth_throttled', 'retry_optimized'
-                ], p=[0.3, 0.2, 0.2, 0.15, 0.15]),
-                improvement_percent=np.random.normal(5, 15)
-            )
-            
-            records.append(record)
+        columns = generate_synthetic_telemetry(
+            num_agents=10, minutes=num_records * 10, interval_minutes=100,
+            start=datetime.now(timezone.utc) - timedelta(days=7), seed=seed, stagger=True
+        )
         
         # Insert into ClickHouse
-        await self.client.insert_telemetry(records)
-        logger.info(f"✅ Inserted {len(records)} sample records")
+        batch = TelemetryBatch(columns)[:num_records]
+        await self.client.insert_telemetry(batch)
+        logger.info(f"✅ Inserted {len(batch)} sample records")
         
     async def load_training_data(self, hours: int = 24 * 7) -> pd.DataFrame:
         """Load training data from ClickHouse"""
         logger.info(f"Loading training data from last {hours} hours...")
         
-        df = await self.client.get_training_data(hours=hours)
+        if self.sample:
+            df = await self.client.get_training_data(hours=hours, sample=self.sample)
+        elif self.telemetry_sync:
+            new_rows = await self.telemetry_sync.sync(hours)
+            logger.info(f"Fetched {new_rows} new rows since the last run")
+            df = self.telemetry_sync.read(hours)
+        else:
+            df = await self.client.get_training_data(hours=hours)
         
         if df.empty:
             logger.warning("No training data found in ClickHouse")
@@ -179,31 +121,20 @@ class MLTrainingPipeline:
         if df.empty:
             return {}
         
-        # Use feature engineer to prepare training data
-        feature_df = self.feature_engineer.prepare_training_data(df)
-        
-        # Convert to feature arrays (handle missing columns gracefully)
-        def safe_extract_features(df, columns, default_values):
-            result = []
-            for i, col in enumerate(columns):
-                if col in df.columns:
-                    result.append(df[col].values)
-                else:
-                    logger.warning(f"Column {col} not found, using default value {default_values[i]}")
-                    result.append(np.full(len(df), default_values[i]))
-            return np.column_stack(result) if result else np.array([]).reshape(len(df), 0)
+        # Scaled features as one float32 matrix, sliced into the model groups
+        matrix = self.feature_engineer.prepare_training_matrix(df)
         
         features = {
-            'network_features': safe_extract_features(feature_df, 
+            'network_features': matrix.take(
                 ['bandwidth_utilization', 'latency_ms', 'packet_loss_rate', 'network_health_score'],
                 [75.0, 50.0, 0.01, 75.0]),
-            'system_features': safe_extract_features(feature_df,
+            'system_features': matrix.take(
                 ['cpu_usage', 'memory_usage', 'cpu_stress_level', 'memory_pressure'],
                 [50.0, 60.0, 1.0, 1.0]),
-            'transfer_features': safe_extract_features(feature_df,
+            'transfer_features': matrix.take(
                 ['chunk_size', 'concurrent_streams', 'throughput_per_stream'],
                 [65536, 4, 25.0]),
-            'temporal_features': safe_extract_features(feature_df,
+            'temporal_features': matrix.take(
                 ['hour_of_day', 'day_of_week', 'is_weekend', 'is_business_hours'],
                 [12, 2, 0, 1])
         }
@@ -265,7 +196,10 @@ class MLTrainingPipeline:
         
         try:
             # Train the model
-            metrics = self.performance_predictor.train(X, y_throughput, y_completion_time)
+            metrics = self.performance_predictor.train(
+                X, y_throughput, y_completion_time,
+                sampling=self.sample.to_dict() if self.sample else None
+            )
             logger.info("✅ Performance predictor trained successfully")
             
             # Record model performance in ClickHouse